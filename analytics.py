@@ -0,0 +1,132 @@
+import importlib
+import importlib.util
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+# DuckDB (in requirements.txt) is slow to import, so it's only imported when the first engine is built;
+# without it the engine falls back to SQLite
+HAS_DUCKDB = importlib.util.find_spec('duckdb') is not None
+ENGINE_NAME = "DuckDB" if HAS_DUCKDB else "SQLite"
+
+# Queries are stopped after this many seconds
+QUERY_TIMEOUT_SECONDS = float(os.environ.get("GMC_QUERY_TIMEOUT_SECONDS", "10"))
+
+# SQLite virtual machine steps between deadline checks
+_SQLITE_PROGRESS_STEPS = 10000
+
+# Ad-hoc queries must be a single read-only statement
+_READ_ONLY_QUERY = re.compile(r'^\s*(select|with)\b', re.IGNORECASE)
+
+# SQLite operations allowed once the tables are loaded
+_SQLITE_READ_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+
+
+class QueryError(Exception):
+    """Raised for invalid or disallowed SQL"""
+
+
+def scalar_columns(df):
+    """Columns whose values are plain scalars (nested JSON columns can't be loaded as SQL columns)"""
+    columns = []
+    for column in df.columns:
+        values = df[column]
+        if values.dtype == object and values.map(lambda value: isinstance(value, (dict, list, tuple, set))).any():
+            continue
+        columns.append(column)
+    return columns
+
+
+def _unique_names(names):
+    """Result column names made unique by numbering repeats (keyword, keyword_1, ...)"""
+    seen = {}
+    unique = []
+    for name in names:
+        candidate = name
+        while candidate in seen:
+            seen[name] += 1
+            candidate = f"{name}_{seen[name]}"
+        seen[candidate] = 0
+        unique.append(candidate)
+    return unique
+
+
+def _single_statement(sql):
+    """`sql` without its terminating semicolon, or None if it holds more than one statement.
+
+    Semicolons inside string literals, quoted identifiers and comments don't end a statement.
+    """
+    statement = sql.strip()
+    for i, char in enumerate(statement):
+        if char == ';' and sqlite3.complete_statement(statement[:i + 1]):
+            return None if statement[i + 1:].strip() else statement[:i]
+    return statement
+
+
+class SQLEngine:
+    """Embedded read-only SQL engine over a fixed set of DataFrames.
+
+    Uses DuckDB when installed: the DataFrames are registered as views that
+    its multi-threaded columnar engine scans in place, without copying them.
+    Otherwise every row is copied into an in-memory SQLite database, a
+    single-threaded row store. Either way file and network access is disabled
+    once the tables are registered, so ad-hoc queries can only read them.
+    Nested JSON columns are left out.
+    """
+
+    def __init__(self, tables):
+        self.tables = {}
+        self._lock = threading.Lock()
+        self._duckdb = importlib.import_module('duckdb') if HAS_DUCKDB else None
+        if self._duckdb is not None:
+            self._connection = self._duckdb.connect(':memory:')
+            for name, df in tables.items():
+                frame = df[scalar_columns(df)]
+                self._connection.register(name, frame)
+                self.tables[name] = list(frame.columns)
+            self._connection.execute("SET enable_external_access = false")
+            self._connection.execute("SET lock_configuration = true")
+        else:
+            self._connection = sqlite3.connect(':memory:', check_same_thread=False)
+            for name, df in tables.items():
+                frame = df[scalar_columns(df)]
+                frame.to_sql(name, self._connection, index=False)
+                self.tables[name] = list(frame.columns)
+            self._connection.set_authorizer(lambda action, *args: sqlite3.SQLITE_OK if action in _SQLITE_READ_ACTIONS else sqlite3.SQLITE_DENY)
+
+    def query(self, sql, params=(), limit=None, timeout=QUERY_TIMEOUT_SECONDS):
+        """Result of a single SELECT (or WITH ... SELECT) statement as a DataFrame.
+
+        Only the first `limit` rows are fetched when a limit is given. Raises
+        QueryError for anything else, if the query fails or if it runs for more
+        than `timeout` seconds.
+        """
+        statement = _single_statement(sql)
+        if statement is None or not _READ_ONLY_QUERY.match(statement):
+            raise QueryError("Only a single SELECT query is allowed")
+        with self._lock:
+            deadline = time.monotonic() + timeout
+            if self._duckdb is not None:
+                # DuckDB has no progress callback, so a timer interrupts the running query
+                timer = threading.Timer(timeout, self._connection.interrupt)
+                timer.daemon = True
+                timer.start()
+            else:
+                self._connection.set_progress_handler(lambda: time.monotonic() > deadline, _SQLITE_PROGRESS_STEPS)
+            try:
+                cursor = self._connection.execute(statement, list(params) if self._duckdb is not None else tuple(params))
+                rows = cursor.fetchall() if limit is None else cursor.fetchmany(limit)
+                return pd.DataFrame.from_records(rows, columns=_unique_names(column[0] for column in cursor.description), coerce_float=True)
+            except (sqlite3.Error, getattr(self._duckdb, 'Error', sqlite3.Error)) as e:
+                if time.monotonic() >= deadline:
+                    raise QueryError(f"Query stopped after {timeout:g}s - narrow it down with filters or a LIMIT") from e
+                raise QueryError(str(e)) from e
+            finally:
+                if self._duckdb is not None:
+                    timer.cancel()
+                else:
+                    self._connection.set_progress_handler(None, 0)
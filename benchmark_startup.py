@@ -0,0 +1,152 @@
+"""Startup and rerun latency benchmark for the Streamlit app.
+
+    python benchmark_startup.py [--products N] [--keywords N]
+
+Measures a cold start (a fresh interpreter importing Streamlit and running the
+app to its login page) and the median rerun time of every page with a
+generated feed, keyword set and finished optimization loaded. Exits with
+status 1 when a measurement is over its budget, so it can guard against
+startup and rerun regressions.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(APP_DIR, "streamlit_app.py")
+
+# Latency budgets in milliseconds, checked against the median of the runs
+COLD_START_BUDGET_MS = float(os.environ.get("GMC_BENCH_COLD_START_MS", "1500"))
+RERUN_BUDGET_MS = float(os.environ.get("GMC_BENCH_RERUN_MS", "300"))
+
+# Cold starts measured, and timed reruns per page after one warm-up run
+COLD_STARTS = 3
+RERUNS = 5
+
+# Seconds the sample optimization may take before the benchmark gives up
+OPTIMIZATION_TIMEOUT_S = float(os.environ.get("GMC_BENCH_OPTIMIZATION_TIMEOUT_S", "600"))
+
+_COLD_START_SCRIPT = """
+import time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({path!r}, default_timeout=120)
+at.run()
+assert not at.exception, at.exception
+print((time.perf_counter() - started) * 1000)
+"""
+
+_WORDS = {
+    'types': ['sofa', 'chair', 'dining table', 'coffee table', 'bed', 'wardrobe', 'sideboard', 'bookcase'],
+    'materials': ['oak', 'walnut', 'fabric', 'leather', 'velvet', 'glass', 'metal'],
+    'styles': ['modern', 'rustic', 'classic', 'luxury', 'compact', 'corner', '3 seater'],
+}
+
+
+def sample_data(products, keywords, seed=0):
+    """Generated GMC feed and SEOMonitor keywords of the given sizes"""
+    rng = np.random.default_rng(seed)
+
+    def pick(name, n):
+        return rng.choice(_WORDS[name], n)
+
+    styles, materials, types = pick('styles', products), pick('materials', products), pick('types', products)
+    df_gmc = pd.DataFrame({
+        'id': [f"SKU{i:06d}" for i in range(products)],
+        'title': [f"{style.title()} {material.title()} {kind.title()}" for style, material, kind in zip(styles, materials, types)],
+        'description': [f"A {style} {kind} made from solid {material}, built to last." for style, material, kind in zip(styles, materials, types)],
+        'link': [f"https://example.com/products/{i}" for i in range(products)],
+        'brand': "Oak Furniture Land",
+    })
+    df_seo = pd.DataFrame({
+        'keyword': [f"{material} {kind}" + ("s" if plural else "") for material, kind, plural in zip(pick('materials', keywords), pick('types', keywords), rng.random(keywords) < 0.3)],
+        'search_volume': rng.integers(0, 5000, keywords),
+        'position': rng.integers(1, 100, keywords),
+        'difficulty': rng.integers(0, 100, keywords),
+        'product_grid_position': rng.integers(1, 40, keywords),
+    })
+    return df_gmc, df_seo
+
+
+def cold_start_ms():
+    """Milliseconds from a fresh interpreter to the app's first rendered run"""
+    result = subprocess.run([sys.executable, "-c", _COLD_START_SCRIPT.format(path=APP_PATH)],
+                            cwd=APP_DIR, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def rerun_ms(df_gmc, df_seo):
+    """Median rerun milliseconds of every page, after a finished optimization"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=600)
+    at.session_state['authenticated'] = True
+    at.session_state['gmc_feed'] = df_gmc
+    at.session_state['seomonitor_data'] = df_seo
+    at.run()
+    pages = at.sidebar.selectbox[0].options
+
+    at.sidebar.selectbox[0].set_value("Strategic Optimization").run()
+    next(button for button in at.button if 'Generate' in button.label).click().run()
+    deadline = time.time() + OPTIMIZATION_TIMEOUT_S
+    while 'optimization_recommendations' not in at.session_state:
+        if at.exception:
+            raise RuntimeError(f"Strategic Optimization: {at.exception}")
+        if time.time() > deadline:
+            raise RuntimeError(f"Optimization didn't finish within {OPTIMIZATION_TIMEOUT_S:g}s")
+        time.sleep(0.1)
+        at.run()
+    snapshot = at.session_state['optimization_worker'].snapshot()
+    if snapshot['status'] != 'done':
+        raise RuntimeError(f"Optimization {snapshot['status']}: {snapshot['error'] or 'no error reported'}")
+
+    timings = {}
+    for page in pages:
+        at.sidebar.selectbox[0].set_value(page).run()
+        if at.exception:
+            raise RuntimeError(f"{page}: {at.exception}")
+        runs = []
+        for _ in range(RERUNS):
+            started = time.perf_counter()
+            at.run()
+            runs.append((time.perf_counter() - started) * 1000)
+        timings[page] = statistics.median(runs)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup and rerun latency benchmark")
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--keywords', type=int, default=2000)
+    args = parser.parse_args()
+
+    # Read the app's .streamlit/config.toml and keep benchmark runs out of the real run history
+    os.chdir(APP_DIR)
+    os.environ.setdefault("GMC_RUN_HISTORY_PATH", os.path.join(tempfile.mkdtemp(prefix="gmc_bench_"), "run_history.sqlite3"))
+
+    results = [("Cold start (login page)", statistics.median(cold_start_ms() for _ in range(COLD_STARTS)), COLD_START_BUDGET_MS)]
+    try:
+        timings = rerun_ms(*sample_data(args.products, args.keywords))
+    except RuntimeError as e:
+        print(f"Benchmark failed: {e}", file=sys.stderr)
+        return 1
+    for page, milliseconds in timings.items():
+        results.append((f"Rerun: {page}", milliseconds, RERUN_BUDGET_MS))
+
+    failed = False
+    for name, milliseconds, budget in results:
+        over = milliseconds > budget
+        failed |= over
+        print(f"{name:<40} {milliseconds:8.1f} ms  (budget {budget:.0f} ms){'  OVER BUDGET' if over else ''}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+import configparser
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+CONFIG_PATH = "config_oak_furniture.ini"
+
+# SEOMonitor rank tracker keywords: page size, safety cap per campaign and history window
+KEYWORDS_URL = "https://apigw.seomonitor.com/v3/rank-tracker/v3.0/keywords"
+KEYWORDS_PAGE_SIZE = 200
+KEYWORDS_MAX = 10000
+KEYWORDS_DAYS = 90
+
+# Campaigns fetched from the API (and feeds read) at the same time
+MAX_CONCURRENT_FETCHES = 4
+
+# Configuration sections describing one campaign+feed pair are named "Campaign <name>"
+CAMPAIGN_SECTION_PREFIX = "Campaign "
+
+# One campaign+feed pair of a batch run (`feed` is None to optimize the session's uploaded feed)
+Campaign = namedtuple('Campaign', ['name', 'brand', 'campaign_id', 'api_key', 'feed'])
+
+
+class CampaignError(Exception):
+    """Raised for an invalid campaign configuration or an unreadable feed"""
+
+
+def load_config(path=CONFIG_PATH):
+    config = configparser.ConfigParser()
+    if not config.read(path):
+        raise CampaignError(f"{path} not found")
+    return config
+
+
+def load_campaigns(path=CONFIG_PATH):
+    """Campaign+feed pairs listed in the configuration.
+
+    Each [Campaign <name>] section has a campaign_id and a feed file (relative
+    to the configuration file) and may override the brand name and api_key of
+    [Brand] and [SEOMonitor]. Without campaign sections the configuration is the
+    single [SEOMonitor] campaign, optimizing the uploaded feed.
+    """
+    config = load_config(path)
+    api_key = config.get('SEOMonitor', 'api_key', fallback=None)
+    brand = config.get('Brand', 'name', fallback="")
+    base_dir = os.path.dirname(os.path.abspath(path))
+
+    campaigns = []
+    for section in config.sections():
+        if not section.startswith(CAMPAIGN_SECTION_PREFIX):
+            continue
+        values = config[section]
+        if not values.get('campaign_id'):
+            raise CampaignError(f"[{section}] has no campaign_id")
+        feed = values.get('feed')
+        campaigns.append(Campaign(
+            name=section[len(CAMPAIGN_SECTION_PREFIX):].strip(),
+            brand=values.get('brand', brand),
+            campaign_id=values['campaign_id'],
+            api_key=values.get('api_key', api_key),
+            feed=os.path.join(base_dir, feed) if feed else None
+        ))
+
+    if not campaigns and config.has_option('SEOMonitor', 'campaign_id'):
+        campaigns.append(Campaign(brand, brand, config['SEOMonitor']['campaign_id'], api_key, None))
+    return campaigns
+
+
+def fetch_keywords(api_key, campaign_id, on_page=None):
+    """All keywords of a SEOMonitor campaign, fetched page by page.
+
+    Returns the keyword rows and an error message (None on success) - rows
+    fetched before an API error are kept. `on_page(count, total)` is called
+    after each page.
+    """
+    import requests
+
+    headers = {
+        'Authorization': api_key,
+        'X-Token': api_key,
+        'Accept': 'application/json'
+    }
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=KEYWORDS_DAYS)
+
+    keywords = []
+    while True:
+        params = {
+            'campaign_id': campaign_id,
+            'start_date': start_date.strftime('%Y-%m-%d'),
+            'end_date': end_date.strftime('%Y-%m-%d'),
+            'include_all_groups': 'true',
+            'limit': KEYWORDS_PAGE_SIZE,
+            'offset': len(keywords)
+        }
+        response = requests.get(KEYWORDS_URL, headers=headers, params=params)
+        if response.status_code != 200:
+            return keywords, f"API Error: {response.status_code}"
+
+        data = response.json()
+        if not isinstance(data, list) or not data:
+            return keywords, None
+        keywords.extend(data)
+        if on_page is not None:
+            on_page(len(data), len(keywords))
+
+        # Safety cap to avoid infinite loops
+        if len(data) < KEYWORDS_PAGE_SIZE or len(keywords) >= KEYWORDS_MAX:
+            return keywords, None
+
+
+def fetch_campaigns(campaigns):
+    """Keywords of every campaign, fetched concurrently.
+
+    Campaigns sharing a SEOMonitor campaign are fetched once and get the same
+    DataFrame. Returns {(api_key, campaign_id): (DataFrame or None, error)}.
+    """
+    import requests
+
+    keys = list(dict.fromkeys((campaign.api_key, campaign.campaign_id) for campaign in campaigns))
+
+    def fetch(key):
+        try:
+            keywords, error = fetch_keywords(*key)
+        except requests.RequestException as e:
+            keywords, error = [], str(e)
+        return (pd.DataFrame(keywords) if keywords else None), error
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_FETCHES) as executor:
+        return dict(zip(keys, executor.map(fetch, keys)))
+
+
+def read_feed(path):
+    """GMC feed file (CSV, tab-separated text or Excel) as a DataFrame"""
+    try:
+        if path.endswith('.csv'):
+            return pd.read_csv(path)
+        if path.endswith(('.tsv', '.txt')):
+            return pd.read_csv(path, sep='\t')
+        return pd.read_excel(path)
+    except (OSError, ValueError) as e:
+        raise CampaignError(f"Can't read feed {path}: {e}") from e
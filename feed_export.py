@@ -0,0 +1,236 @@
+import os
+import re
+import tempfile
+import time
+import weakref
+from xml.sax.saxutils import escape
+
+import streamlit as st
+
+try:
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    # Releases with deferred downloads accept a callable that is only run when the button is clicked
+    DEFERRED_DOWNLOADS = hasattr(MediaFileManager, 'add_deferred')
+except ImportError:
+    DEFERRED_DOWNLOADS = False
+
+# Rows written per chunk - keeps only one slice of the feed converted at a time
+EXPORT_CHUNK_ROWS = 10000
+
+CSV_MIME = "text/csv"
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+TSV_MIME = "text/tab-separated-values"
+XML_MIME = "application/xml"
+
+GOOGLE_NAMESPACE = "http://base.google.com/ns/1.0"
+
+# Tabs/newlines break Merchant Center TSV rows; control characters are invalid in XML
+_TSV_BREAKS = re.compile(r'[\t\r\n]+')
+_XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class ExportArtifact:
+    """An export file written to a temporary location on disk.
+
+    The file is removed once the artifact is garbage collected, so keeping the
+    artifact in session state keeps its download available.
+    """
+
+    def __init__(self, path, mime, generation_seconds):
+        self.path = path
+        self.mime = mime
+        self.generation_seconds = generation_seconds
+        self._finalizer = weakref.finalize(self, _remove_file, path)
+
+    @property
+    def size(self):
+        return os.path.getsize(self.path)
+
+    def open(self):
+        return open(self.path, 'rb')
+
+    def read(self):
+        with self.open() as f:
+            return f.read()
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _temp_path(suffix):
+    handle, path = tempfile.mkstemp(prefix="gmc_export_", suffix=suffix)
+    os.close(handle)
+    return path
+
+
+def _iter_chunks(df, chunk_rows):
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def write_csv(df, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Stream a DataFrame to a temporary CSV file chunk by chunk"""
+    started = time.time()
+    path = _temp_path(".csv")
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        if df.empty:
+            df.to_csv(f, index=False)
+        for i, chunk in enumerate(_iter_chunks(df, chunk_rows)):
+            chunk.to_csv(f, index=False, header=(i == 0))
+    return ExportArtifact(path, CSV_MIME, time.time() - started)
+
+
+def _excel_rows(df, chunk_rows):
+    """Yield plain Python rows for Excel writers (NaN becomes an empty cell)"""
+    for chunk in _iter_chunks(df, chunk_rows):
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        yield from chunk.itertuples(index=False, name=None)
+
+
+def write_xlsx(df, sheet_name="Sheet1", chunk_rows=EXPORT_CHUNK_ROWS):
+    """Stream a DataFrame to a temporary XLSX file using a constant-memory writer.
+
+    Uses xlsxwriter's constant_memory mode when installed, otherwise openpyxl's
+    write-only mode. Raises ImportError if neither package is available.
+    """
+    started = time.time()
+    path = _temp_path(".xlsx")
+    header = [str(col) for col in df.columns]
+
+    try:
+        import xlsxwriter
+
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'nan_inf_to_errors': True})
+        worksheet = workbook.add_worksheet(sheet_name)
+        worksheet.write_row(0, 0, header)
+        for row_number, row in enumerate(_excel_rows(df, chunk_rows), start=1):
+            worksheet.write_row(row_number, 0, row)
+        workbook.close()
+    except ImportError:
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            _remove_file(path)
+            raise
+
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet(sheet_name)
+        worksheet.append(header)
+        for row in _excel_rows(df, chunk_rows):
+            worksheet.append(row)
+        workbook.save(path)
+
+    return ExportArtifact(path, XLSX_MIME, time.time() - started)
+
+
+def _tsv_value(value):
+    return _TSV_BREAKS.sub(' ', str(value)).strip()
+
+
+def write_supplemental_tsv(delta, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Stream a Merchant Center supplemental feed as TSV.
+
+    `delta` holds id, title, description and title_changed/description_changed
+    flags for changed products only. Only attribute columns with at least one
+    change are written.
+    """
+    started = time.time()
+    path = _temp_path(".tsv")
+    attributes = [attr for attr in ['title', 'description'] if delta[f'{attr}_changed'].any()]
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        f.write('\t'.join(['id'] + attributes) + '\n')
+        for chunk in _iter_chunks(delta, chunk_rows):
+            lines = ['\t'.join(_tsv_value(value) for value in row) for row in chunk[['id'] + attributes].itertuples(index=False, name=None)]
+            if lines:
+                f.write('\n'.join(lines) + '\n')
+    return ExportArtifact(path, TSV_MIME, time.time() - started)
+
+
+def _xml_value(value):
+    return escape(_XML_INVALID.sub('', str(value)))
+
+
+def write_supplemental_xml(delta, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Stream a Merchant Center supplemental feed as namespaced RSS 2.0 XML.
+
+    Each item carries g:id plus only the attributes that changed for that product.
+    """
+    started = time.time()
+    path = _temp_path(".xml")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write(f'<rss version="2.0" xmlns:g="{GOOGLE_NAMESPACE}">\n<channel>\n')
+        f.write('<title>Optimized titles and descriptions</title>\n')
+        for chunk in _iter_chunks(delta, chunk_rows):
+            items = []
+            for product_id, title, description, title_changed, description_changed in chunk[['id', 'title', 'description', 'title_changed', 'description_changed']].itertuples(index=False, name=None):
+                item = f'<item>\n<g:id>{_xml_value(product_id)}</g:id>\n'
+                if title_changed:
+                    item += f'<g:title>{_xml_value(title)}</g:title>\n'
+                if description_changed:
+                    item += f'<g:description>{_xml_value(description)}</g:description>\n'
+                items.append(item + '</item>\n')
+            f.write(''.join(items))
+        f.write('</channel>\n</rss>\n')
+    return ExportArtifact(path, XML_MIME, time.time() - started)
+
+
+def format_size(num_bytes):
+    """Human readable file size"""
+    for unit in ['B', 'KB', 'MB']:
+        if num_bytes < 1024:
+            return f"{num_bytes:.0f} {unit}" if unit == 'B' else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} GB"
+
+
+def artifact_download_button(artifact, label, file_name):
+    """Serve an export artifact from disk and show its size and generation time.
+
+    The file is read when the download is clicked. Releases without deferred
+    downloads copy it into the media file manager on every rerun instead.
+    """
+    if DEFERRED_DOWNLOADS:
+        st.download_button(label=label, data=artifact.read, file_name=file_name, mime=artifact.mime)
+    else:
+        with artifact.open() as f:
+            st.download_button(label=label, data=f, file_name=file_name, mime=artifact.mime)
+    st.caption(f"📦 {format_size(artifact.size)} · generated in {artifact.generation_seconds:.2f}s")
+
+
+def export_stamp(*inputs):
+    """Version stamp for export inputs - changes whenever an input object is replaced or resized"""
+    return tuple((id(obj), len(obj)) for obj in inputs)
+
+
+def cached_export(name, stamp, build, inputs=()):
+    """Return the session's cached export for `name`, building it only if the stamp changed.
+
+    The inputs are kept alive with the cache entry so their ids in the stamp
+    can't be reused by new objects.
+    """
+    cache = st.session_state.setdefault('export_cache', {})
+    entry = cache.get(name)
+    if entry is None or entry['stamp'] != stamp:
+        entry = {'stamp': stamp, 'value': build(), 'inputs': inputs}
+        cache[name] = entry
+    return entry['value']
+
+
+def lazy_download_button(name, stamp, build, label, file_name, inputs=()):
+    """Download button for an export artifact that is only generated on demand.
+
+    Until the artifact exists for the current stamp a "Generate" button is
+    shown; once generated it is reused on later reruns until the inputs change.
+    """
+    entry = st.session_state.setdefault('export_cache', {}).get(name)
+    if entry is None or entry['stamp'] != stamp:
+        if not st.button(f"⚙️ Generate {file_name}", key=f"prepare_{name}"):
+            return
+        with st.spinner(f"Generating {file_name}..."):
+            cached_export(name, stamp, build, inputs)
+    artifact_download_button(cached_export(name, stamp, build, inputs), label, file_name)
@@ -6,6 +6,8 @@ import json
 import configparser
 import os
 
+from feed_export import export_stamp, lazy_download_button, write_csv
+
 st.set_page_config(
     page_title="Oak Furniture Land SEO Optimizer",
     page_icon="🪑",
@@ -405,36 +407,39 @@ elif page == "Export Results":
     if st.session_state['sitebulb_data'] is not None:
         st.write("**Export Sitebulb Data:**")
         df_sitebulb = st.session_state['sitebulb_data']
-        csv_sitebulb = df_sitebulb.to_csv(index=False)
-        st.download_button(
+        lazy_download_button(
+            "sitebulb_csv",
+            export_stamp(df_sitebulb),
+            lambda: write_csv(df_sitebulb),
             label="Download Sitebulb CSV",
-            data=csv_sitebulb,
             file_name=f"sitebulb_{st.session_state.get('sitebulb_file', 'data')}.csv",
-            mime="text/csv"
+            inputs=(df_sitebulb,)
         )
     
     # Export Product data
     if st.session_state['product_data'] is not None:
         st.write("**Export Product Data:**")
         df_products = st.session_state['product_data']
-        csv_products = df_products.to_csv(index=False)
-        st.download_button(
+        lazy_download_button(
+            "products_csv",
+            export_stamp(df_products),
+            lambda: write_csv(df_products),
             label="Download Product CSV",
-            data=csv_products,
             file_name=f"products_{st.session_state.get('product_file', 'data')}.csv",
-            mime="text/csv"
+            inputs=(df_products,)
         )
     
     # Export SEOMonitor data
     if st.session_state['seomonitor_data'] is not None:
         st.write("**Export SEOMonitor Data:**")
         df_seo = st.session_state['seomonitor_data']
-        csv_seo = df_seo.to_csv(index=False)
-        st.download_button(
+        lazy_download_button(
+            "seomonitor_csv",
+            export_stamp(df_seo),
+            lambda: write_csv(df_seo),
             label="Download SEOMonitor CSV",
-            data=csv_seo,
             file_name="seomonitor_data.csv",
-            mime="text/csv"
+            inputs=(df_seo,)
         )
     
     # Export combined report
@@ -0,0 +1,106 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from io import BytesIO
+
+import pandas as pd
+import streamlit as st
+
+from session_memory import dump_session_value
+
+# Local database of finished optimization runs, and how many runs it keeps
+RUN_HISTORY_PATH = os.environ.get("GMC_RUN_HISTORY_PATH", "run_history.sqlite3")
+RUN_HISTORY_MAX_RUNS = int(os.environ.get("GMC_RUN_HISTORY_MAX_RUNS", "50"))
+
+# Run metadata columns listed by RunHistory.runs() (everything except the stored results)
+RUN_COLUMNS = ['run_id', 'created_at', 'source_file', 'engine_version', 'status', 'total_products', 'processed',
+               'changed', 'high_impact', 'duration_seconds', 'gmc_fingerprint', 'seo_fingerprint', 'sitebulb_fingerprint']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    source_file TEXT,
+    engine_version INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    total_products INTEGER NOT NULL,
+    processed INTEGER NOT NULL,
+    changed INTEGER NOT NULL,
+    high_impact INTEGER NOT NULL,
+    duration_seconds REAL NOT NULL,
+    gmc_fingerprint TEXT,
+    seo_fingerprint TEXT,
+    sitebulb_fingerprint TEXT,
+    results BLOB NOT NULL
+)
+"""
+
+
+class RunHistory:
+    """Finished optimization runs persisted in a local SQLite database.
+
+    Each run stores its metadata (input fingerprints, timing, counts) and its
+    pickled results, so any past run can be reloaded without recomputing. Only
+    the newest `max_runs` runs are kept.
+    """
+
+    def __init__(self, path, max_runs):
+        self.path = path
+        self.max_runs = max_runs
+        self._lock = threading.Lock()
+        with self._connect() as connection:
+            connection.execute(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Connection committed on success and always closed"""
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def save(self, results, metadata):
+        """Store a finished run and return its run ID.
+
+        `metadata` holds the RUN_COLUMNS values other than run_id and created_at.
+        """
+        buffer = BytesIO()
+        dump_session_value(results, buffer)
+        blob = zlib.compress(buffer.getvalue(), 1)
+        row = dict(metadata, created_at=time.strftime('%Y-%m-%d %H:%M:%S'), results=blob)
+        names = list(row)
+        with self._lock, self._connect() as connection:
+            cursor = connection.execute(
+                f"INSERT INTO runs ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                [row[name] for name in names]
+            )
+            connection.execute("DELETE FROM runs WHERE run_id NOT IN (SELECT run_id FROM runs ORDER BY run_id DESC LIMIT ?)", (self.max_runs,))
+            return cursor.lastrowid
+
+    def runs(self):
+        """Metadata of the stored runs, newest first"""
+        with self._connect() as connection:
+            rows = connection.execute(f"SELECT {', '.join(RUN_COLUMNS)} FROM runs ORDER BY run_id DESC").fetchall()
+        return pd.DataFrame(rows, columns=RUN_COLUMNS)
+
+    def load(self, run_id):
+        """The stored results of a run, or None if the run no longer exists"""
+        with self._connect() as connection:
+            row = connection.execute("SELECT results FROM runs WHERE run_id = ?", (int(run_id),)).fetchone()
+        return None if row is None else pickle.loads(zlib.decompress(row[0]))
+
+    def delete(self, run_id):
+        with self._lock, self._connect() as connection:
+            connection.execute("DELETE FROM runs WHERE run_id = ?", (int(run_id),))
+
+
+@st.cache_resource
+def get_run_history():
+    """The server's run history database (one connection factory per Streamlit process)"""
+    return RunHistory(RUN_HISTORY_PATH, RUN_HISTORY_MAX_RUNS)
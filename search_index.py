@@ -0,0 +1,69 @@
+import re
+import sqlite3
+import threading
+
+import numpy as np
+
+# Words of a query that isn't valid FTS5 syntax, searched as plain terms
+_QUERY_WORDS = re.compile(r'\w+')
+
+
+def plain_query(text):
+    """FTS5 query matching rows that contain every word of `text`"""
+    return ' '.join('"' + word + '"' for word in _QUERY_WORDS.findall(text))
+
+
+class SearchIndex:
+    """In-memory SQLite FTS5 full-text index over a set of text columns.
+
+    Documents are keyed by row position and only the inverted index is kept
+    (the text itself lives with the caller). Queries use FTS5 syntax - words are
+    ANDed, "oak dining table" matches a phrase, and OR, NOT, prefix* and
+    column:term are supported. Input that isn't valid FTS5 is searched as plain
+    words. The index pickles as a serialized database.
+    """
+
+    def __init__(self, columns):
+        self.names = list(columns)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(':memory:', check_same_thread=False)
+        self._connection.execute(f"CREATE VIRTUAL TABLE documents USING fts5({', '.join(self.names)}, content='', tokenize='unicode61 remove_diacritics 2')")
+        rows = zip(*(columns[name] for name in self.names))
+        self._connection.executemany(
+            f"INSERT INTO documents (rowid, {', '.join(self.names)}) VALUES (?{', ?' * len(self.names)})",
+            ((position,) + tuple(row) for position, row in enumerate(rows))
+        )
+        self._connection.execute("INSERT INTO documents (documents) VALUES ('optimize')")
+        self._connection.commit()
+
+    def search(self, query):
+        """Row positions matching `query`, in ascending order"""
+        query = query.strip()
+        if not query:
+            return np.zeros(0, dtype=int)
+        with self._lock:
+            try:
+                rows = self._connection.execute("SELECT rowid FROM documents WHERE documents MATCH ?", (query,)).fetchall()
+            except sqlite3.OperationalError:
+                query = plain_query(query)
+                if not query:
+                    return np.zeros(0, dtype=int)
+                rows = self._connection.execute("SELECT rowid FROM documents WHERE documents MATCH ?", (query,)).fetchall()
+        return np.sort(np.array([row[0] for row in rows], dtype=int))
+
+    def memory_usage(self):
+        """Bytes held by the index database"""
+        with self._lock:
+            page_count = self._connection.execute("PRAGMA page_count").fetchone()[0]
+            page_size = self._connection.execute("PRAGMA page_size").fetchone()[0]
+        return page_count * page_size
+
+    def __getstate__(self):
+        with self._lock:
+            return {'names': self.names, 'database': self._connection.serialize()}
+
+    def __setstate__(self, state):
+        self.names = state['names']
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(':memory:', check_same_thread=False)
+        self._connection.deserialize(state['database'])
@@ -0,0 +1,290 @@
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+
+import streamlit as st
+from streamlit import runtime
+
+from shared_cache import estimate_size
+
+try:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+except ImportError:
+    get_script_run_ctx = None
+
+# Idle sessions have their large objects spilled to disk after this long, and
+# spilled data is deleted after the longer timeout
+SPILL_AFTER_MINUTES = float(os.environ.get("GMC_SPILL_AFTER_MINUTES", "30"))
+EVICT_AFTER_HOURS = float(os.environ.get("GMC_EVICT_AFTER_HOURS", "8"))
+POLICY_INTERVAL_SECONDS = 60
+
+# Large session values - spilled to disk when idle and reloaded on the next visit
+SPILLABLE_KEYS = ['gmc_feed', 'seomonitor_data', 'sitebulb_data', 'product_data', 'optimization_recommendations']
+
+# Values derived from the spillable ones - dropped when spilling and rebuilt on demand
+DERIVED_KEYS = ['gmc_text', 'recommendation_store', 'export_cache', 'fingerprints', 'memory_usage', 'run_diff', 'sql_engine', 'advanced_query_result', 'keyword_index']
+
+# Background optimization runs - a session with a live one is never idle, finished ones are dropped with its data
+WORKER_KEYS = ['optimization_worker', 'batch_run']
+
+# Session values counted in the sidebar memory figure ("gmc_text" holds (feed, normalized text))
+ACCOUNTED_KEYS = {
+    'gmc_feed': "GMC feed",
+    'seomonitor_data': "SEOMonitor keywords",
+    'sitebulb_data': "Sitebulb crawl",
+    'product_data': "Product data",
+    'optimization_recommendations': "Recommendations",
+    'gmc_text': "Normalized feed text",
+    'export_cache': "Export cache",
+}
+
+
+def _script_global(name):
+    """A class defined by the running Streamlit script, looked up by name"""
+    return getattr(sys.modules['__main__'], name)
+
+
+class ScriptPickler(pickle.Pickler):
+    """Pickler for values holding instances of classes defined in the app script.
+
+    Streamlit executes the script again on every rerun, redefining its classes,
+    so objects created by an earlier run no longer match the script's current
+    class and the standard pickler refuses them. Script classes are pickled by
+    name instead and resolve to the current definition when loaded.
+    """
+
+    def reducer_override(self, obj):
+        if isinstance(obj, type) and obj.__module__ == '__main__':
+            return _script_global, (obj.__qualname__,)
+        return NotImplemented
+
+
+def dump_session_value(value, f):
+    """Pickle a session value (which may hold app script objects) to a file"""
+    ScriptPickler(f, protocol=pickle.HIGHEST_PROTOCOL).dump(value)
+
+
+def _accounted_value(key, value):
+    return value[1] if key == 'gmc_text' else value
+
+
+def session_memory_usage():
+    """Approximate memory held by each of this session's large values, in bytes.
+
+    Sizes are measured once per object and reused until the value is replaced.
+    """
+    memo = st.session_state.setdefault('memory_usage', {})
+    usage = {}
+    for key, label in ACCOUNTED_KEYS.items():
+        value = st.session_state.get(key)
+        if value is None:
+            memo.pop(key, None)
+            continue
+        entry = memo.get(key)
+        if entry is None or entry[0] is not value:
+            entry = (value, estimate_size(_accounted_value(key, value)))
+            memo[key] = entry
+        usage[label] = entry[1]
+    return usage
+
+
+class _SessionEntry:
+    def __init__(self, state):
+        self.state = state
+        self.last_seen = time.time()
+        self.spill_path = None
+        self.lock = threading.Lock()
+
+
+class SessionRegistry:
+    """Server-wide record of sessions and their idle-memory policy.
+
+    Every script run touches its session, reloading anything that was spilled.
+    Sessions idle for SPILL_AFTER_MINUTES have their large values pickled to
+    disk and dropped from memory; after EVICT_AFTER_HOURS the spill file
+    is deleted. The policy runs on every script run and on a background timer.
+    """
+
+    def __init__(self, spill_after, evict_after):
+        self.spill_after = spill_after
+        self.evict_after = evict_after
+        self._entries = {}
+        self._evicted = set()
+        self._lock = threading.Lock()
+        self._timer = threading.Thread(target=self._run_policy_timer, name="gmc-session-memory-policy", daemon=True)
+        self._timer.start()
+
+    def touch(self, session_id, state):
+        """Mark the session active and reload its spilled values.
+
+        Returns True if the session's values were evicted while it was idle, so
+        the page can ask the user to load them again.
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or entry.state is not state:
+                entry = self._entries[session_id] = _SessionEntry(state)
+
+        with entry.lock:
+            # Read after taking the entry lock, so an eviction that was in progress is reported
+            with self._lock:
+                evicted = session_id in self._evicted
+                self._evicted.discard(session_id)
+            entry.last_seen = time.time()
+            if entry.spill_path:
+                with open(entry.spill_path, 'rb') as f:
+                    for key, value in pickle.load(f).items():
+                        state[key] = value
+            self._remove_spill_file(entry)
+        return evicted
+
+    def seen(self, session_id):
+        """Mark a known session active without reloading anything (a spilled session reloads on its next full run)"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+        if entry is not None:
+            with entry.lock:
+                entry.last_seen = time.time()
+
+    def enforce(self, active_session_id=None):
+        """Spill idle sessions and evict the ones idle past the timeout"""
+        now = time.time()
+        with self._lock:
+            entries = list(self._entries.items())
+        for session_id, entry in entries:
+            if session_id == active_session_id:
+                continue
+            state = entry.state
+            idle = now - entry.last_seen
+            if _session_closed(session_id):
+                # Session closed - its spilled data can never be reloaded
+                self._drop(session_id, entry)
+            elif idle > self.evict_after:
+                self._evict(session_id, entry, state)
+            elif idle > self.spill_after and not entry.spill_path:
+                self._spill(entry, state)
+
+    def stats(self):
+        with self._lock:
+            entries = list(self._entries.values())
+        return {'sessions': len(entries), 'spilled': sum(1 for entry in entries if entry.spill_path)}
+
+    def _spill(self, entry, state):
+        if not entry.lock.acquire(blocking=False):
+            return
+        try:
+            if time.time() - entry.last_seen <= self.spill_after:
+                return  # Ran again since the idle check
+            if _worker_alive(state):
+                return  # Still optimizing - not idle
+            values = {key: _state_get(state, key) for key in SPILLABLE_KEYS}
+            values = {key: value for key, value in values.items() if value is not None}
+            if not values:
+                return
+            # One pickle for all values, so objects shared between them (the
+            # recommendations reference the feed) are restored as one object
+            handle, path = tempfile.mkstemp(prefix="gmc_session_", suffix=".pkl")
+            with os.fdopen(handle, 'wb') as f:
+                dump_session_value(values, f)
+            entry.spill_path = path
+            for key in values:
+                del state[key]
+            for key in DERIVED_KEYS + WORKER_KEYS:
+                if _state_get(state, key) is not None:
+                    del state[key]
+        finally:
+            entry.lock.release()
+
+    def _evict(self, session_id, entry, state):
+        with entry.lock:
+            # Re-checked under the lock - the session may have run again since the idle check
+            if time.time() - entry.last_seen <= self.evict_after or _worker_alive(state):
+                return
+            self._remove_spill_file(entry)
+            for key in SPILLABLE_KEYS + DERIVED_KEYS + WORKER_KEYS:
+                if _state_get(state, key) is not None:
+                    del state[key]
+            with self._lock:
+                if self._entries.get(session_id) is entry:
+                    del self._entries[session_id]
+                self._evicted.add(session_id)
+
+    def _drop(self, session_id, entry):
+        with entry.lock:
+            self._remove_spill_file(entry)
+        with self._lock:
+            if self._entries.get(session_id) is entry:
+                del self._entries[session_id]
+
+    @staticmethod
+    def _remove_spill_file(entry):
+        if entry.spill_path:
+            try:
+                os.remove(entry.spill_path)
+            except OSError:
+                pass
+            entry.spill_path = None
+
+    def _run_policy_timer(self):
+        while True:
+            time.sleep(POLICY_INTERVAL_SECONDS)
+            try:
+                self.enforce()
+            except Exception:
+                pass
+
+
+def _session_closed(session_id):
+    return runtime.exists() and not runtime.get_instance().is_active_session(session_id)
+
+
+def _worker_alive(state):
+    workers = [_state_get(state, key) for key in WORKER_KEYS]
+    return any(worker is not None and worker.is_alive() for worker in workers)
+
+
+def _state_get(state, key):
+    try:
+        return state[key]
+    except KeyError:
+        return None
+
+
+@st.cache_resource
+def get_session_registry():
+    """The server's session registry (one instance per Streamlit process)"""
+    return SessionRegistry(SPILL_AFTER_MINUTES * 60, EVICT_AFTER_HOURS * 3600)
+
+
+def _current_session():
+    """(session id, session state) of the running script, or None outside Streamlit"""
+    ctx = get_script_run_ctx() if get_script_run_ctx is not None else None
+    # The session's underlying state outlives a single script run
+    state = getattr(getattr(ctx, 'session_state', None), '_state', None)
+    return (ctx.session_id, state) if state is not None else None
+
+
+def manage_session_memory():
+    """Apply the idle-session policy and reload this session's spilled data.
+
+    Call at the start of every script run, before session values are read.
+    Returns True if this session's data was evicted while it was idle.
+    """
+    session = _current_session()
+    if session is None:
+        return False
+    session_id, state = session
+    registry = get_session_registry()
+    evicted = registry.touch(session_id, state)
+    registry.enforce(active_session_id=session_id)
+    return evicted
+
+
+def record_activity():
+    """Keep this session from going idle during fragment reruns, which skip manage_session_memory"""
+    session = _current_session()
+    if session is not None:
+        get_session_registry().seen(session[0])
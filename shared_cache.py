@@ -0,0 +1,152 @@
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Memory budget of the process-wide cache, shared by every session on the server
+SHARED_CACHE_MB = int(os.environ.get("GMC_SHARED_CACHE_MB", "512"))
+
+# Lists longer than this are sized from an evenly spaced sample of their items
+SIZE_SAMPLE_ITEMS = 1000
+
+
+def _hash_column(values):
+    """Stable hash bytes for one column, falling back to repr for unhashable cells (nested JSON)"""
+    try:
+        hashed = pd.util.hash_pandas_object(values, index=False, categorize=False)
+    except TypeError:
+        hashed = pd.util.hash_pandas_object(values.map(repr), index=False, categorize=False)
+    return hashed.to_numpy().tobytes()
+
+
+def fingerprint(*inputs):
+    """Content fingerprint of DataFrames and plain values - equal data gives an equal fingerprint"""
+    digest = hashlib.sha1()
+    for value in inputs:
+        if isinstance(value, pd.DataFrame):
+            digest.update(repr((list(value.columns), len(value))).encode())
+            digest.update(_hash_column(value.index.to_series()))
+            for column in value.columns:
+                digest.update(_hash_column(value[column]))
+        else:
+            digest.update(repr(value).encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def session_fingerprint(name, df):
+    """Fingerprint of the session's `name` DataFrame, hashed once per loaded object"""
+    cache = st.session_state.setdefault('fingerprints', {})
+    entry = cache.get(name)
+    if entry is None or entry[0] is not df:
+        entry = (df, fingerprint(df))
+        cache[name] = entry
+    return entry[1]
+
+
+def estimate_size(value, _seen=None):
+    """Approximate memory held by a value in bytes (deep for DataFrames, lists, dicts and objects).
+
+    Objects with a memory_usage() method report their own size.
+    """
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = list(value)
+        size = sys.getsizeof(value)
+        if len(items) > SIZE_SAMPLE_ITEMS:
+            step = len(items) / SIZE_SAMPLE_ITEMS
+            sample = [items[int(i * step)] for i in range(SIZE_SAMPLE_ITEMS)]
+            return size + int(sum(estimate_size(item, seen) for item in sample) * step)
+        return size + sum(estimate_size(item, seen) for item in items)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in value.items())
+    if callable(getattr(value, 'memory_usage', None)) and not isinstance(value, type):
+        # Objects that know their own footprint (e.g. compact recommendation sets)
+        return int(value.memory_usage())
+    if hasattr(value, '__dict__') and not isinstance(value, type):
+        return sys.getsizeof(value) + estimate_size(vars(value), seen)
+    return sys.getsizeof(value)
+
+
+class SharedCache:
+    """Process-wide LRU cache with a memory budget, shared by all sessions.
+
+    Values are keyed by content fingerprints, so any session loading the same
+    data gets the same entry. Least recently used entries are evicted once the
+    estimated size of all entries exceeds `max_bytes`.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._building = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size=None):
+        size = estimate_size(value) if size is None else size
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def get_or_build(self, key, build):
+        """Cached value for `key`, building it once even if several sessions ask at the same time"""
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            key_lock = self._building.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            value = entry[0] if entry is not None else None
+            if value is None:
+                value = build()
+                self.put(key, value)
+        with self._lock:
+            self._building.pop(key, None)
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'max_bytes': self.max_bytes, 'hits': self.hits, 'misses': self.misses}
+
+
+@st.cache_resource
+def get_shared_cache():
+    """The server's shared cache (one instance per Streamlit process)"""
+    return SharedCache(SHARED_CACHE_MB * 1024 * 1024)
@@ -1,11 +1,14 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import requests
 import json
-import configparser
+import functools
+import heapq
 import os
-from datetime import datetime, timedelta
+import re
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
 st.set_page_config(
     page_title="Oak Furniture Land GMC Feed Optimizer",
@@ -184,53 +187,2110 @@ h3 {
     border-radius: 8px;
 }
 
-/* Code blocks */
-.stCode {
-    font-family: 'JetBrains Mono', 'Courier New', monospace;
-    font-size: 0.9rem;
-    background: #f7fafc;
-    border-radius: 6px;
-    padding: 0.5rem;
-}
+/* Code blocks */
+.stCode {
+    font-family: 'JetBrains Mono', 'Courier New', monospace;
+    font-size: 0.9rem;
+    background: #f7fafc;
+    border-radius: 6px;
+    padding: 0.5rem;
+}
+
+/* Progress bar styling */
+.stProgress > div > div {
+    border-radius: 8px;
+    background: linear-gradient(90deg, #805ad5 0%, #667eea 100%);
+}
+
+/* Selectbox and input styling */
+.stSelectbox > div > div,
+.stTextInput > div > div > input {
+    font-family: 'Inter', sans-serif;
+    font-weight: 400;
+    border-radius: 6px;
+}
+
+/* File uploader styling */
+.stFileUploader > div {
+    font-family: 'Inter', sans-serif;
+    border-radius: 8px;
+    border: 2px dashed #cbd5e0;
+    transition: all 0.2s ease;
+}
+
+.stFileUploader > div:hover {
+    border-color: #805ad5;
+    background: #f7fafc;
+}
+</style>
+""", unsafe_allow_html=True)
+
+# Authentication system
+def check_credentials(username, password):
+    """Check if credentials are valid"""
+    valid_users = {
+        "oakfurniture": "OFL2024!",
+        "admin": "Admin123!",
+        "seo": "SEO2024!"
+    }
+    return valid_users.get(username) == password
+
+# Engine results are shared between sessions by content fingerprint - bump this
+# whenever normalization, extraction or rule changes alter the output
+ENGINE_VERSION = 3
+
+# Feed text normalization - done once at ingestion, shared by every engine rule
+def _text_column(df, column):
+    """Column as text, matching str(product.get(column, '')) for every row"""
+    if column not in df.columns:
+        return pd.Series('', index=df.index, dtype=object)
+    values = df[column].astype(object)
+    return values.where(values.notna(), 'nan').astype(str).astype(object)
+
+def normalize_feed_text(df_gmc):
+    """Lowercased title/description, combined text and tokens for every product"""
+    feed_text = pd.DataFrame({
+        'title': _text_column(df_gmc, 'title'),
+        'description': _text_column(df_gmc, 'description')
+    })
+    feed_text['title_lower'] = feed_text['title'].str.lower()
+    feed_text['description_lower'] = feed_text['description'].str.lower()
+    feed_text['text'] = feed_text['title_lower'] + ' ' + feed_text['description_lower']
+    feed_text['tokens'] = feed_text['text'].str.split()
+    return feed_text
+
+# Furniture attribute extraction - vocabularies compiled once, matched across the whole feed
+# Entries are checked in order and the first one contained in the product text wins
+FURNITURE_TYPES = {
+    'sofa': ['sofa', 'settee', 'couch', 'recliner'],
+    'chair': ['chair', 'dining chair', 'office chair', 'armchair'],
+    'table': ['table', 'dining table', 'coffee table', 'side table', 'desk'],
+    'bed': ['bed', 'bedroom', 'mattress', 'headboard'],
+    'storage': ['wardrobe', 'cabinet', 'dresser', 'bookshelf', 'storage'],
+    'dining': ['dining', 'dining room', 'dining set'],
+    'living': ['living room', 'lounge', 'living'],
+    'office': ['office', 'desk', 'office chair', 'office furniture']
+}
+MATERIALS = ['oak', 'wood', 'fabric', 'leather', 'metal', 'glass', 'marble', 'mink', 'velvet', 'cotton', 'linen', 'beige', 'plush', 'modular']
+COLORS = ['beige', 'brown', 'grey', 'gray', 'white', 'black', 'navy', 'blue']
+SIZES = {'2 seat': '2 Seater', '3 seat': '3 Seater', '4 seat': '4 Seater', 'corner': 'Corner', 'modular': 'Modular'}
+STYLES = ['modern', 'contemporary', 'traditional', 'classic', 'luxury', 'premium']
+SPECIAL_FEATURES = {'recliner': 'Recliner', 'storage': 'Storage', 'power': 'Power'}
+
+def _vocabulary_patterns(terms):
+    return [re.compile(re.escape(term)) for term in terms]
+
+FURNITURE_TYPE_PATTERNS = [re.compile('|'.join(re.escape(term) for term in terms)) for terms in FURNITURE_TYPES.values()]
+MATERIAL_PATTERNS = _vocabulary_patterns(MATERIALS)
+COLOR_PATTERNS = _vocabulary_patterns(COLORS)
+SIZE_PATTERNS = _vocabulary_patterns(SIZES)
+STYLE_PATTERNS = _vocabulary_patterns(STYLES)
+FEATURE_PATTERNS = _vocabulary_patterns(SPECIAL_FEATURES)
+
+def _vocabulary_hits(text, patterns):
+    """Boolean matrix (products x patterns) of which patterns occur in each text"""
+    if not patterns or len(text) == 0:
+        return np.zeros((len(text), len(patterns)), dtype=bool)
+    return np.column_stack([text.str.contains(pattern).to_numpy(dtype=bool) for pattern in patterns])
+
+def _first_match(text, patterns, labels):
+    """Label of the first pattern (in vocabulary order) found in each text, None if none match"""
+    hits = _vocabulary_hits(text, patterns)
+    labels = np.array(list(labels) + [None], dtype=object)
+    first = np.where(hits.any(axis=1), hits.argmax(axis=1), len(labels) - 1)
+    return labels[first]
+
+def extract_furniture_attributes(text):
+    """Product type, material, color, size, style, features and brand for every product text"""
+    def has(term):
+        return text.str.contains(term, regex=False).to_numpy(dtype=bool)
+    
+    # Material, with the fabric/leather sofa and oak table/chair special cases taking priority
+    material = np.select(
+        [has('fabric') & has('sofa'), has('leather') & has('sofa'), has('oak') & (has('table') | has('chair'))],
+        ['fabric', 'leather', 'oak'],
+        default=_first_match(text, MATERIAL_PATTERNS, MATERIALS)
+    )
+    
+    feature_hits = _vocabulary_hits(text, FEATURE_PATTERNS)
+    feature_labels = list(SPECIAL_FEATURES.values())
+    
+    return pd.DataFrame({
+        'product_type': _first_match(text, FURNITURE_TYPE_PATTERNS, FURNITURE_TYPES),
+        'material': material,
+        'color': _first_match(text, COLOR_PATTERNS, COLORS),
+        'size': _first_match(text, SIZE_PATTERNS, SIZES.values()),
+        'style': _first_match(text, STYLE_PATTERNS, STYLES),
+        'features': [tuple(label for label, hit in zip(feature_labels, row) if hit) for row in feature_hits],
+        'brand': np.where(has('oak furnitureland'), 'Oak Furnitureland', None)
+    }, index=text.index, dtype=object)
+
+def build_feed_text(df_gmc):
+    """Normalized text and furniture attributes of every product in a feed"""
+    feed_text = normalize_feed_text(df_gmc)
+    return feed_text.join(extract_furniture_attributes(feed_text['text']))
+
+def get_feed_text(df_gmc):
+    """Normalized text and furniture attributes for the session's feed, recomputed only when a new feed is loaded.
+    
+    Sessions loading the same feed share one copy through the server's shared cache.
+    """
+    cached = st.session_state.get('gmc_text')
+    if cached is None or cached[0] is not df_gmc:
+        key = ('feed_text', ENGINE_VERSION, session_fingerprint('gmc', df_gmc))
+        cached = (df_gmc, get_shared_cache().get_or_build(key, lambda: build_feed_text(df_gmc)))
+        st.session_state['gmc_text'] = cached
+    return cached[1]
+
+# Optimization engine
+# Keywords sharing any of these terms are treated as relevant to every product
+FURNITURE_TERMS = {'sofa', 'chair', 'table', 'desk', 'bed', 'furniture', 'oak', 'wood', 'fabric', 'leather', 'dining', 'living', 'bedroom', 'office', 'recliner', 'storage', 'cabinet', 'wardrobe', 'dresser', 'bookshelf', 'coffee', 'side', 'dining', 'kitchen', 'bathroom', 'outdoor', 'garden'}
+
+def extract_keyword_metrics(keyword_row):
+    """Search volume, position, difficulty and product grid position of one SEOMonitor keyword row"""
+    # Extract search volume from nested data structures
+    search_volume = 0
+    position = 999
+    difficulty = 0
+    
+    # Try to extract search volume from different possible locations
+    try:
+        # Method 1: Direct search_volume field
+        search_volume = keyword_row.get('search_volume', 0)
+    except:
+        pass
+    
+    if search_volume == 0:
+        try:
+            # Method 2: Alternative field names
+            search_volume = keyword_row.get('volume', 0)
+            if search_volume == 0:
+                search_volume = keyword_row.get('monthly_searches', 0)
+            if search_volume == 0:
+                search_volume = keyword_row.get('search_volume_monthly', 0)
+        except:
+            pass
+    
+    if search_volume == 0:
+        try:
+            # Method 3: From search_data (nested JSON)
+            search_data = keyword_row.get('search_data', {})
+            if isinstance(search_data, dict):
+                search_volume = search_data.get('search_volume', 0)
+                if search_volume == 0:
+                    search_volume = search_data.get('volume', 0)
+                if search_volume == 0:
+                    search_volume = search_data.get('monthly_searches', 0)
+            elif isinstance(search_data, list) and len(search_data) > 0:
+                search_volume = search_data[0].get('search_volume', 0)
+                if search_volume == 0:
+                    search_volume = search_data[0].get('volume', 0)
+                if search_volume == 0:
+                    search_volume = search_data[0].get('monthly_searches', 0)
+        except:
+            pass
+    
+    if search_volume == 0:
+        try:
+            # Method 4: From traffic_data (nested JSON)
+            traffic_data = keyword_row.get('traffic_data', {})
+            if isinstance(traffic_data, dict):
+                search_volume = traffic_data.get('search_volume', 0)
+                if search_volume == 0:
+                    search_volume = traffic_data.get('volume', 0)
+                if search_volume == 0:
+                    search_volume = traffic_data.get('monthly_searches', 0)
+        except:
+            pass
+    
+    # Try to extract position from different possible locations
+    try:
+        # Method 1: Direct position field
+        position = keyword_row.get('position', 999)
+    except:
+        pass
+    
+    if position == 999:
+        try:
+            # Method 2: From ranking_data (nested JSON)
+            ranking_data = keyword_row.get('ranking_data', {})
+            if isinstance(ranking_data, dict):
+                position = ranking_data.get('desktop', {}).get('rank', 999)
+                if position == 999:
+                    position = ranking_data.get('mobile', {}).get('rank', 999)
+        except:
+            pass
+    
+    # Try to extract difficulty from different possible locations
+    try:
+        # Method 1: Direct difficulty field
+        difficulty = keyword_row.get('difficulty', 0)
+    except:
+        pass
+    
+    if difficulty == 0:
+        try:
+            # Method 2: From opportunity field
+            opportunity = keyword_row.get('opportunity', {})
+            if isinstance(opportunity, dict):
+                difficulty = opportunity.get('difficulty', 0)
+            elif isinstance(opportunity, str):
+                # Convert text difficulty to numeric
+                if 'top_30' in opportunity.lower():
+                    difficulty = 30
+                elif 'top_10' in opportunity.lower():
+                    difficulty = 10
+                elif 'top_50' in opportunity.lower():
+                    difficulty = 50
+        except:
+            pass
+    
+    # Extract product grid ranking data (Shopping/Product results)
+    product_grid_position = 999
+    try:
+        # Look for shopping/product grid rankings
+        serp_data = keyword_row.get('serp_data', {})
+        if isinstance(serp_data, dict):
+            # Check for shopping results
+            shopping_results = serp_data.get('shopping_results', {})
+            if isinstance(shopping_results, dict):
+                product_grid_position = shopping_results.get('position', 999)
+    
+            # Check for product results
+            product_results = serp_data.get('product_results', {})
+            if isinstance(product_results, dict):
+                product_grid_position = product_results.get('position', 999)
+    
+            # Check for local pack results
+            local_pack = serp_data.get('local_pack', {})
+            if isinstance(local_pack, dict):
+                product_grid_position = local_pack.get('position', 999)
+    except:
+        pass
+    
+    # Ensure all values are numbers
+    try:
+        search_volume = float(search_volume) if search_volume is not None else 0
+        position = float(position) if position is not None else 999
+        difficulty = float(difficulty) if difficulty is not None else 0
+    except (ValueError, TypeError):
+        search_volume = 0
+        position = 999
+        difficulty = 0    
+    return search_volume, position, difficulty, product_grid_position
+
+# Keyword buckets - a keyword belongs to every bucket whose condition it meets
+KEYWORD_BUCKETS = {
+    'easy_win': lambda kw: (kw['difficulty'] < 30) & (kw['search_volume'] > 300) & (kw['position'] > 30),
+    'grid_opportunity': lambda kw: (kw['grid_rank'] > 10) & (kw['search_volume'] > 200),
+    'grid_winner': lambda kw: (kw['grid_rank'] <= 5) & (kw['search_volume'] > 100),
+    'top_performer': lambda kw: kw['position'] <= 10,
+    'poor_performer': lambda kw: (kw['position'] > 20) & (kw['search_volume'] > 500),
+    'missing_opportunity': lambda kw: (kw['search_volume'] > 1000) & (kw['position'] > 50)
+}
+
+# Keyword canonicalization - near-duplicate keywords (plurals, reordered words,
+# stop-word variants) share a canonical form and are matched once as a cluster
+KEYWORD_STOP_WORDS = {'a', 'an', 'and', 'the', 'for', 'with', 'of', 'in', 'on', 'to', 'by'}
+KEYWORD_TOKEN_PATTERN = re.compile(r'\w+')
+
+def stem_keyword_word(word):
+    """Light plural stemming: tables -> table, benches -> bench, accessories -> accessory"""
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if word.endswith(('sses', 'shes', 'ches', 'xes')):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+def canonical_keyword(keyword):
+    """Sorted stemmed words of a keyword without stop words ("Oak Dining Tables" -> "dining oak table")"""
+    words = KEYWORD_TOKEN_PATTERN.findall(keyword.lower())
+    stems = sorted(stem_keyword_word(word) for word in words if word not in KEYWORD_STOP_WORDS)
+    return ' '.join(stems or words)
+
+class KeywordStore:
+    """Normalized form of every distinct keyword text, computed once and shared by keyword tables.
+    
+    Each keyword is held once with its canonical (cluster) form, lowercase text,
+    word set and furniture flag. A batch run builds one store over the union of
+    its campaigns' keywords, so keywords tracked by several campaigns are
+    normalized once and every campaign's table reads its rows from the store.
+    Keywords not in the store yet are normalized and added when looked up.
+    """
+    
+    def __init__(self, keywords=()):
+        self.table = self._normalize([])
+        self._lock = threading.Lock()
+        self.add(keywords)
+    
+    @staticmethod
+    def _normalize(keywords):
+        lower = [keyword.lower() for keyword in keywords]
+        words = [frozenset(keyword.split()) for keyword in lower]
+        return pd.DataFrame({
+            'canonical': [canonical_keyword(keyword) for keyword in keywords],
+            'keyword_lower': lower,
+            'words': words,
+            'furniture': [not keyword_words.isdisjoint(FURNITURE_TERMS) for keyword_words in words]
+        }, index=pd.Index(keywords, dtype=object), dtype=object)
+    
+    def add(self, keywords):
+        with self._lock:
+            new = pd.Index(keywords, dtype=object).unique().difference(self.table.index, sort=False)
+            if len(new):
+                self.table = pd.concat([self.table, self._normalize(list(new))])
+    
+    def lookup(self, keywords):
+        """Normalized forms of `keywords`, one row per keyword in the given order"""
+        self.add(keywords)
+        table = self.table
+        rows = table.iloc[table.index.get_indexer(pd.Index(keywords, dtype=object))]
+        return rows.reset_index(drop=True).astype({'furniture': bool})
+    
+    def __len__(self):
+        return len(self.table)
+
+def cluster_keywords(keywords, store=None):
+    """Collapse keywords sharing a canonical form into one row per cluster.
+    
+    `keywords` must be ordered by search volume. Each cluster is represented by
+    its highest-volume keyword (with its difficulty); search volume is summed
+    over the cluster and position and product grid position are the best of any
+    member. `variants` lists the members as (keyword, search volume, position)
+    and the result is reordered by the cluster search volume. Canonical forms
+    are read from `store` (a KeywordStore) when given.
+    """
+    store = store if store is not None else KeywordStore(keywords['keyword'])
+    keywords = keywords.assign(canonical=store.lookup(keywords['keyword'])['canonical'].tolist())
+    keywords['grid_rank'] = pd.to_numeric(keywords['product_grid_position'], errors='coerce')
+    grouped = keywords.groupby('canonical', sort=False)
+    clusters = grouped.agg(keyword=('keyword', 'first'), search_volume=('search_volume', 'sum'), position=('position', 'min'), difficulty=('difficulty', 'first'))
+    variants = {}
+    for canonical, keyword, search_volume, position in zip(keywords['canonical'], keywords['keyword'], keywords['search_volume'], keywords['position']):
+        variants.setdefault(canonical, []).append((keyword, search_volume, position))
+    clusters['variants'] = [tuple(variants[canonical]) for canonical in clusters.index]
+    
+    # Best product grid position of each cluster (the representative's own value when no member has a numeric one)
+    best_grid = keywords.sort_values('grid_rank', kind='stable', na_position='last').drop_duplicates('canonical').set_index('canonical')
+    clusters['product_grid_position'] = best_grid['product_grid_position']
+    
+    clusters = clusters.reset_index()
+    order = np.argsort(-clusters['search_volume'].to_numpy(dtype=float), kind='stable')
+    return clusters.iloc[order][['keyword', 'search_volume', 'position', 'difficulty', 'product_grid_position', 'canonical', 'variants']].reset_index(drop=True)
+
+def build_keyword_table(df_seo, store=None):
+    """Parse the SEOMonitor keywords once into a table of keyword clusters with search volume.
+    
+    Near-duplicate keywords are merged by cluster_keywords(). Rows are ordered by
+    search volume (highest first, ties keep SEOMonitor order), so the first
+    relevant keyword in a bucket is always the one to target. Keyword text is
+    normalized through `store` (a KeywordStore shared between campaigns) when given.
+    """
+    rows = []
+    for _, keyword_row in df_seo.iterrows():
+        keyword = str(keyword_row.get('keyword', ''))
+        if keyword:
+            search_volume, position, difficulty, product_grid_position = extract_keyword_metrics(keyword_row)
+            if search_volume > 0:
+                rows.append((keyword, search_volume, position, difficulty, product_grid_position))
+    
+    keywords = pd.DataFrame(rows, columns=['keyword', 'search_volume', 'position', 'difficulty', 'product_grid_position'])
+    keywords = keywords.iloc[np.argsort(-keywords['search_volume'].to_numpy(dtype=float), kind='stable')].reset_index(drop=True)
+    keywords['keyword'] = keywords['keyword'].astype(object)
+    store = store if store is not None else KeywordStore(keywords['keyword'])
+    keywords = cluster_keywords(keywords, store)
+    keywords['product_grid_position'] = keywords['product_grid_position'].astype(object)
+    keywords['grid_rank'] = pd.to_numeric(keywords['product_grid_position'], errors='coerce')
+    forms = store.lookup(keywords['keyword'])
+    keywords['keyword_lower'] = forms['keyword_lower'].astype(object)
+    keywords['words'] = forms['words'].tolist()
+    keywords['furniture'] = forms['furniture'].tolist()
+    for bucket, condition in KEYWORD_BUCKETS.items():
+        keywords[bucket] = condition(keywords).to_numpy(dtype=bool)
+    return keywords
+
+# Only the best keyword of each bucket and the top few overall are ever used
+TOP_KEYWORDS = 3
+
+class KeywordMatcher:
+    """Best relevant keyword positions (into the keyword table) for products.
+    
+    A keyword is relevant when it shares a furniture term, appears verbatim in the
+    product text, or shares at least two words with it. Relevance only depends on
+    the normalized product text, so duplicate and variant products sharing a text
+    are matched once per run and the result is reused for every member.
+    
+    Furniture keywords are relevant to every product, so their best positions are
+    found once. Because the table is sorted by search volume, a product-specific
+    keyword can only matter if it sits before those positions - only that bounded
+    prefix of the table is checked per product group.
+    """
+    
+    def __init__(self, keywords):
+        self.keywords = keywords
+        furniture = keywords['furniture'].to_numpy(dtype=bool)
+        furniture_positions = np.flatnonzero(furniture)
+        self.bucket_masks = {bucket: keywords[bucket].to_numpy(dtype=bool) for bucket in KEYWORD_BUCKETS}
+        
+        # Best furniture keyword per bucket, and how far down the table a
+        # product-specific keyword could still beat it
+        self.furniture_best = {}
+        bound = furniture_positions[TOP_KEYWORDS - 1] if len(furniture_positions) >= TOP_KEYWORDS else len(keywords)
+        for bucket, mask in self.bucket_masks.items():
+            in_bucket = np.flatnonzero(mask)
+            furniture_in_bucket = in_bucket[furniture[in_bucket]]
+            self.furniture_best[bucket] = furniture_in_bucket[0] if len(furniture_in_bucket) else -1
+            bucket_bound = self.furniture_best[bucket] if len(furniture_in_bucket) else (in_bucket[-1] + 1 if len(in_bucket) else 0)
+            bound = max(bound, bucket_bound)
+        self.furniture_top = furniture_positions[:TOP_KEYWORDS].tolist()
+        
+        # Product-specific keywords within the bound, with an inverted index
+        # word -> keyword positions to count shared words
+        self.specific = np.flatnonzero(~furniture[:bound])
+        self.specific_lower = keywords['keyword_lower'].to_numpy()[self.specific].tolist()
+        postings = {}
+        for position in self.specific:
+            for word in keywords['words'].iat[position]:
+                postings.setdefault(word, []).append(position)
+        self.postings = {word: np.array(positions) for word, positions in postings.items()}
+        
+        # Normalized product text -> match result of its group
+        self._groups = {}
+    
+    def match(self, feed_text):
+        """One row per product with the best keyword of each bucket (-1 if none) and the top TOP_KEYWORDS overall"""
+        results = []
+        for text, tokens in zip(feed_text['text'], feed_text['tokens']):
+            result = self._groups.get(text)
+            if result is None:
+                result = self._groups[text] = self._match_text(text, tokens)
+            results.append(result)
+        return pd.DataFrame(results, columns=['has_relevant', 'top_keywords'] + list(KEYWORD_BUCKETS), index=feed_text.index)
+    
+    def _match_text(self, text, tokens):
+        hits = [self.postings[word] for word in set(tokens) if word in self.postings]
+        if hits:
+            positions, shared_words = np.unique(np.concatenate(hits), return_counts=True)
+            shared = positions[shared_words >= 2]
+        else:
+            shared = self.specific[:0]
+        in_text = np.fromiter((keyword in text for keyword in self.specific_lower), dtype=bool, count=len(self.specific_lower))
+        relevant = np.union1d(shared, self.specific[in_text])
+        
+        top_keywords = heapq.nsmallest(TOP_KEYWORDS, heapq.merge(self.furniture_top, relevant.tolist()))
+        bests = []
+        for bucket, mask in self.bucket_masks.items():
+            in_bucket = relevant[mask[relevant]]
+            best = self.furniture_best[bucket]
+            if len(in_bucket) and (best < 0 or in_bucket[0] < best):
+                best = in_bucket[0]
+            bests.append(best)
+        return (len(top_keywords) > 0, np.array(top_keywords, dtype=int), *bests)
+
+def competitor_context(df_seo):
+    """Competitor, product grid competitor and keyword gap insights - identical for every product"""
+    context = {'competitor': ("", 0), 'grid_competitor': ("", 0), 'current_rankings': False, 'keyword_gap': ("", 0)}
+    furniture_pattern = '|'.join(['sofa', 'chair', 'table', 'furniture'])
+    try:
+        # Find keywords where competitors might be ranking better
+        competitor_keywords = df_seo[
+            (df_seo['search_volume'] > 1000) & 
+            (df_seo['position'] > 20) &
+            (df_seo['keyword'].str.contains(furniture_pattern, case=False, na=False))
+        ]
+        
+        if not competitor_keywords.empty:
+            context['competitor'] = (f" | Competitor opportunity: {competitor_keywords.iloc[0]['keyword']} ({competitor_keywords.iloc[0]['search_volume']:,} searches)", 20)
+        
+        # Add product grid competitor analysis
+        product_grid_competitors = df_seo[
+            (df_seo['search_volume'] > 500) & 
+            (df_seo['product_grid_position'] <= 5) &
+            (df_seo['position'] > 10) &
+            (df_seo['keyword'].str.contains(furniture_pattern, case=False, na=False))
+        ]
+        
+        if not product_grid_competitors.empty:
+            context['grid_competitor'] = (f" | Product grid competitor: '{product_grid_competitors.iloc[0]['keyword']}' ranks #{product_grid_competitors.iloc[0]['product_grid_position']} in shopping but #{product_grid_competitors.iloc[0]['position']} organic", 25)
+        
+        # Current ranking insights are added per product
+        context['current_rankings'] = True
+    except KeyError:
+        # search_volume column doesn't exist, skip competitor analysis
+        pass
+    
+    try:
+        # Find high-volume keywords competitors rank for but we don't
+        all_high_volume = df_seo[
+            (df_seo['search_volume'] > 1000) & 
+            (df_seo['position'] > 50) &
+            (df_seo['keyword'].str.contains('|'.join(['sofa', 'chair', 'table', 'furniture', 'oak', 'dining', 'bedroom']), case=False, na=False))
+        ].sort_values('search_volume', ascending=False)
+        
+        if not all_high_volume.empty:
+            gap_keyword = all_high_volume.iloc[0]['keyword']
+            gap_volume = all_high_volume.iloc[0]['search_volume']
+            context['keyword_gap'] = (f" | Keyword gap: '{gap_keyword}' ({gap_volume:,} searches) - competitors rank but we don't", 30)
+    except KeyError:
+        pass
+    
+    return context
+
+# Keyword relevance scoring - BM25 over all products and keywords at once
+# Scores are accumulated into a dense block of products x keywords of at most this many cells
+RELEVANCE_BLOCK_CELLS = 4_000_000
+
+def score_keyword_relevance(feed_text, keywords, top_n=5, k1=1.2, b=0.75):
+    """Top `top_n` keywords per product ranked by BM25 relevance.
+    
+    Products are the documents and each keyword is a query of its words. Term
+    weights are built for the whole feed in one pass; product x keyword scores
+    are then summed block by block with a sparse join on shared terms.
+    Returns one row per (product, rank) with the product's position in
+    feed_text, the keyword and its score; pairs without a shared term are left out.
+    """
+    columns = ['product', 'rank', 'keyword', 'bm25_score']
+    keyword_words = keywords['words'].tolist()
+    if not len(feed_text) or not keyword_words:
+        return pd.DataFrame(columns=columns)
+    
+    # Vocabulary of keyword words - other product words never contribute
+    vocabulary = {}
+    for words in keyword_words:
+        for word in words:
+            vocabulary.setdefault(word, len(vocabulary))
+    
+    # Keyword side as a term -> keywords postings list (CSR layout)
+    keyword_terms = np.array([vocabulary[word] for words in keyword_words for word in words], dtype=np.int64)
+    keyword_ids = np.repeat(np.arange(len(keyword_words)), [len(words) for words in keyword_words])
+    order = np.argsort(keyword_terms, kind='stable')
+    posting_keywords = keyword_ids[order]
+    posting_counts = np.bincount(keyword_terms, minlength=len(vocabulary))
+    posting_starts = np.concatenate([[0], np.cumsum(posting_counts)[:-1]])
+    
+    # Product side: BM25 weight of every (product, term) pair
+    tokens = feed_text['tokens']
+    doc_lengths = tokens.str.len().to_numpy(dtype=float)
+    flat_terms = pd.Series([word for words in tokens for word in words], dtype=object).map(vocabulary)
+    flat_docs = np.repeat(np.arange(len(tokens)), doc_lengths.astype(int))
+    known = flat_terms.notna().to_numpy()
+    pair_keys, term_frequency = np.unique(flat_docs[known] * len(vocabulary) + flat_terms[known].to_numpy(dtype=np.int64), return_counts=True)
+    docs = pair_keys // len(vocabulary)
+    terms = pair_keys % len(vocabulary)
+    
+    document_frequency = np.bincount(terms, minlength=len(vocabulary))
+    idf = np.log(1 + (len(tokens) - document_frequency + 0.5) / (document_frequency + 0.5))
+    length_norm = 1 - b + b * doc_lengths[docs] / max(doc_lengths.mean(), 1)
+    weights = idf[terms] * term_frequency * (k1 + 1) / (term_frequency + k1 * length_norm)
+    
+    n_keywords = len(keyword_words)
+    block_size = max(1, RELEVANCE_BLOCK_CELLS // n_keywords)
+    top_n = min(top_n, n_keywords)
+    block_starts = np.searchsorted(docs, np.arange(0, len(tokens), block_size))
+    results = []
+    for block, entry_start in enumerate(block_starts):
+        entry_stop = block_starts[block + 1] if block + 1 < len(block_starts) else len(docs)
+        first_doc = block * block_size
+        n_docs = min(block_size, len(tokens) - first_doc)
+        
+        # Join each (product, term) weight with every keyword containing the term
+        block_terms = terms[entry_start:entry_stop]
+        matches = posting_counts[block_terms]
+        entries = np.repeat(np.arange(entry_start, entry_stop), matches)
+        offsets = np.arange(len(entries)) - np.repeat(np.cumsum(matches) - matches, matches)
+        matched_keywords = posting_keywords[posting_starts[terms[entries]] + offsets]
+        scores = np.bincount((docs[entries] - first_doc) * n_keywords + matched_keywords,
+                             weights=weights[entries], minlength=n_docs * n_keywords).reshape(n_docs, n_keywords)
+        
+        best = np.argpartition(-scores, top_n - 1, axis=1)[:, :top_n]
+        best_scores = np.take_along_axis(scores, best, axis=1)
+        
+        # argpartition keeps an arbitrary keyword among those tied at the cut-off score -
+        # rows with a positive tie there are re-selected with a stable sort (volume order)
+        cutoff = best_scores.min(axis=1)
+        tied = (cutoff > 0) & ((scores >= cutoff[:, None]).sum(axis=1) > top_n)
+        if tied.any():
+            best[tied] = np.argsort(-scores[tied], axis=1, kind='stable')[:, :top_n]
+            best_scores = np.take_along_axis(scores, best, axis=1)
+        ranking = np.lexsort((best, -best_scores), axis=1)  # ties keep keyword table (volume) order
+        best = np.take_along_axis(best, ranking, axis=1)
+        best_scores = np.take_along_axis(best_scores, ranking, axis=1)
+        
+        scored = best_scores > 0
+        results.append(pd.DataFrame({
+            'product': first_doc + np.nonzero(scored)[0],
+            'rank': np.nonzero(scored)[1] + 1,
+            'keyword': keywords['keyword'].to_numpy()[best[scored]],
+            'bm25_score': best_scores[scored].round(3)
+        }))
+    
+    return pd.concat(results, ignore_index=True)[columns]
+
+# Declarative rewrite rules
+# Each rule set is tried in order and the first rule whose condition holds for a
+# product is applied. Conditions are evaluated for a whole chunk of products at
+# once; only the selected rule's rewrite is rendered per product, and its
+# reasoning only when the recommendation is displayed or exported. A rule without
+# a rewrite template keeps the text unchanged and stops later rules of the set.
+# Rules with a keyword `bucket` get the product's best keyword of that bucket as
+# template fields; `fields` adds rule-specific fields from the other fields.
+RewriteRule = namedtuple('RewriteRule', ['name', 'condition', 'bucket', 'fields', 'rewrite', 'reasoning', 'score', 'impact'], defaults=(None,))
+
+# Title words moved to the front when restructuring a long title without keyword data
+FALLBACK_KEY_WORDS = ['oak', 'furniture', 'sofa', 'chair', 'table', 'bed', 'dining', 'living', 'office', 'fabric', 'leather', 'wood']
+
+def restructure_fields(fields):
+    """Title split into the keyword's words (moved to the front) and the rest"""
+    words = fields['title'].split()
+    keyword_words = fields['keyword'].lower().split()
+    return {
+        'keyword_part': ' '.join([w for w in words if w.lower() in keyword_words]).title(),
+        'remaining_words': ' '.join([w for w in words if w.lower() not in keyword_words])
+    }
+
+def key_word_fields(fields):
+    """Title split into furniture key words and the rest"""
+    words = fields['title'].split()
+    return {
+        'key_words': ' '.join([w for w in words if w.lower() in FALLBACK_KEY_WORDS]),
+        'remaining_words': ' '.join([w for w in words if w.lower() not in FALLBACK_KEY_WORDS])
+    }
+
+def intent_fields(row):
+    """Search intent title keywords and description built from the extracted product attributes"""
+    product_type = row['product_type']
+    material = row['material']
+    brand = row['brand']
+    size_info = row['size'] or ""
+    style_info = row['style'].title() if row['style'] else ""
+    color_info = row['color'].title() if row['color'] else ""
+    
+    # Prioritize what customers actually search for
+    search_intent_keywords = []
+    if size_info and size_info in ['2 Seater', '3 Seater', '4 Seater', 'Corner']:
+        search_intent_keywords.append(size_info)
+    if material in ['leather', 'fabric', 'oak', 'wood']:
+        search_intent_keywords.append(f"{material.title()}")
+    search_intent_keywords.append(f"{product_type.title()}")
+    search_intent_keywords.extend(list(row['features'])[:1])  # Limit to 1 special feature
+    
+    intent_desc = f"{row['description']} "
+    if size_info:
+        intent_desc += f"Perfect {size_info.lower()} {product_type} "
+    if style_info:
+        intent_desc += f"in {style_info.lower()} style "
+    if color_info:
+        intent_desc += f"in {color_info.lower()} color. "
+    intent_desc += f"Premium {material.title()} {product_type.title()} from {brand if brand else 'Oak Furnitureland'} - Quality furniture for modern homes."
+    
+    return {
+        'intent_keywords': " ".join(search_intent_keywords),
+        'intent_description': intent_desc,
+        'intent_focus': size_info if size_info else material.title(),
+        'product_type_title': product_type.title()
+    }
+
+TITLE_RULES = [
+    RewriteRule('easy win', lambda f: f['easy_win'] >= 0, 'easy_win', None,
+                "{keyword_title} | {title}",
+                "EASY WIN: Target '{keyword}' - SEOMonitor data shows {search_volume:,} monthly searches, difficulty {difficulty}/100, currently ranking #{position} (huge opportunity to move to top 10)", 70),
+    RewriteRule('product grid opportunity', lambda f: f['grid_opportunity'] >= 0, 'grid_opportunity', None,
+                "{keyword_title} | {title}",
+                "PRODUCT GRID OPPORTUNITY: Target '{keyword}' - SEOMonitor shows {search_volume:,} monthly searches but only ranking #{product_grid_position} in Google Shopping (organic #{position}) - optimize for shopping visibility", 65),
+    RewriteRule('product grid winner', lambda f: (f['grid_winner'] >= 0) & ~f['grid_winner_in_title'], 'grid_winner', None,
+                "{keyword_title} | {title}",
+                "PRODUCT GRID WINNER: Reinforce '{keyword}' - SEOMonitor data shows {search_volume:,} monthly searches, ranking #1-#{product_grid_position} in Google Shopping (maintain this strong position)", 60),
+    RewriteRule('product grid winner in title', lambda f: f['grid_winner'] >= 0, None, None, None, None, 0),
+    RewriteRule('top performer', lambda f: (f['top_performer'] >= 0) & ~f['top_performer_in_title'], 'top_performer', None,
+                "{keyword_title} {title}",
+                "TOP PERFORMER: Move '{keyword}' to front - SEOMonitor shows {search_volume:,} monthly searches, currently ranking #{position} (proven winner, move to front for better visibility)", 40),
+    RewriteRule('restructure winner', lambda f: (f['top_performer'] >= 0) & f['top_performer_restructurable'], 'top_performer', restructure_fields,
+                "{keyword_part} {remaining_words}",
+                "RESTRUCTURE WINNER: Move '{keyword}' to front - SEOMonitor data shows {search_volume:,} monthly searches, ranking #{position} (already successful, optimize placement)", 35),
+    RewriteRule('top performer in place', lambda f: f['top_performer'] >= 0, None, None, None, None, 0),
+    RewriteRule('improve poor performer', lambda f: (f['poor_performer'] >= 0) & f['poor_performer_in_title'], 'poor_performer', restructure_fields,
+                "{keyword_part} {remaining_words}",
+                "IMPROVE POOR PERFORMER: Move '{keyword}' to front - SEOMonitor shows {search_volume:,} monthly searches but only ranking #{position} (high volume, poor ranking = big opportunity)", 45),
+    RewriteRule('high-volume opportunity', lambda f: f['poor_performer'] >= 0, 'poor_performer', None,
+                "{keyword_title} {title}",
+                "HIGH-VOLUME OPPORTUNITY: Add '{keyword}' - SEOMonitor data shows {search_volume:,} monthly searches, currently ranking #{position} (add this high-volume keyword)", 50),
+    RewriteRule('missing opportunity', lambda f: f['missing_opportunity'] >= 0, 'missing_opportunity', None,
+                "{keyword_title} {title}",
+                "MISSING OPPORTUNITY: Target '{keyword}' - SEOMonitor shows {search_volume:,} monthly searches, ranking #{position} (not ranking well for high-volume keyword)", 60),
+    # No relevant keywords - AI fallback based on the extracted product attributes
+    RewriteRule('search intent', lambda f: f['intent'], None, intent_fields,
+                "{intent_keywords} | {title}",
+                "AI optimization: Prioritize '{intent_keywords}' - matches customer search intent for {product_type} with {material} material", 25),
+    RewriteRule('restructure long title', lambda f: f['fallback'] & (f['title_words'] > 6) & f['has_key_words'], None, key_word_fields,
+                "{key_words} | {remaining_words}",
+                "AI optimization: Restructured title to prioritize key furniture terms - improved readability and SEO", 20),
+    RewriteRule('long title', lambda f: f['fallback'] & (f['title_words'] > 6), None, None, None, None, 0),
+    RewriteRule('short title', lambda f: f['fallback'] & (f['title_words'] <= 4), None, None,
+                "{title} | Quality Furniture",
+                "AI optimization: Enhanced short title with furniture context", 15),
+    RewriteRule('brand authority', lambda f: f['fallback'], None, None,
+                "{title} | Oak Furnitureland",
+                "AI optimization: Added brand authority to title", 10)
+]
+
+# Applied on top of the title chosen by TITLE_RULES
+TITLE_MODIFIERS = [
+    RewriteRule('intent brand', lambda f: f['intent'] & f['brand_missing'], None, None,
+                "{optimized_title} | {brand}",
+                "{title_reasoning} - Added brand '{brand}' for authority", 10)
+]
+
+DESCRIPTION_RULES = [
+    RewriteRule('reinforce top performer', lambda f: (f['top_performer'] >= 0) & ~f['top_performer_in_description'], 'top_performer', None,
+                "{description} {keyword_title}",
+                "Reinforce successful keyword '{keyword}' in description (ranks #{position}) - helps maintain ranking", 25),
+    RewriteRule('search intent', lambda f: f['intent'], None, intent_fields,
+                "{intent_description}",
+                "AI optimization: Enhanced description with search intent keywords - {intent_focus} {product_type_title}", 15),
+    RewriteRule('short description', lambda f: f['fallback'] & (f['description_length'] < 150), None, None,
+                "{description} Premium quality furniture from Oak Furnitureland. Free delivery and expert customer service. Perfect for modern homes.",
+                "AI optimization: Enhanced short description with trust signals and brand mention", 15, "MEDIUM"),
+    RewriteRule('call to action', lambda f: f['fallback'], None, None,
+                "{description} Free delivery and expert customer service from Oak Furnitureland.",
+                "AI optimization: Added call to action to description", 10, "LOW")
+]
+
+def rule_fields(rule, row, keyword, keywords):
+    """Template fields of `rule` for a product row and the keyword (table position) it targets"""
+    fields = dict(row)
+    if rule.bucket:
+        kw = keywords[keyword]
+        fields.update(kw, keyword_title=kw['keyword'].title())
+    if rule.fields:
+        fields.update(rule.fields(fields))
+    return fields
+
+def apply_rewrite_rules(facts, rows, rules, keywords, target):
+    """Apply the first matching rule of `rules` to every product row in place.
+    
+    Returns the applied rule per row (position in `rules`, -1 if none) and the
+    keyword table position it targeted (-1 if none).
+    """
+    conditions = np.column_stack([np.asarray(rule.condition(facts), dtype=bool) for rule in rules])
+    selected = conditions.argmax(axis=1)
+    codes = np.full(len(rows), -1, dtype=np.int8)
+    targeted = np.full(len(rows), -1, dtype=np.int32)
+    for position in np.flatnonzero(conditions.any(axis=1)):
+        rule = rules[selected[position]]
+        if rule.rewrite is None:
+            continue
+        row = rows[position]
+        keyword = row[rule.bucket] if rule.bucket else -1
+        row[target] = rule.rewrite.format(**rule_fields(rule, row, keyword, keywords))
+        row['priority_score'] += rule.score
+        if rule.impact:
+            row['rule_impact'] = rule.impact
+        codes[position] = selected[position]
+        targeted[position] = keyword
+    return codes, targeted
+
+def _contains(needles, haystacks):
+    return np.array([needle is not None and needle in haystack for needle, haystack in zip(needles, haystacks)], dtype=bool)
+
+def build_rule_facts(text, candidates, keywords):
+    """Per-product facts the rule conditions are evaluated on"""
+    facts = pd.concat([text, candidates], axis=1)
+    keyword_lower = keywords['keyword_lower'].tolist()
+    keyword_words = keywords['words'].tolist()
+    
+    def bucket_keywords(bucket):
+        return [keyword_lower[k] if k >= 0 else None for k in facts[bucket]]
+    
+    title_lower = facts['title_lower'].tolist()
+    facts['grid_winner_in_title'] = _contains(bucket_keywords('grid_winner'), title_lower)
+    facts['poor_performer_in_title'] = _contains(bucket_keywords('poor_performer'), title_lower)
+    facts['top_performer_in_title'] = _contains(bucket_keywords('top_performer'), title_lower)
+    facts['top_performer_in_description'] = _contains(bucket_keywords('top_performer'), facts['description_lower'].tolist())
+    facts['top_performer_restructurable'] = [
+        k >= 0 and any(word.lower() in keyword_words[k] for word in title.split())
+        for k, title in zip(facts['top_performer'], facts['title'])
+    ]
+    
+    has_attributes = facts['product_type'].notna().to_numpy() & facts['material'].notna().to_numpy()
+    has_relevant = facts['has_relevant'].to_numpy(dtype=bool)
+    facts['intent'] = ~has_relevant & has_attributes
+    facts['fallback'] = ~has_relevant & ~has_attributes
+    facts['brand_missing'] = [bool(brand) and brand.lower() not in title for brand, title in zip(facts['brand'], title_lower)]
+    facts['title_words'] = [len(title.split()) for title in facts['title']]
+    facts['has_key_words'] = [any(word.lower() in FALLBACK_KEY_WORDS for word in title.split()) for title in facts['title']]
+    facts['description_length'] = facts['description'].str.len()
+    return facts
+
+def match_sitebulb_page(product_url, df_sitebulb):
+    """Position of the product's page in the Sitebulb crawl, -1 if not crawled"""
+    if df_sitebulb is not None and product_url:
+        # Find matching page in Sitebulb data
+        matching_pages = np.flatnonzero(df_sitebulb['URL'].str.contains(product_url.split('/')[-1], na=False).to_numpy(dtype=bool))
+        if len(matching_pages):
+            return matching_pages[0]
+    return -1
+
+def sitebulb_adjustments(page_data):
+    """Technical issues Sitebulb found on a product page: (title note, description note, score)"""
+    title_note, description_note, score = "", "", 0
+    
+    # Check for technical issues
+    if page_data.get('Status Code', 200) != 200:
+        title_note += f" | Fix {page_data.get('Status Code')} error"
+        score += 10
+    
+    if page_data.get('Title Tag Length', 0) > 60:
+        title_note += " | Title too long"
+        score += 5
+    
+    if page_data.get('Meta Description Length', 0) > 160:
+        description_note += " | Description too long"
+        score += 5
+    return title_note, description_note, score
+
+def current_rankings(top_keywords, keywords, grid_rank):
+    """Current ranking insights from a product's top relevant keywords"""
+    rankings = []
+    for k in top_keywords:
+        kw = keywords[k]
+        if kw['position'] <= 20:
+            rankings.append(f"'{kw['keyword']}' ranks #{kw['position']} ({kw['search_volume']:,} searches)")
+        if grid_rank[k] <= 10:
+            rankings.append(f"'{kw['keyword']}' ranks #{kw['product_grid_position']} in shopping")
+    return rankings
+
+IMPACT_LEVELS = ['HIGH', 'MEDIUM', 'LOW']
+
+def optimize_feed_chunk(df_gmc, text, start, matcher, context, df_sitebulb):
+    """Optimize a chunk of GMC products into columns for a RecommendationSet.
+    
+    `text` holds the chunk's rows of get_feed_text(), `start` is the position of
+    the chunk's first product in the feed, `matcher` is the run's KeywordMatcher
+    and `context` comes from competitor_context().
+    """
+    keywords = matcher.keywords
+    candidates = matcher.match(text)
+    facts = build_rule_facts(text, candidates, keywords)
+    keyword_records = keywords[['keyword', 'search_volume', 'position', 'difficulty', 'product_grid_position']].to_dict('records')
+    grid_rank = keywords['grid_rank'].tolist()
+    
+    rows = facts[['title', 'description', 'product_type', 'material', 'color', 'size', 'style', 'features', 'brand'] + list(KEYWORD_BUCKETS)].to_dict('records')
+    for row in rows:
+        row.update(optimized_title=row['title'], optimized_description=row['description'], priority_score=0, rule_impact="LOW")
+    
+    title_rules, title_keywords = apply_rewrite_rules(facts, rows, TITLE_RULES, keyword_records, 'optimized_title')
+    title_modifiers, _ = apply_rewrite_rules(facts, rows, TITLE_MODIFIERS, keyword_records, 'optimized_title')
+    description_rules, description_keywords = apply_rewrite_rules(facts, rows, DESCRIPTION_RULES, keyword_records, 'optimized_description')
+    
+    # Impact reflects the rewrites only - insight bonuses below don't change it
+    scores = np.array([row['priority_score'] for row in rows])
+    impact = np.select(
+        [facts['fallback'].to_numpy(), facts['intent'].to_numpy(), scores >= 60, scores >= 35],
+        [np.array([row['rule_impact'] for row in rows], dtype=object), np.where(scores >= 30, "MEDIUM", "LOW").astype(object), "HIGH", "MEDIUM"],
+        "LOW"
+    )
+    
+    links = df_gmc['link'].tolist() if 'link' in df_gmc.columns else [''] * len(df_gmc)
+    top_keywords = np.full((len(rows), TOP_KEYWORDS), -1, dtype=np.int32)
+    sitebulb_pages = np.full(len(rows), -1, dtype=np.int32)
+    priority_scores = scores + context['competitor'][1] + context['grid_competitor'][1]
+    predicted_traffic_increase = np.zeros(len(rows), dtype=np.int64)
+    predicted_ranking_improvement = np.zeros(len(rows), dtype=np.int32)
+    for position, (link, relevant, has_relevant) in enumerate(zip(links, candidates['top_keywords'], candidates['has_relevant'])):
+        top_keywords[position, :len(relevant)] = relevant
+        if context['current_rankings'] and current_rankings(relevant, keyword_records, grid_rank):
+            priority_scores[position] += 15
+        if has_relevant:
+            priority_scores[position] += context['keyword_gap'][1]
+        
+        page = match_sitebulb_page(link, df_sitebulb)
+        if page >= 0:
+            sitebulb_pages[position] = page
+            priority_scores[position] += sitebulb_adjustments(df_sitebulb.iloc[page])[2]
+        
+        # Performance prediction from the top 3 relevant keywords
+        traffic = 0
+        for k in relevant:
+            kw = keyword_records[k]
+            if kw['position'] > 20:
+                traffic += kw['search_volume'] * 0.05  # 5% CTR improvement
+                predicted_ranking_improvement[position] += 10  # Move to top 10
+            elif kw['position'] > 10:
+                traffic += kw['search_volume'] * 0.02  # 2% CTR improvement
+                predicted_ranking_improvement[position] += 5   # Move to top 5
+        predicted_traffic_increase[position] = int(traffic)
+    
+    return {
+        'row': np.arange(start, start + len(rows), dtype=np.int32),
+        # Rewritten texts only - unchanged products keep None and read the feed text
+        'optimized_title': np.array([row['optimized_title'] if row['optimized_title'] != row['title'] else None for row in rows], dtype=object),
+        'optimized_description': np.array([row['optimized_description'] if row['optimized_description'] != row['description'] else None for row in rows], dtype=object),
+        'title_rule': title_rules,
+        'title_keyword': title_keywords,
+        'title_modifier': title_modifiers,
+        'description_rule': description_rules,
+        'description_keyword': description_keywords,
+        'top_keywords': top_keywords,
+        'has_relevant': candidates['has_relevant'].to_numpy(dtype=bool),
+        'sitebulb_page': sitebulb_pages,
+        'priority_score': priority_scores.astype(np.int32),
+        'impact': np.array([IMPACT_LEVELS.index(level) for level in impact], dtype=np.int8),
+        'predicted_traffic_increase': predicted_traffic_increase,
+        'predicted_ranking_improvement': predicted_ranking_improvement
+    }
+
+# Compact recommendation results
+RECOMMENDATION_COLUMNS = ['product_id', 'current_title', 'optimized_title', 'current_description', 'optimized_description', 'priority_score', 'expected_impact', 'title_reasoning', 'description_reasoning', 'predicted_traffic_increase', 'predicted_ranking_improvement']
+
+class RecommendationSet:
+    """Optimization results for a feed in compact columnar form.
+    
+    Per product only its feed row, the rewritten texts (None when unchanged), the
+    applied rule codes with the keyword they targeted, and the numeric results
+    are kept. Current texts come from the feed, and human-readable reasoning is
+    rendered from the rule templates only for rows that are displayed or exported.
+    """
+    
+    def __init__(self, df_gmc, feed_text, keywords, context, df_sitebulb):
+        self.df_gmc = df_gmc
+        self.feed_text = feed_text
+        self.keywords = keywords
+        self.context = context
+        self.df_sitebulb = df_sitebulb
+        self._chunks = []
+        self._length = 0
+        self._columns = None
+        self._records = None
+        self._grid_ranks = None
+        self._search_index = None
+    
+    def append(self, chunk):
+        self._chunks.append(chunk)
+        self._length += len(chunk['row'])
+        self._columns = None
+    
+    def __len__(self):
+        return self._length
+    
+    @property
+    def columns(self):
+        """All chunks concatenated into one array per column"""
+        if self._columns is None:
+            if self._chunks:
+                self._chunks = [{name: np.concatenate([chunk[name] for chunk in self._chunks]) for name in self._chunks[0]}]
+                self._columns = self._chunks[0]
+            else:
+                self._columns = {}
+        return self._columns
+    
+    def consolidate(self):
+        """Concatenate the appended chunks now instead of on the first read of `columns`"""
+        return self.columns
+    
+    def memory_usage(self):
+        """Bytes held by the result columns (the feed and keyword data are shared, not counted)"""
+        total = 0
+        for name, values in self.columns.items():
+            total += values.nbytes
+            if values.dtype == object:
+                total += sum(sys.getsizeof(value) for value in values if value is not None)
+        if self._search_index is not None:
+            total += self._search_index.memory_usage()
+        return total
+    
+    def _positions(self, positions):
+        return np.arange(len(self)) if positions is None else np.asarray(positions, dtype=int)
+    
+    def product_ids(self, positions=None):
+        rows = self.columns['row'][self._positions(positions)] if len(self) else np.array([], dtype=int)
+        if 'id' in self.df_gmc.columns:
+            return self.df_gmc['id'].to_numpy(dtype=object)[rows]
+        return np.array([f'product_{row}' for row in rows], dtype=object)
+    
+    def _texts(self, column, positions):
+        positions = self._positions(positions)
+        if not len(self):
+            return np.array([], dtype=object)
+        return self.feed_text[column].to_numpy(dtype=object)[self.columns['row'][positions]]
+    
+    def current_titles(self, positions=None):
+        return self._texts('title', positions)
+    
+    def current_descriptions(self, positions=None):
+        return self._texts('description', positions)
+    
+    def product_types(self, positions=None):
+        return self._texts('product_type', positions)
+    
+    def _optimized(self, column, current, positions):
+        optimized = self.columns[column][self._positions(positions)] if len(self) else np.array([], dtype=object)
+        return np.where(pd.isna(optimized), current, optimized)
+    
+    def optimized_titles(self, positions=None):
+        return self._optimized('optimized_title', self.current_titles(positions), positions)
+    
+    def optimized_descriptions(self, positions=None):
+        return self._optimized('optimized_description', self.current_descriptions(positions), positions)
+    
+    def changed(self):
+        """Products whose title or description was rewritten"""
+        if not len(self):
+            return np.zeros(0, dtype=bool)
+        return pd.notna(self.columns['optimized_title']) | pd.notna(self.columns['optimized_description'])
+    
+    def impacts(self, positions=None):
+        if not len(self):
+            return np.array([], dtype=object)
+        return np.array(IMPACT_LEVELS, dtype=object)[self.columns['impact'][self._positions(positions)]]
+    
+    def impact_counts(self):
+        counts = np.bincount(self.columns['impact'], minlength=len(IMPACT_LEVELS)) if len(self) else np.zeros(len(IMPACT_LEVELS), dtype=int)
+        return {level: int(count) for level, count in zip(IMPACT_LEVELS, counts)}
+    
+    def uses_title_rule(self, names):
+        """Products whose title was rewritten by one of the named TITLE_RULES"""
+        codes = [code for code, rule in enumerate(TITLE_RULES) if rule.name in names]
+        return np.isin(self.columns['title_rule'], codes) if len(self) else np.zeros(0, dtype=bool)
+    
+    def _keyword_names(self, column, positions):
+        # Code -1 (no keyword) picks the trailing empty name
+        names = np.append(self.keywords['keyword'].to_numpy(dtype=object), '')
+        return names[self.columns[column][positions]]
+    
+    def targeted_keywords(self, positions=None):
+        """Keywords targeted by the title and description rewrites, joined per product"""
+        if not len(self):
+            return np.array([], dtype=object)
+        positions = self._positions(positions)
+        pairs = zip(self._keyword_names('title_keyword', positions), self._keyword_names('description_keyword', positions))
+        return np.array([' | '.join(filter(None, dict.fromkeys(pair))) for pair in pairs], dtype=object)
+    
+    def title_keywords(self, positions=None):
+        """Keyword targeted by each title rewrite ('' when none)"""
+        if not len(self):
+            return np.array([], dtype=object)
+        return self._keyword_names('title_keyword', self._positions(positions))
+    
+    def title_rules(self, positions=None):
+        """Name of the TITLE_RULES rule that rewrote each title ('' when unchanged)"""
+        if not len(self):
+            return np.array([], dtype=object)
+        names = np.array([rule.name for rule in TITLE_RULES] + [''], dtype=object)
+        return names[self.columns['title_rule'][self._positions(positions)]]
+    
+    def title_reasoning_is_default(self):
+        """Products whose title reasoning renders as "No optimization needed" """
+        if not len(self) or self.context['competitor'][0] or self.context['grid_competitor'][0]:
+            return np.zeros(len(self), dtype=bool)
+        columns = self.columns
+        default = columns['title_rule'] < 0
+        if self.context['keyword_gap'][0]:
+            default &= ~columns['has_relevant']
+        for position in np.flatnonzero(default):
+            if self._sitebulb_notes(position)[0] or self._current_rankings(position):
+                default[position] = False
+        return default
+    
+    def _rows(self, positions):
+        """Feed text rows as dicts, converted in one batch"""
+        if not len(positions):
+            return []
+        return self.feed_text.iloc[self.columns['row'][positions]].to_dict('records')
+    
+    def _keyword_records(self):
+        if self._records is None:
+            self._records = self.keywords[['keyword', 'search_volume', 'position', 'difficulty', 'product_grid_position']].to_dict('records')
+            self._grid_ranks = self.keywords['grid_rank'].tolist()
+        return self._records
+    
+    def _current_rankings(self, position):
+        if not self.context['current_rankings']:
+            return []
+        relevant = self.columns['top_keywords'][position]
+        return current_rankings(relevant[relevant >= 0], self._keyword_records(), self._grid_ranks)
+    
+    def _sitebulb_notes(self, position):
+        page = self.columns['sitebulb_page'][position]
+        if page < 0:
+            return "", ""
+        return sitebulb_adjustments(self.df_sitebulb.iloc[page])[:2]
+    
+    def _rule_reasoning(self, rules, code, keyword, row):
+        if code < 0:
+            return "No optimization needed"
+        rule = rules[code]
+        return rule.reasoning.format(**rule_fields(rule, row, keyword, self._keyword_records()))
+    
+    def title_reasoning(self, positions=None):
+        """Rendered title reasoning with Sitebulb, competitor and keyword gap insights"""
+        columns = self.columns
+        insights = self.context['competitor'][0] + self.context['grid_competitor'][0]
+        reasoning = []
+        positions = self._positions(positions)
+        for position, row in zip(positions, self._rows(positions)):
+            text = self._rule_reasoning(TITLE_RULES, columns['title_rule'][position], columns['title_keyword'][position], row)
+            modifier = columns['title_modifier'][position]
+            if modifier >= 0:
+                text = TITLE_MODIFIERS[modifier].reasoning.format(**row, title_reasoning=text)
+            text += self._sitebulb_notes(position)[0] + insights
+            rankings = self._current_rankings(position)
+            if rankings:
+                text += f" | Current rankings: {', '.join(rankings[:2])}"
+            if columns['has_relevant'][position]:
+                text += self.context['keyword_gap'][0]
+            reasoning.append(text)
+        return reasoning
+    
+    def description_reasoning(self, positions=None):
+        """Rendered description reasoning with Sitebulb insights"""
+        columns = self.columns
+        positions = self._positions(positions)
+        return [
+            self._rule_reasoning(DESCRIPTION_RULES, columns['description_rule'][position], columns['description_keyword'][position], row) + self._sitebulb_notes(position)[1]
+            for position, row in zip(positions, self._rows(positions))
+        ]
+    
+    def frame(self, columns=None, positions=None):
+        """Recommendations as a DataFrame with RECOMMENDATION_COLUMNS - only the requested columns are rendered"""
+        columns = RECOMMENDATION_COLUMNS if columns is None else columns
+        builders = {
+            'product_id': self.product_ids,
+            'current_title': self.current_titles,
+            'optimized_title': self.optimized_titles,
+            'current_description': self.current_descriptions,
+            'optimized_description': self.optimized_descriptions,
+            'priority_score': lambda positions: self.columns['priority_score'][self._positions(positions)].astype(int),
+            'expected_impact': self.impacts,
+            'title_reasoning': self.title_reasoning,
+            'description_reasoning': self.description_reasoning,
+            'predicted_traffic_increase': lambda positions: self.columns['predicted_traffic_increase'][self._positions(positions)],
+            'predicted_ranking_improvement': lambda positions: self.columns['predicted_ranking_improvement'][self._positions(positions)]
+        }
+        if not len(self):
+            return pd.DataFrame(columns=columns)
+        return pd.DataFrame({column: builders[column](positions) for column in columns})
+    
+    def records(self, positions=None):
+        """Recommendations as dicts, one per product"""
+        return self.frame(positions=positions).to_dict('records')
+    
+    def search_index(self):
+        """Full-text index over product and recommendation text (reasoning included), built on first use"""
+        if self._search_index is None:
+            frame = self.frame(['product_id', 'current_title', 'optimized_title', 'current_description', 'optimized_description', 'title_reasoning', 'description_reasoning'])
+            frame['targeted_keywords'] = self.targeted_keywords()
+            self._search_index = SearchIndex({column: frame[column].fillna('').astype(str) for column in frame.columns})
+        return self._search_index
+
+# Background optimization worker
+class OptimizationWorker:
+    """Run the optimization engine on a background thread for one session.
+    
+    The engine never touches Streamlit elements. Progress is published into a
+    snapshot at most once per `publish_interval` seconds and the page polls it.
+    """
+    
+    def __init__(self, df_gmc, feed_text, df_seo, df_sitebulb, total_products, publish_interval=0.25, chunk_size=250, shared_cache=None, fingerprints=None, run_history=None, source_file=None, keyword_store=None):
+        self.df_gmc = df_gmc
+        self.feed_text = feed_text
+        self.df_seo = df_seo
+        self.keyword_store = keyword_store
+        self.df_sitebulb = df_sitebulb
+        self.total_products = total_products
+        self.publish_interval = publish_interval
+        self.chunk_size = chunk_size
+        self.shared_cache = shared_cache
+        self.fingerprints = fingerprints
+        self.run_history = run_history
+        self.source_file = source_file
+        self.run_id = None
+        self.history_error = None
+        self.from_shared_cache = False
+        self.recommendations = RecommendationSet(df_gmc, feed_text, None, None, df_sitebulb)
+        self.keyword_matcher = None
+        self.keyword_relevance = None
+        self.started_at = None
+        self.finished_at = None
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        self._snapshot = {'processed': 0, 'total': total_products, 'current_title': '', 'status': 'pending', 'error': None}
+        self._thread = threading.Thread(target=self._run, name="gmc-optimization-worker", daemon=True)
+    
+    def start(self):
+        self.started_at = time.time()
+        self._publish(status='running')
+        self._thread.start()
+    
+    def cancel(self):
+        """Ask the worker to stop after the current chunk of products; results so far are kept"""
+        self._cancel_event.set()
+    
+    def is_alive(self):
+        return self._thread.is_alive()
+    
+    def join(self):
+        self._thread.join()
+    
+    def snapshot(self):
+        with self._lock:
+            return dict(self._snapshot)
+    
+    def _publish(self, **values):
+        with self._lock:
+            self._snapshot.update(values)
+    
+    def _run(self):
+        last_publish = 0.0
+        processed = 0
+        try:
+            # Finished results for the same data may already exist from another session
+            if self.shared_cache is not None:
+                results_key = ('recommendations', ENGINE_VERSION, self.total_products) + tuple(self.fingerprints)
+                cached = self.shared_cache.get(results_key)
+                if cached is not None:
+                    self.recommendations = cached['recommendations']
+                    self.keyword_matcher = cached['keyword_matcher']
+                    self.keyword_relevance = cached['keyword_relevance']
+                    self.from_shared_cache = True
+                    self.finished_at = time.time()
+                    self._save_run('done')
+                    self._publish(processed=len(self.recommendations), status='done')
+                    return
+            
+            # Keyword data is parsed once per run (or shared between sessions) and reused by every chunk
+            if self.shared_cache is not None:
+                matcher_key = ('keyword_matcher', ENGINE_VERSION, self.fingerprints[1])
+                self.keyword_matcher = self.shared_cache.get_or_build(matcher_key, lambda: KeywordMatcher(build_keyword_table(self.df_seo, self.keyword_store)))
+            else:
+                self.keyword_matcher = KeywordMatcher(build_keyword_table(self.df_seo, self.keyword_store))
+            keywords = self.keyword_matcher.keywords
+            context = competitor_context(self.df_seo)
+            self.recommendations = RecommendationSet(self.df_gmc, self.feed_text, keywords, context, self.df_sitebulb)
+            products = self.df_gmc.head(self.total_products)
+            texts = self.feed_text.head(self.total_products)
+            for start in range(0, len(products), self.chunk_size):
+                if self._cancel_event.is_set():
+                    break
+                
+                stop = min(start + self.chunk_size, len(products))
+                self.recommendations.append(optimize_feed_chunk(products.iloc[start:stop], texts.iloc[start:stop], start, self.keyword_matcher, context, self.df_sitebulb))
+                processed = stop
+                
+                # Throttle progress publishing so a large feed doesn't flood the UI
+                now = time.time()
+                if now - last_publish >= self.publish_interval:
+                    self._publish(processed=processed, current_title=texts['title'].iat[stop - 1][:50])
+                    last_publish = now
+            
+            # Concatenate the result chunks here rather than on the page's first read
+            self.recommendations.consolidate()
+            
+            # Best-fit keywords for the products processed in this run
+            self.keyword_relevance = score_keyword_relevance(texts.iloc[:processed], keywords)
+            
+            # Index product and recommendation text once so summary searches don't render every row
+            self.recommendations.search_index()
+            
+            status = 'cancelled' if processed < self.total_products else 'done'
+            if self.shared_cache is not None:
+                # Re-store the matcher so its size includes the product groups matched this run
+                self.shared_cache.put(matcher_key, self.keyword_matcher)
+                if status == 'done':
+                    self.shared_cache.put(results_key, {'recommendations': self.recommendations, 'keyword_matcher': self.keyword_matcher, 'keyword_relevance': self.keyword_relevance})
+            self.finished_at = time.time()
+            self._save_run(status)
+            self._publish(processed=processed, status=status)
+        except Exception as e:
+            self.finished_at = time.time()
+            self._publish(processed=processed, status='error', error=str(e))
+
+    def _save_run(self, status):
+        """Persist the finished run so it can be reloaded or compared later (a failed save keeps the results)"""
+        if self.run_history is None or not len(self.recommendations):
+            return
+        gmc_fingerprint, seo_fingerprint, sitebulb_fingerprint = self.fingerprints or (None, None, None)
+        try:
+            self.run_id = self.run_history.save(self.recommendations, {
+                'source_file': self.source_file,
+                'engine_version': ENGINE_VERSION,
+                'status': status,
+                'total_products': self.total_products,
+                'processed': len(self.recommendations),
+                'changed': int(self.recommendations.changed().sum()),
+                'high_impact': self.recommendations.impact_counts()['HIGH'],
+                'duration_seconds': self.finished_at - self.started_at,
+                'gmc_fingerprint': gmc_fingerprint,
+                'seo_fingerprint': seo_fingerprint,
+                'sitebulb_fingerprint': sitebulb_fingerprint
+            })
+        except Exception as e:
+            self.history_error = str(e)
+
+# Streamlit fragments rerun on their own without rerunning the page (older releases only have the experimental name)
+fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None)
+
+def isolated(render):
+    """`render` as a fragment, so its widgets rerun only its own region (inline on releases without fragments)"""
+    if fragment is None:
+        return render
+    
+    @functools.wraps(render)
+    def rerun_region(*args, **kwargs):
+        # Fragment reruns skip the page's session bookkeeping, so count them as activity here
+        record_activity()
+        return render(*args, **kwargs)
+    
+    return fragment(rerun_region)
+
+def render_optimization_progress(worker):
+    """Show the latest published progress of a running worker with a Cancel button"""
+    if not worker.is_alive():
+        # Worker finished since the last poll - rerun the page to show the results
+        st.rerun()
+    
+    snapshot = worker.snapshot()
+    total = max(snapshot['total'], 1)
+    st.progress(min(snapshot['processed'] / total, 1.0))
+    st.text(f"🎯 Analyzing product {snapshot['processed']}/{snapshot['total']}: {snapshot['current_title']}...")
+    
+    if st.button("⏹️ Cancel Optimization"):
+        worker.cancel()
+        st.info("⏳ Cancelling - finishing the current batch and keeping partial results...")
+
+# Batch runs over every campaign+feed pair of the configuration
+class BatchRun:
+    """Optimize several campaign+feed pairs at once on background threads.
+    
+    Campaign keywords are fetched concurrently, once per SEOMonitor campaign,
+    and each distinct feed file is read once. Every pair then gets its own
+    OptimizationWorker and all of them run in parallel. Campaigns with the same
+    keyword data share one parsed keyword table (the shared cache keys it by
+    content fingerprint). Keywords tracked by several campaigns are normalized
+    once into a KeywordStore over the union of all campaigns' keywords; search
+    volumes and positions differ between campaigns, so each campaign still
+    builds its own clusters from its rows. Every finished run is saved to the
+    run history.
+    """
+    
+    def __init__(self, campaigns, session_feed, df_sitebulb, shared_cache, run_history=None):
+        self.campaigns = campaigns
+        self.session_feed = session_feed  # (DataFrame, file name) of the uploaded feed, or None
+        self.df_sitebulb = df_sitebulb
+        self.shared_cache = shared_cache
+        self.run_history = run_history
+        self.keywords = {}  # campaign name -> keyword DataFrame
+        self.keyword_store = None  # normalized keywords of every campaign
+        self.workers = {}  # campaign name -> OptimizationWorker
+        self.errors = {}  # campaign name -> why it wasn't optimized
+        self.stage = 'pending'
+        self.started_at = None
+        self.finished_at = None
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="gmc-batch-run", daemon=True)
+    
+    def start(self):
+        self.started_at = time.time()
+        self.stage = 'fetching'
+        self._thread.start()
+    
+    def cancel(self):
+        """Stop starting new campaigns and ask running ones to stop after their current chunk"""
+        self._cancel_event.set()
+        with self._lock:
+            workers = list(self.workers.values())
+        for worker in workers:
+            worker.cancel()
+    
+    def is_alive(self):
+        return self._thread.is_alive()
+    
+    def _read_feeds(self):
+        """Feed of every campaign by file path (None for the uploaded feed), or the error reading it"""
+        def read(path):
+            try:
+                return read_feed(path)
+            except CampaignError as e:
+                return e
+        paths = list(dict.fromkeys(campaign.feed for campaign in self.campaigns if campaign.feed))
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_FETCHES) as executor:
+            feeds = dict(zip(paths, executor.map(read, paths)))
+        feeds[None] = self.session_feed[0] if self.session_feed is not None else CampaignError("No feed configured and no GMC feed uploaded")
+        return feeds
+    
+    def _run(self):
+        try:
+            keywords = fetch_campaigns(self.campaigns)
+            feeds = self._read_feeds()
+            self.stage = 'optimizing'
+            
+            # One store of normalized keyword text over the union of the campaigns' keywords
+            campaign_keywords = [df_seo['keyword'].astype(str) for df_seo, _ in keywords.values() if df_seo is not None and 'keyword' in df_seo.columns]
+            self.keyword_store = KeywordStore(pd.concat(campaign_keywords) if campaign_keywords else ())
+            
+            fingerprints = {}
+            def content_fingerprint(df):
+                if id(df) not in fingerprints:
+                    fingerprints[id(df)] = fingerprint(df)
+                return fingerprints[id(df)]
+            
+            for campaign in self.campaigns:
+                if self._cancel_event.is_set():
+                    self.errors[campaign.name] = "Cancelled before it started"
+                    continue
+                df_seo, error = keywords[(campaign.api_key, campaign.campaign_id)]
+                df_gmc = feeds[campaign.feed]
+                if df_seo is None:
+                    self.errors[campaign.name] = error or "No keywords found"
+                    continue
+                if isinstance(df_gmc, Exception):
+                    self.errors[campaign.name] = str(df_gmc)
+                    continue
+                if error:
+                    self.errors[campaign.name] = f"Partial keywords: {error}"
+                self.keywords[campaign.name] = df_seo
+                
+                gmc_fingerprint = content_fingerprint(df_gmc)
+                feed_text = self.shared_cache.get_or_build(('feed_text', ENGINE_VERSION, gmc_fingerprint), lambda: build_feed_text(df_gmc))
+                worker = OptimizationWorker(df_gmc, feed_text, df_seo, self.df_sitebulb, len(df_gmc),
+                                            shared_cache=self.shared_cache,
+                                            fingerprints=(gmc_fingerprint, content_fingerprint(df_seo), content_fingerprint(self.df_sitebulb)),
+                                            run_history=self.run_history,
+                                            source_file=f"{campaign.name}: {os.path.basename(campaign.feed) if campaign.feed else self.session_feed[1]}",
+                                            keyword_store=self.keyword_store)
+                with self._lock:
+                    self.workers[campaign.name] = worker
+                worker.start()
+            
+            for worker in list(self.workers.values()):
+                worker.join()
+            self.stage = 'cancelled' if self._cancel_event.is_set() else 'done'
+        except Exception as e:
+            self.errors['Batch'] = str(e)
+            self.stage = 'error'
+        finally:
+            self.finished_at = time.time()
+    
+    def report(self):
+        """One row per campaign with its keyword count, progress and results"""
+        rows = []
+        for campaign in self.campaigns:
+            with self._lock:
+                worker = self.workers.get(campaign.name)
+            df_seo = self.keywords.get(campaign.name)
+            row = {
+                'Campaign': campaign.name,
+                'Brand': campaign.brand,
+                'Campaign ID': campaign.campaign_id,
+                'Feed': os.path.basename(campaign.feed) if campaign.feed else "Uploaded GMC feed",
+                'Keywords': len(df_seo) if df_seo is not None else 0,
+                'Products': 0,
+                'Processed': 0,
+                'Changed': 0,
+                'High Impact': 0,
+                'Status': 'failed' if campaign.name in self.errors and worker is None else ('fetching' if self.stage == 'fetching' else 'waiting'),
+                'Run': None,
+                'Note': self.errors.get(campaign.name, "")
+            }
+            if worker is not None:
+                snapshot = worker.snapshot()
+                row.update({'Products': snapshot['total'], 'Processed': snapshot['processed'], 'Status': snapshot['status'], 'Run': worker.run_id})
+                if snapshot['error'] or worker.history_error:
+                    row['Note'] = snapshot['error'] or f"Not saved to history: {worker.history_error}"
+                if not worker.is_alive():
+                    recommendations = worker.recommendations
+                    row.update({'Changed': int(recommendations.changed().sum()), 'High Impact': recommendations.impact_counts()['HIGH']})
+            rows.append(row)
+        return pd.DataFrame(rows).astype({'Run': 'Int64'})
+
+def render_batch_progress(batch):
+    """Show the latest per-campaign progress of a running batch with a Cancel button"""
+    if not batch.is_alive():
+        st.rerun()
+    
+    if batch.stage == 'fetching':
+        st.text(f"📡 Fetching keywords for {len(batch.campaigns)} campaigns and reading their feeds...")
+    report = batch.report()
+    st.progress(min(report['Processed'].sum() / max(report['Products'].sum(), 1), 1.0))
+    st.dataframe(report.drop(columns=['Changed', 'High Impact', 'Run']), use_container_width=True, hide_index=True)
+    
+    if st.button("⏹️ Cancel Batch"):
+        batch.cancel()
+        st.info("⏳ Cancelling - running campaigns finish their current chunk and keep partial results...")
+
+
+# Columnar recommendation store for the Optimization Summary page
+
+# Summary grid: rows shipped to the browser per page, and characters shown per text cell until a row is expanded
+SUMMARY_PAGE_SIZES = [25, 50, 100, 250]
+SUMMARY_CELL_CHARS = 80
+SUMMARY_TEXT_COLUMNS = ['Original Title', 'Optimized Title', 'Title Reasoning', 'Original Description', 'Optimized Description', 'Description Reasoning']
+
+# ROI scenario grid: values per axis between each range's ends
+ROI_SCENARIO_STEPS = 7
+
+class RecommendationStore:
+    """Recommendations held once as a DataFrame with precomputed flags and memoized filtered views.
+    
+    Views are row positions; reasoning columns are rendered only for the rows
+    that are displayed or downloaded.
+    """
+    
+    max_cached_views = 32
+    
+    def __init__(self, recommendations):
+        self.source = recommendations
+        frame = recommendations.frame(['product_id', 'current_title', 'optimized_title', 'current_description', 'optimized_description', 'expected_impact', 'priority_score', 'predicted_traffic_increase', 'predicted_ranking_improvement'])
+        self.frame = pd.DataFrame({
+            'Product ID': frame['product_id'],
+            'Original Title': frame['current_title'],
+            'Optimized Title': frame['optimized_title'],
+            'Original Description': frame['current_description'],
+            'Optimized Description': frame['optimized_description'],
+            'Impact': pd.Categorical(frame['expected_impact'], categories=IMPACT_LEVELS),
+            'Priority Score': frame['priority_score'],
+            'Predicted Traffic Increase': frame['predicted_traffic_increase'],
+            'Predicted Ranking Improvement': frame['predicted_ranking_improvement']
+        })
+        
+        # Precomputed "changed" flags and impact category index (row positions per impact level)
+        self.changed = recommendations.changed()
+        self.scores = self.frame['Priority Score'].to_numpy()
+        impact_codes = self.frame['Impact'].cat.codes.to_numpy()
+        self.impact_index = {level: np.flatnonzero(impact_codes == code) for code, level in enumerate(IMPACT_LEVELS)}
+        self.impact_index['All'] = np.arange(len(self.frame))
+        self.predicted_traffic = float(self.frame['Predicted Traffic Increase'].sum())
+        
+        # Predicted traffic per product type (rows) and impact level (columns), for the ROI scenarios
+        product_types = pd.Series(recommendations.product_types(), index=self.frame.index, dtype=object).fillna("other")
+        self.segment_traffic = (self.frame['Predicted Traffic Increase']
+                                .groupby([product_types, self.frame['Impact']], observed=False).sum()
+                                .unstack().reindex(columns=IMPACT_LEVELS, fill_value=0.0))
+        self._views = {}
+    
+    def view(self, impact="All", min_score=0, changes_only=False, search="", sort_by=None, descending=False):
+        """Row positions matching the filters, text search and sort order, memoized per combination"""
+        key = (impact, min_score, changes_only, search, sort_by, descending)
+        if key in self._views:
+            # Move to the end so the least recently used view is evicted first
+            self._views[key] = self._views.pop(key)
+            return self._views[key]
+        
+        if search or sort_by:
+            positions = self.view(impact, min_score, changes_only)
+            if search:
+                positions = positions[np.isin(positions, self.source.search_index().search(search))]
+            if sort_by:
+                # Stable sort, so ties keep the optimization order
+                values = self.frame[sort_by].iloc[positions].reset_index(drop=True)
+                order = values.sort_values(ascending=not descending, kind='stable', na_position='last').index.to_numpy()
+                positions = positions[order]
+        else:
+            positions = self.impact_index[impact]
+            mask = self.scores[positions] >= min_score
+            if changes_only:
+                mask &= self.changed[positions]
+            positions = positions[mask]
+        
+        if len(self._views) >= self.max_cached_views:
+            self._views.pop(next(iter(self._views)))
+        self._views[key] = positions
+        return positions
+    
+    def rows(self, positions, columns=None):
+        """Summary rows at `positions` with reasoning rendered for those rows only"""
+        rows = self.frame.iloc[positions].copy()
+        rows.insert(3, 'Title Reasoning', self.source.title_reasoning(positions))
+        rows.insert(6, 'Description Reasoning', self.source.description_reasoning(positions))
+        return rows if columns is None else rows[columns]
+    
+    def impact_counts(self, changes_only=False):
+        """Number of recommendations per impact level"""
+        if changes_only:
+            return {level: int(self.changed[self.impact_index[level]].sum()) for level in IMPACT_LEVELS}
+        return {level: len(self.impact_index[level]) for level in IMPACT_LEVELS}
+
+def get_recommendation_store(recommendations):
+    """Return the session's recommendation store, rebuilding it only when the recommendations change"""
+    store = st.session_state.get('recommendation_store')
+    if store is None or store.source is not recommendations:
+        store = RecommendationStore(recommendations)
+        st.session_state['recommendation_store'] = store
+    return store
+
+def truncate_text(values, max_chars=SUMMARY_CELL_CHARS):
+    """Shorten long text cells to max_chars with an ellipsis"""
+    text = values.fillna('').astype(str)
+    return text.where(text.str.len() <= max_chars, text.str.slice(0, max_chars - 1) + '…')
+
+def roi_projection(predicted_traffic, conversion_rate, order_value, profit_margin):
+    """Monthly revenue and profit from the predicted traffic (rates in percent)"""
+    revenue = predicted_traffic * (conversion_rate / 100) * order_value
+    return revenue, revenue * (profit_margin / 100)
+
+def roi_scenario_grid(traffic, conversion_rates, order_values, profit_margins):
+    """Monthly profit for every conversion rate, order value and margin combination (rates in percent).
+    
+    Evaluated as one broadcast - the result has the shape of `traffic` followed by
+    the conversion rate, order value and margin axes.
+    """
+    traffic = np.asarray(traffic, dtype=float)[..., None, None, None]
+    conversion = np.asarray(conversion_rates, dtype=float)[:, None, None] / 100
+    order_value = np.asarray(order_values, dtype=float)[None, :, None]
+    margin = np.asarray(profit_margins, dtype=float)[None, None, :] / 100
+    return traffic * conversion * order_value * margin
+
+def scenario_axis(bounds):
+    """ROI_SCENARIO_STEPS evenly spaced values between a range slider's ends (one value for an empty range)"""
+    return np.unique(np.linspace(bounds[0], bounds[1], ROI_SCENARIO_STEPS).round(2))
+
+def render_roi_calculator(store):
+    """ROI calculator inputs, the projected returns and the profit scenarios by product type and impact"""
+    predicted_traffic = store.predicted_traffic
+    st.subheader("💰 ROI Calculator")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        avg_conversion_rate = st.number_input("Average Conversion Rate (%)", value=2.0, min_value=0.1, max_value=10.0, step=0.1)
+    with col2:
+        avg_order_value = st.number_input("Average Order Value (£)", value=500.0, min_value=50.0, max_value=2000.0, step=50.0)
+    with col3:
+        profit_margin = st.number_input("Profit Margin (%)", value=30.0, min_value=5.0, max_value=80.0, step=5.0)
+    
+    predicted_revenue, predicted_profit = roi_projection(predicted_traffic, avg_conversion_rate, avg_order_value, profit_margin)
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Predicted Monthly Traffic", f"{predicted_traffic:,.0f}")
+    with col2:
+        st.metric("Predicted Monthly Revenue", f"£{predicted_revenue:,.0f}")
+    with col3:
+        st.metric("Predicted Monthly Profit", f"£{predicted_profit:,.0f}")
+    with col4:
+        st.metric("Annual Profit Potential", f"£{predicted_profit * 12:,.0f}")
+    
+    st.info(f"💡 **ROI Analysis**: These optimizations could generate £{predicted_profit * 12:,.0f} additional annual profit from improved search rankings.")
+    
+    # Profit at the inputs above, per product type and impact level
+    st.markdown("#### 🧮 Monthly Profit by Product Type")
+    segment_profit = roi_projection(store.segment_traffic, avg_conversion_rate, avg_order_value, profit_margin)[1]
+    segment_profit['Total'] = segment_profit.sum(axis=1)
+    segment_profit = segment_profit.sort_values('Total', ascending=False, kind='stable')
+    st.dataframe(segment_profit.map(lambda x: f"£{x:,.0f}").rename_axis("Product Type"), use_container_width=True)
+    
+    # Every scenario for every product type and impact level is evaluated at once;
+    # the selections below only slice and sum the precomputed grid
+    st.markdown("#### 📊 Profit Scenarios")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        conversion_rates = scenario_axis(st.slider("Conversion Rate range (%)", 0.1, 10.0, (1.0, 4.0), step=0.1))
+    with col2:
+        order_values = scenario_axis(st.slider("Order Value range (£)", 50.0, 2000.0, (250.0, 1000.0), step=50.0))
+    with col3:
+        margins = scenario_axis(st.slider("Profit Margin range (%)", 5.0, 80.0, (20.0, 40.0), step=5.0))
+    
+    grid = roi_scenario_grid(store.segment_traffic.to_numpy(), conversion_rates, order_values, margins)
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        product_type = st.selectbox("Scenario Product Type", ["All"] + list(store.segment_traffic.index))
+    with col2:
+        impact = st.selectbox("Scenario Impact", ["All"] + IMPACT_LEVELS)
+    with col3:
+        margin = st.select_slider("Scenario Profit Margin (%)", options=margins.tolist(), value=margins[len(margins) // 2].item())
+    
+    if product_type != "All":
+        grid = grid[[store.segment_traffic.index.get_loc(product_type)]]
+    if impact != "All":
+        grid = grid[:, [IMPACT_LEVELS.index(impact)]]
+    profit = grid.sum(axis=(0, 1))[:, :, margins.tolist().index(margin)]
+    
+    scenarios = pd.DataFrame(profit,
+                             index=pd.Index([f"{rate:g}%" for rate in conversion_rates], name="Conversion Rate"),
+                             columns=[f"£{value:,.0f}" for value in order_values])
+    st.caption(f"Monthly profit by conversion rate (rows) and average order value (columns) at a {margin:g}% margin")
+    st.dataframe(scenarios.map(lambda x: f"£{x:,.0f}"), use_container_width=True)
+
+def render_summary_results(store, recommendations):
+    """Impact/score/changes filters, the filtered summary table and its download"""
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        impact_filter = st.selectbox("Filter by Impact", ["All", "HIGH", "MEDIUM", "LOW"])
+    with col2:
+        min_score = st.slider("Minimum Priority Score", 0, 100, 0)
+    with col3:
+        show_changes_only = st.checkbox("Show changes only", value=True)
+    
+    # Apply filters (memoized per filter combination)
+    filters = (impact_filter, min_score, show_changes_only)
+    
+    st.subheader(f"📊 Filtered Results ({len(store.view(*filters))} products)")
+    
+    # Display the summary table one page at a time
+    summary_positions = paginated_summary(store, filters, key="summary")
+    
+    # Download options
+    st.markdown("---")
+    st.subheader("📥 Download Summary")
+    
+    lazy_download_button(
+        "summary_csv",
+        export_stamp(recommendations, summary_positions),
+        lambda: write_csv(store.rows(summary_positions)),
+        label="⬇️ Download Summary CSV",
+        file_name=f"optimization_summary_{st.session_state.get('gmc_file', 'gmc_feed')}.csv",
+        inputs=(recommendations, summary_positions)
+    )
+
+def render_quick_review(store, recommendations):
+    """Changed products only, with the essential columns"""
+    st.subheader("🎯 Quick Review - Key Changes Only")
+    
+    quick_columns = ['Original Title', 'Optimized Title', 'Title Reasoning', 'Original Description', 'Optimized Description', 'Description Reasoning', 'Impact']
+    changed_counts = store.impact_counts(changes_only=True)
+    
+    if not store.changed.any():
+        st.info("ℹ️ No changes were made to any products. All optimizations resulted in 'no optimization needed'.")
+        return
+    
+    # Show metrics for changes only
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Products Changed", int(store.changed.sum()))
+    with col2:
+        st.metric("High Impact Changes", changed_counts['HIGH'])
+    with col3:
+        st.metric("Medium Impact Changes", changed_counts['MEDIUM'])
+    
+    st.markdown("---")
+    
+    # Filter by impact
+    impact_filter_quick = st.selectbox("Filter by Impact", ["All", "HIGH", "MEDIUM", "LOW"], key="quick_filter")
+    quick_filters = (impact_filter_quick, 0, True)
+    
+    st.subheader(f"📋 Changes Only ({len(store.view(*quick_filters))} products)")
+    
+    # Display the simplified table one page at a time
+    quick_positions = paginated_summary(store, quick_filters, quick_columns, key="quick_review")
+    
+    # Download quick review
+    st.markdown("---")
+    lazy_download_button(
+        "quick_review_csv",
+        export_stamp(recommendations, quick_positions),
+        lambda: write_csv(store.rows(quick_positions, quick_columns)),
+        label="⬇️ Download Quick Review CSV",
+        file_name=f"quick_review_{st.session_state.get('gmc_file', 'gmc_feed')}.csv",
+        inputs=(recommendations, quick_positions)
+    )
+
+def paginated_summary(store, filters, columns=None, key="summary"):
+    """Searchable, sortable summary grid that ships only the visible page of rows to the browser.
+    
+    `filters` is the (impact, min_score, changes_only) store filter. Search and
+    sorting run server-side; long text cells are truncated unless their row is
+    expanded. Returns the row positions shown across all pages, so downloads
+    match the grid.
+    """
+    sortable = [column for column in store.frame.columns if columns is None or column in columns]
+    col1, col2, col3 = st.columns([3, 2, 1])
+    with col1:
+        search = st.text_input("🔍 Search products", key=f"{key}_search", placeholder='Titles, descriptions, keywords and reasoning - e.g. "oak dining table" or 404', help='Full-text search: words must all match, "quotes" match a phrase, and OR, NOT and prefix* are supported').strip()
+    with col2:
+        sort_by = st.selectbox("Sort by", ["Default order"] + sortable, key=f"{key}_sort")
+    with col3:
+        descending = st.checkbox("Descending", value=True, key=f"{key}_descending")
+    sort_by = None if sort_by == "Default order" else sort_by
+    
+    view = store.view(*filters, search=search, sort_by=sort_by, descending=descending)
+    
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        page_size = st.selectbox("Rows per page", SUMMARY_PAGE_SIZES, key=f"{key}_page_size")
+    page_count = max(1, -(-len(view) // page_size))
+    if st.session_state.get(f"{key}_page", 1) > page_count:
+        st.session_state[f"{key}_page"] = page_count
+    with col2:
+        page = st.number_input("Page", min_value=1, max_value=page_count, step=1, key=f"{key}_page")
+    start = (page - 1) * page_size
+    page_positions = view[start:start + page_size]
+    with col3:
+        if len(view):
+            st.caption(f"Showing {start + 1}-{start + len(page_positions)} of {len(view)} products · page {page} of {page_count}")
+        else:
+            st.caption("No products match the search")
+    
+    rows = store.rows(page_positions, columns)
+    display = rows.copy()
+    for column in SUMMARY_TEXT_COLUMNS:
+        if column in display.columns:
+            display[column] = truncate_text(display[column])
+    st.dataframe(display, use_container_width=True, hide_index=True)
+    
+    # Full text for one row of the visible page
+    labels = [f"{start + i + 1}. {product_id}" for i, product_id in enumerate(store.frame['Product ID'].iloc[page_positions])]
+    expanded = st.selectbox("Expand row", ["None"] + labels, key=f"{key}_expand")
+    if expanded != "None":
+        row = rows.iloc[labels.index(expanded)]
+        try:
+            container = st.container(border=True)
+        except TypeError:
+            # Bordered containers need Streamlit 1.29+
+            container = st.container()
+        with container:
+            # Feed and reasoning text is shown literally - it may contain Markdown or LaTeX characters
+            for column in rows.columns:
+                st.markdown(f"**{column}:**")
+                st.text(str(row[column]))
+    return view
+
+# Run history comparison
+
+# Rows of a run diff shown on the page (the CSV download has all of them)
+RUN_DIFF_DISPLAY_ROWS = 500
+
+def run_values(values, positions):
+    """values(positions) for the products present in a run, None where absent (position -1)"""
+    result = np.full(len(positions), None, dtype=object)
+    present = positions >= 0
+    if present.any():
+        result[present] = values(positions[present])
+    return result
+
+def load_run(run_id):
+    """A stored run's recommendations, shared between sessions through the server cache"""
+    return get_shared_cache().get_or_build(('run', run_id), lambda: get_run_history().load(run_id))
+
+def diff_runs(before, after):
+    """Vectorized comparison of two runs' optimized titles, matched on product ID.
+    
+    Returns one row per product whose optimized title changed, or that exists in
+    only one run, with the rule and keyword behind each title. The first row wins
+    for duplicated product IDs; rows are -1 where a product is absent.
+    """
+    before_ids = before.product_ids()
+    after_ids = after.product_ids()
+    before_positions = np.flatnonzero(~pd.Index(before_ids).duplicated())
+    after_positions = np.flatnonzero(~pd.Index(after_ids).duplicated())
+    before_index = pd.Index(before_ids[before_positions])
+    
+    matches = before_index.get_indexer(after_ids[after_positions])
+    matched = matches >= 0
+    changed = before.optimized_titles(before_positions[matches[matched]]).astype(str) != after.optimized_titles(after_positions[matched]).astype(str)
+    added = after_positions[~matched]
+    removed = before_positions[pd.Index(after_ids[after_positions]).get_indexer(before_ids[before_positions]) < 0]
+    
+    before_side = np.concatenate([before_positions[matches[matched]][changed], np.full(len(added), -1), removed])
+    after_side = np.concatenate([after_positions[matched][changed], added, np.full(len(removed), -1)])
+    return pd.DataFrame({
+        'Change': ['changed'] * int(changed.sum()) + ['added'] * len(added) + ['removed'] * len(removed),
+        'Product ID': np.concatenate([after_ids[after_side[:len(after_side) - len(removed)]], before_ids[removed]]),
+        'Previous Title': run_values(before.optimized_titles, before_side),
+        'Optimized Title': run_values(after.optimized_titles, after_side),
+        'Previous Rule': run_values(before.title_rules, before_side),
+        'Rule': run_values(after.title_rules, after_side),
+        'Previous Keyword': run_values(before.title_keywords, before_side),
+        'Keyword': run_values(after.title_keywords, after_side),
+        'Previous Row': before_side,
+        'Row': after_side
+    })
+
+def diff_reasoning(diff, before, after):
+    """Run diff rows with the title reasoning of both runs, rendered for those rows only"""
+    diff = diff.copy()
+    diff.insert(8, 'Previous Reasoning', run_values(before.title_reasoning, diff['Previous Row'].to_numpy()))
+    diff.insert(9, 'Reasoning', run_values(after.title_reasoning, diff['Row'].to_numpy()))
+    return diff
+
+# Quick Wins keyword index and SQL analytics over the keyword and recommendation tables
+
+# Furniture terms a keyword must contain to count as a quick win (its category is the first term it contains)
+QUICK_WIN_TERMS = ['sofa', 'chair', 'table', 'furniture', 'oak', 'dining', 'bedroom']
+
+# Keyword columns presorted for Quick Wins threshold queries
+QUICK_WIN_RANGE_COLUMNS = ['search_volume', 'position', 'difficulty', 'product_grid_position']
+
+# Rows of an ad-hoc query result shown on the page
+ADVANCED_QUERY_ROWS = 1000
+ADVANCED_QUERY_EXAMPLE = """SELECT keyword, category, search_volume, "position", difficulty
+FROM keywords
+WHERE category IS NOT NULL AND search_volume > 500
+ORDER BY search_volume DESC
+LIMIT 100"""
+
+class KeywordIndex:
+    """Keywords with a precomputed furniture category and sorted indexes for threshold queries.
+    
+    Built once per keyword dataset. Each numeric column is kept as sorted values
+    with their row order, so a threshold resolves to a slice with searchsorted;
+    the narrowest slice gives the candidates and the other thresholds are only
+    checked on those.
+    """
+    
+    def __init__(self, df_seo):
+        self.category = None
+        if 'keyword' in df_seo.columns:
+            lowered = df_seo['keyword'].str.lower()
+            matches = [lowered.str.contains(term, regex=False, na=False).to_numpy(dtype=bool) for term in QUICK_WIN_TERMS]
+            self.category = pd.Categorical.from_codes(np.select(matches, range(len(QUICK_WIN_TERMS)), default=-1), categories=QUICK_WIN_TERMS)
+        
+        self.values = {}
+        self.sorted = {}
+        for column in QUICK_WIN_RANGE_COLUMNS:
+            if column in df_seo.columns:
+                values = pd.to_numeric(df_seo[column], errors='coerce').to_numpy(dtype=float)
+                order = np.argsort(values, kind='stable')
+                self.values[column] = values
+                # NaN sorts last and never satisfies a threshold
+                self.sorted[column] = (values[order], order, int(np.count_nonzero(~np.isnan(values))))
+        
+        # Rank of each row by search volume, highest first (ties keep row order)
+        self.volume_rank = None
+        if 'search_volume' in self.sorted:
+            by_volume = np.argsort(-self.values['search_volume'], kind='stable')
+            self.volume_rank = np.empty(len(by_volume), dtype=np.int64)
+            self.volume_rank[by_volume] = np.arange(len(by_volume))
+    
+    def max_value(self, column, default):
+        sorted_values, _, valid = self.sorted.get(column, (None, None, 0))
+        return max(default, int(sorted_values[valid - 1])) if valid else default
+    
+    def range_positions(self, column, low=None, high=None):
+        """Row positions with low < value < high (None leaves that side open)"""
+        sorted_values, order, valid = self.sorted[column]
+        start = 0 if low is None else int(np.searchsorted(sorted_values[:valid], low, side='right'))
+        stop = valid if high is None else int(np.searchsorted(sorted_values[:valid], high, side='left'))
+        return order[start:max(start, stop)]
+    
+    def query(self, ranges, limit):
+        """Positions of furniture keywords within every (low, high) range in `ranges`, highest search volume first.
+        
+        Raises KeyError if the keyword column or a range column isn't available.
+        """
+        if self.category is None:
+            raise KeyError('keyword')
+        if self.volume_rank is None:
+            raise KeyError('search_volume')
+        candidates = min((self.range_positions(column, low, high) for column, (low, high) in ranges.items()), key=len)
+        mask = self.category.codes[candidates] >= 0
+        for column, (low, high) in ranges.items():
+            values = self.values[column][candidates]
+            if low is not None:
+                mask &= values > low
+            if high is not None:
+                mask &= values < high
+        candidates = candidates[mask]
+        return candidates[np.argsort(self.volume_rank[candidates])][:limit]
+
+def get_keyword_index(df_seo):
+    """Return the Quick Wins index for the session's keywords, shared between sessions loading the same data"""
+    cached = st.session_state.get('keyword_index')
+    if cached is None or cached[0] is not df_seo:
+        key = ('keyword_index', ENGINE_VERSION, session_fingerprint('seo', df_seo))
+        cached = (df_seo, get_shared_cache().get_or_build(key, lambda: KeywordIndex(df_seo)))
+        st.session_state['keyword_index'] = cached
+    return cached[1]
 
-/* Progress bar styling */
-.stProgress > div > div {
-    border-radius: 8px;
-    background: linear-gradient(90deg, #805ad5 0%, #667eea 100%);
-}
+# Columns of the "recommendations" SQL table (reasoning text is left out)
+RECOMMENDATION_TABLE_COLUMNS = ['product_id', 'current_title', 'optimized_title', 'current_description', 'optimized_description', 'priority_score', 'expected_impact', 'predicted_traffic_increase', 'predicted_ranking_improvement', 'changed', 'title_rule', 'targeted_keywords']
 
-/* Selectbox and input styling */
-.stSelectbox > div > div,
-.stTextInput > div > div > input {
-    font-family: 'Inter', sans-serif;
-    font-weight: 400;
-    border-radius: 6px;
-}
+def recommendation_table(recommendations):
+    """Recommendations as a flat table for SQL"""
+    table = recommendations.frame([column for column in RECOMMENDATION_TABLE_COLUMNS if column in RECOMMENDATION_COLUMNS])
+    table['changed'] = recommendations.changed()
+    table['title_rule'] = recommendations.title_rules()
+    table['targeted_keywords'] = recommendations.targeted_keywords()
+    return table
 
-/* File uploader styling */
-.stFileUploader > div {
-    font-family: 'Inter', sans-serif;
-    border-radius: 8px;
-    border: 2px dashed #cbd5e0;
-    transition: all 0.2s ease;
-}
+def keyword_table(df_seo):
+    """Keywords as a SQL table, with their row number and category"""
+    keywords = df_seo.assign(row_id=np.arange(len(df_seo)))
+    category = get_keyword_index(df_seo).category
+    if category is not None:
+        keywords['category'] = category
+    return keywords
 
-.stFileUploader > div:hover {
-    border-color: #805ad5;
-    background: #f7fafc;
-}
-</style>
-""", unsafe_allow_html=True)
+def sql_tables(df_seo, recommendations):
+    """Columns of each table the SQL engine offers, without building it"""
+    cached = st.session_state.get('sql_engine')
+    if cached is not None and cached[0] is df_seo and cached[1] is recommendations:
+        return cached[2].tables
+    tables = {'keywords': scalar_columns(df_seo) + ['row_id'] + (['category'] if get_keyword_index(df_seo).category is not None else [])}
+    if recommendations:
+        tables['recommendations'] = RECOMMENDATION_TABLE_COLUMNS
+    return tables
+
+def get_sql_engine(df_seo, recommendations):
+    """Return the session's SQL engine over the "keywords" and "recommendations" tables, rebuilt when either changes.
+    
+    Only built when a query is run - loading the recommendations copies every title and description.
+    """
+    cached = st.session_state.get('sql_engine')
+    if cached is None or cached[0] is not df_seo or cached[1] is not recommendations:
+        tables = {'keywords': keyword_table(df_seo)}
+        if recommendations:
+            tables['recommendations'] = recommendation_table(recommendations)
+        cached = (df_seo, recommendations, SQLEngine(tables))
+        st.session_state['sql_engine'] = cached
+    return cached[2]
+
+# Optimized feed export
+def build_optimized_feed(df_gmc, recommendations, positions=None):
+    """Join the original feed with its recommendations, optimized columns placed next to the originals.
+    
+    `positions` limits the join to a leading slice of the recommendations, e.g. for a preview.
+    """
+    rec_frame = recommendations.frame(['product_id', 'optimized_title', 'title_reasoning', 'optimized_description', 'description_reasoning', 'priority_score', 'expected_impact'], positions)
+    rec_frame = rec_frame.rename(columns={'priority_score': 'optimization_priority'})
+    optimization_columns = [col for col in rec_frame.columns if col != 'product_id']
+    
+    if 'id' in df_gmc.columns:
+        # Single keyed join on id - the first feed row wins for duplicated ids, unknown ids are skipped
+        originals = df_gmc[df_gmc['id'].notna()].drop_duplicates('id')
+        positions = pd.Index(originals['id']).get_indexer(rec_frame['product_id'])
+        found = positions >= 0
+        originals = originals.iloc[positions[found]]
+        rec_frame = rec_frame[found]
+    else:
+        # Recommendations without ids were generated in feed order, so align them by position
+        originals = df_gmc.iloc[:len(rec_frame)]
+        rec_frame = rec_frame.iloc[:len(originals)]
+    
+    originals = originals.drop(columns=[col for col in optimization_columns if col in originals.columns]).reset_index(drop=True)
+    df_optimized = pd.concat([originals, rec_frame[optimization_columns].reset_index(drop=True)], axis=1)
+    
+    # Place optimized columns next to their original columns
+    column_order = []
+    for col in originals.columns:
+        column_order.append(col)
+        if col == 'title':
+            column_order.extend(['optimized_title', 'title_reasoning'])
+        elif col == 'description':
+            column_order.extend(['optimized_description', 'description_reasoning'])
+    column_order.extend(col for col in optimization_columns if col not in column_order)
+    return df_optimized[column_order]
+
+def optimized_feed_size(df_gmc, recommendations):
+    """Rows of the optimized feed, counted from the product ids without building it"""
+    if 'id' in df_gmc.columns:
+        return int(pd.Series(recommendations.product_ids()).isin(df_gmc['id'].dropna()).sum())
+    return min(len(recommendations), len(df_gmc))
+
+def build_supplemental_delta(recommendations):
+    """Changed titles/descriptions only, keyed by product id, for a Merchant Center supplemental feed"""
+    rec_frame = recommendations.frame(['product_id', 'current_title', 'optimized_title', 'current_description', 'optimized_description'])
+    delta = pd.DataFrame({
+        'id': rec_frame['product_id'],
+        'title': rec_frame['optimized_title'],
+        'description': rec_frame['optimized_description'],
+        'title_changed': (rec_frame['current_title'] != rec_frame['optimized_title']).to_numpy(),
+        'description_changed': (rec_frame['current_description'] != rec_frame['optimized_description']).to_numpy()
+    })
+    delta = delta[delta['id'].notna() & (delta['title_changed'] | delta['description_changed'])]
+    return delta.drop_duplicates('id').reset_index(drop=True)
 
-# Authentication system
-def check_credentials(username, password):
-    """Check if credentials are valid"""
-    valid_users = {
-        "oakfurniture": "OFL2024!",
-        "admin": "Admin123!",
-        "seo": "SEO2024!"
-    }
-    return valid_users.get(username) == password
 
 # Initialize session state for authentication
 if 'authenticated' not in st.session_state:
@@ -266,6 +2326,19 @@ if not st.session_state['authenticated']:
     st.markdown('</div>', unsafe_allow_html=True)
     st.stop()
 
+# pandas, numpy and the app's modules (which import them) are only needed past the
+# login form - importing them here lets a cold start show the form without waiting
+import pandas as pd
+import numpy as np
+
+from analytics import ENGINE_NAME, QueryError, SQLEngine, scalar_columns
+from campaigns import MAX_CONCURRENT_FETCHES, CampaignError, fetch_campaigns, fetch_keywords, load_campaigns, load_config, read_feed
+from feed_export import cached_export, export_stamp, format_size, lazy_download_button, write_csv, write_supplemental_tsv, write_supplemental_xml, write_xlsx
+from run_history import get_run_history
+from search_index import SearchIndex
+from session_memory import manage_session_memory, record_activity, session_memory_usage
+from shared_cache import fingerprint, get_shared_cache, session_fingerprint
+
 # Show logout button
 if st.session_state['authenticated']:
     col1, col2, col3 = st.columns([1, 1, 1])
@@ -279,6 +2352,9 @@ st.title("🛒 Oak Furniture Land GMC Feed Optimizer")
 st.subheader("Strategic product feed optimization using search volume + PPC intelligence")
 st.caption("Version 3.4 - TABBED OPTIMIZATION SUMMARY")
 
+# Reload data spilled to disk while this session was idle, and spill/evict other idle sessions
+session_evicted = manage_session_memory()
+
 # Initialize session state with persistence
 if 'sitebulb_data' not in st.session_state:
     st.session_state['sitebulb_data'] = None
@@ -293,6 +2369,12 @@ if 'gmc_file' not in st.session_state:
 if 'sitebulb_file' not in st.session_state:
     st.session_state['sitebulb_file'] = None
 
+# Collect results from a finished background optimization run
+optimization_worker = st.session_state.get('optimization_worker')
+if optimization_worker is not None and not optimization_worker.is_alive():
+    if st.session_state.get('optimization_recommendations') is not optimization_worker.recommendations:
+        st.session_state['optimization_recommendations'] = optimization_worker.recommendations
+
 # Data Status Header - Shows what's loaded and analysis readiness
 st.markdown("### 📊 Data Status & Analysis Readiness")
 
@@ -353,6 +2435,20 @@ if st.session_state['sitebulb_data'] is not None:
 else:
     st.sidebar.warning("⚠️ No Sitebulb data")
 
+memory_usage = session_memory_usage()
+st.sidebar.caption(f"🧠 Session memory: {format_size(sum(memory_usage.values()))}")
+if memory_usage:
+    with st.sidebar.expander("Memory breakdown"):
+        for label, size in sorted(memory_usage.items(), key=lambda item: -item[1]):
+            st.write(f"{label}: {format_size(size)}")
+
+if session_evicted:
+    st.sidebar.warning("⏳ This session was idle too long and its data was cleared - please load it again.")
+
+if optimization_worker is not None and optimization_worker.is_alive():
+    worker_snapshot = optimization_worker.snapshot()
+    st.sidebar.info(f"🔄 Optimization running: {worker_snapshot['processed']}/{worker_snapshot['total']} products")
+
 st.sidebar.markdown("---")
 
 page = st.sidebar.selectbox("Choose a section", [
@@ -360,8 +2456,10 @@ page = st.sidebar.selectbox("Choose a section", [
     "Sitebulb Upload",
     "SEOMonitor API", 
     "Strategic Optimization",
+    "Batch Campaigns",
     "Quick Wins",
     "Optimization Summary",
+    "Run History",
     "Export Optimized Feed"
 ])
 
@@ -390,6 +2488,9 @@ if page == "GMC Feed Upload":
             
             st.success(f"✅ GMC feed uploaded! {len(df)} products loaded.")
             st.session_state['gmc_feed'] = df
+            
+            # Normalize product text once so the optimization rules don't re-lowercase it per check
+            get_feed_text(df)
             st.session_state['gmc_file'] = uploaded_file.name
             st.dataframe(df.head(10))
                 
@@ -432,8 +2533,7 @@ elif page == "SEOMonitor API":
     
     # Try to load config
     try:
-        config = configparser.ConfigParser()
-        config.read('config_oak_furniture.ini')
+        config = load_config()
         api_key = config['SEOMonitor']['api_key']
         campaign_id = config['SEOMonitor']['campaign_id']
         brand_name = config['Brand']['name']
@@ -443,48 +2543,9 @@ elif page == "SEOMonitor API":
         
         if st.button("🔍 Fetch ALL Keywords (Paginated)"):
             with st.spinner("🔄 Fetching ALL keyword data with pagination..."):
-                # Enhanced API call with pagination
-                headers = {
-                    'Authorization': api_key,
-                    'X-Token': api_key,
-                    'Accept': 'application/json'
-                }
-                
-                end_date = datetime.now()
-                start_date = end_date - timedelta(days=90)
-                
-                all_keywords = []
-                offset = 0
-                limit = 200
-                
-                while True:
-                    params = {
-                        'campaign_id': campaign_id,
-                        'start_date': start_date.strftime('%Y-%m-%d'),
-                        'end_date': end_date.strftime('%Y-%m-%d'),
-                        'include_all_groups': 'true',
-                        'limit': limit,
-                        'offset': offset
-                    }
-                    
-                    url = f"https://apigw.seomonitor.com/v3/rank-tracker/v3.0/keywords"
-                    response = requests.get(url, headers=headers, params=params)
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        if isinstance(data, list) and len(data) > 0:
-                            all_keywords.extend(data)
-                            offset += len(data)
-                            st.write(f"📊 Fetched {len(data)} keywords (Total: {len(all_keywords)})")
-                            
-                            # Safety cap to avoid infinite loops
-                            if len(data) < limit or len(all_keywords) >= 10000:
-                                break
-                        else:
-                            break
-                    else:
-                        st.error(f"❌ API Error: {response.status_code}")
-                        break
+                all_keywords, error = fetch_keywords(api_key, campaign_id, on_page=lambda count, total: st.write(f"📊 Fetched {count} keywords (Total: {total})"))
+                if error:
+                    st.error(f"❌ {error}")
                 
                 if all_keywords:
                     df_seo = pd.DataFrame(all_keywords)
@@ -539,807 +2600,288 @@ elif page == "Strategic Optimization":
         if preview_mode:
             st.info("🔍 Preview mode: Will analyze first 10 products only for testing")
         
-        if st.button("🚀 Generate Intelligent Optimizations", type="primary"):
+        
+        worker = st.session_state.get('optimization_worker')
+        worker_running = worker is not None and worker.is_alive()
+        
+        if st.button("🚀 Generate Intelligent Optimizations", type="primary", disabled=worker_running):
             if df_seo is not None:
-                with st.spinner("🧠 AI is analyzing SEO data and optimizing all products..."):
-                    # Initialize progress bar
-                    progress_bar = st.progress(0)
-                    status_text = st.empty()
-                    
-                    # Get Sitebulb data if available
-                    df_sitebulb = st.session_state.get('sitebulb_data')
-                    
-                    # Get optimization recommendations
-                    recommendations = []
-                    total_products = len(df_gmc)
-                    
-                    # Apply preview mode if enabled
-                    if preview_mode:
-                        total_products = min(10, total_products)
-                        st.info(f"🔍 Preview mode: Analyzing first {total_products} products only")
-                    
-                    for i, (_, product) in enumerate(df_gmc.iterrows()):
-                        # Update progress
-                        progress = (i + 1) / total_products
-                        progress_bar.progress(progress)
-                        status_text.text(f"🎯 Analyzing product {i+1}/{total_products}: {product.get('title', 'Unknown')[:50]}...")
-                        
-                        # Get product data
-                        product_title = str(product.get('title', ''))
-                        product_desc = str(product.get('description', ''))
-                        product_id = product.get('id', f'product_{i}')
-                        product_text = f"{product_title} {product_desc}".lower()
-                        
-                        # Initialize optimization
-                        optimized_title = product_title
-                        optimized_desc = product_desc
-                        title_reasoning = "No optimization needed"
-                        description_reasoning = "No optimization needed"
-                        priority_score = 0
-                        expected_impact = "LOW"
+                total_products = len(df_gmc)
+                
+                # Apply preview mode if enabled
+                if preview_mode:
+                    total_products = min(10, total_products)
+                
+                # Run the engine on a background worker tied to this session
+                df_sitebulb = st.session_state.get('sitebulb_data')
+                fingerprints = (session_fingerprint('gmc', df_gmc), session_fingerprint('seo', df_seo), session_fingerprint('sitebulb', df_sitebulb))
+                worker = OptimizationWorker(df_gmc, get_feed_text(df_gmc), df_seo, df_sitebulb, total_products,
+                                            shared_cache=get_shared_cache(), fingerprints=fingerprints,
+                                            run_history=get_run_history(), source_file=st.session_state.get('gmc_file'))
+                worker.start()
+                st.session_state['optimization_worker'] = worker
+                worker_running = True
+            else:
+                st.error("❌ SEOMonitor data required for AI optimization.")
+        
+        if worker_running:
+            if fragment is not None:
+                fragment(run_every=worker.publish_interval)(render_optimization_progress)(worker)
+            else:
+                render_optimization_progress(worker)
+                time.sleep(worker.publish_interval)
+                st.rerun()
+        elif worker is not None:
+            snapshot = worker.snapshot()
+            recommendations = worker.recommendations
+            
+            if snapshot['status'] == 'cancelled':
+                st.warning(f"⏹️ Optimization cancelled after {snapshot['processed']}/{snapshot['total']} products - partial results kept.")
+            elif snapshot['status'] == 'error':
+                st.error(f"❌ Optimization stopped after {snapshot['processed']}/{snapshot['total']} products: {snapshot['error']}")
+            elif worker.from_shared_cache:
+                st.info("⚡ Loaded instantly - another session already optimized this feed with the same keyword and crawl data.")
+            
+            # Show results
+            st.success(f"✅ Generated intelligent optimizations for {len(recommendations)} products!")
+            if worker.run_id is not None:
+                st.caption(f"🗂️ Saved to run history as run #{worker.run_id}")
+            elif worker.history_error:
+                st.warning(f"⚠️ Run not saved to history: {worker.history_error}")
+            
+            # Show summary
+            impact_counts = recommendations.impact_counts()
+            high_impact = impact_counts['HIGH']
+            medium_impact = impact_counts['MEDIUM']
+            low_impact = impact_counts['LOW']
+            
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("High Impact", high_impact)
+            with col2:
+                st.metric("Medium Impact", medium_impact)
+            with col3:
+                st.metric("Low Impact", low_impact)
+            
+            st.info("💡 Intelligent optimizations complete! Based on actual SEO performance data.")
+            
+            # Show debugging info
+            if recommendations:
+                st.subheader("🔍 Debugging Info")
+                optimized_positions = np.flatnonzero(~recommendations.title_reasoning_is_default())
+                optimized_count = len(optimized_positions)
+                st.write(f"Products with optimizations: {optimized_count}/{len(recommendations)}")
+                product_groups = worker.feed_text['text'].head(len(recommendations)).nunique()
+                st.write(f"Keyword matching ran once per product group: {product_groups} groups for {len(recommendations)} products (duplicates and variants sharing a title and description are matched together)")
+                
+                # Show search volume data availability
+                if df_seo is not None:
+                    st.subheader("📊 SEOMonitor Search Volume Analysis")
+                    try:
+                        total_keywords = len(df_seo)
+                        keywords_with_volume = len(df_seo[df_seo['search_volume'] > 0])
+                        avg_search_volume = df_seo['search_volume'].mean()
+                        max_search_volume = df_seo['search_volume'].max()
                         
-                        # TRULY INTELLIGENT SEO OPTIMIZATION BASED ON PERFORMANCE DATA
+                        col1, col2, col3, col4 = st.columns(4)
+                        with col1:
+                            st.metric("Total Keywords", total_keywords)
+                        with col2:
+                            st.metric("Keywords with Volume", keywords_with_volume)
+                        with col3:
+                            st.metric("Avg Search Volume", f"{avg_search_volume:.0f}")
+                        with col4:
+                            st.metric("Max Search Volume", max_search_volume)
                         
-                        # 1. Find TRULY relevant keywords with actual ranking data
-                        relevant_keywords = []
-                        product_words = set(product_text.lower().split())
+                        # Show sample of high-volume keywords
+                        high_volume_keywords = df_seo[df_seo['search_volume'] > 1000].head(10)
+                        if not high_volume_keywords.empty:
+                            st.write("**High Volume Keywords (>1000 searches):**")
+                            st.dataframe(high_volume_keywords[['keyword', 'search_volume', 'position']])
                         
-                        # Define furniture-related terms for better matching
-                        furniture_terms = {'sofa', 'chair', 'table', 'desk', 'bed', 'furniture', 'oak', 'wood', 'fabric', 'leather', 'dining', 'living', 'bedroom', 'office', 'recliner', 'storage', 'cabinet', 'wardrobe', 'dresser', 'bookshelf', 'coffee', 'side', 'dining', 'kitchen', 'bathroom', 'outdoor', 'garden'}
+                        # Show easy win opportunities
+                        easy_wins = df_seo[
+                            (df_seo['search_volume'] > 300) & 
+                            (df_seo['search_volume'] < 2000) & 
+                            (df_seo['position'] > 30) &
+                            (df_seo['difficulty'] < 40)
+                        ].sort_values('search_volume', ascending=False).head(5)
                         
-                        for _, keyword_row in df_seo.iterrows():
-                            keyword = str(keyword_row.get('keyword', ''))
-                            if keyword:
-                                keyword_words = set(keyword.lower().split())
-                                
-                                # Extract search volume from nested data structures
-                                search_volume = 0
-                                position = 999
-                                difficulty = 0
-                                
-                                # Try to extract search volume from different possible locations
-                                try:
-                                    # Method 1: Direct search_volume field
-                                    search_volume = keyword_row.get('search_volume', 0)
-                                except:
-                                    pass
-                                
-                                if search_volume == 0:
-                                    try:
-                                        # Method 2: Alternative field names
-                                        search_volume = keyword_row.get('volume', 0)
-                                        if search_volume == 0:
-                                            search_volume = keyword_row.get('monthly_searches', 0)
-                                        if search_volume == 0:
-                                            search_volume = keyword_row.get('search_volume_monthly', 0)
-                                    except:
-                                        pass
-                                
-                                if search_volume == 0:
-                                    try:
-                                        # Method 3: From search_data (nested JSON)
-                                        search_data = keyword_row.get('search_data', {})
-                                        if isinstance(search_data, dict):
-                                            search_volume = search_data.get('search_volume', 0)
-                                            if search_volume == 0:
-                                                search_volume = search_data.get('volume', 0)
-                                            if search_volume == 0:
-                                                search_volume = search_data.get('monthly_searches', 0)
-                                        elif isinstance(search_data, list) and len(search_data) > 0:
-                                            search_volume = search_data[0].get('search_volume', 0)
-                                            if search_volume == 0:
-                                                search_volume = search_data[0].get('volume', 0)
-                                            if search_volume == 0:
-                                                search_volume = search_data[0].get('monthly_searches', 0)
-                                    except:
-                                        pass
-                                
-                                if search_volume == 0:
-                                    try:
-                                        # Method 4: From traffic_data (nested JSON)
-                                        traffic_data = keyword_row.get('traffic_data', {})
-                                        if isinstance(traffic_data, dict):
-                                            search_volume = traffic_data.get('search_volume', 0)
-                                            if search_volume == 0:
-                                                search_volume = traffic_data.get('volume', 0)
-                                            if search_volume == 0:
-                                                search_volume = traffic_data.get('monthly_searches', 0)
-                                    except:
-                                        pass
-                                
-                                # Try to extract position from different possible locations
-                                try:
-                                    # Method 1: Direct position field
-                                    position = keyword_row.get('position', 999)
-                                except:
-                                    pass
-                                
-                                if position == 999:
-                                    try:
-                                        # Method 2: From ranking_data (nested JSON)
-                                        ranking_data = keyword_row.get('ranking_data', {})
-                                        if isinstance(ranking_data, dict):
-                                            position = ranking_data.get('desktop', {}).get('rank', 999)
-                                            if position == 999:
-                                                position = ranking_data.get('mobile', {}).get('rank', 999)
-                                    except:
-                                        pass
-                                
-                                # Try to extract difficulty from different possible locations
-                                try:
-                                    # Method 1: Direct difficulty field
-                                    difficulty = keyword_row.get('difficulty', 0)
-                                except:
-                                    pass
-                                
-                                if difficulty == 0:
-                                    try:
-                                        # Method 2: From opportunity field
-                                        opportunity = keyword_row.get('opportunity', {})
-                                        if isinstance(opportunity, dict):
-                                            difficulty = opportunity.get('difficulty', 0)
-                                        elif isinstance(opportunity, str):
-                                            # Convert text difficulty to numeric
-                                            if 'top_30' in opportunity.lower():
-                                                difficulty = 30
-                                            elif 'top_10' in opportunity.lower():
-                                                difficulty = 10
-                                            elif 'top_50' in opportunity.lower():
-                                                difficulty = 50
-                                    except:
-                                        pass
-                                
-                                # Extract product grid ranking data (Shopping/Product results)
-                                product_grid_position = 999
-                                try:
-                                    # Look for shopping/product grid rankings
-                                    serp_data = keyword_row.get('serp_data', {})
-                                    if isinstance(serp_data, dict):
-                                        # Check for shopping results
-                                        shopping_results = serp_data.get('shopping_results', {})
-                                        if isinstance(shopping_results, dict):
-                                            product_grid_position = shopping_results.get('position', 999)
-                                        
-                                        # Check for product results
-                                        product_results = serp_data.get('product_results', {})
-                                        if isinstance(product_results, dict):
-                                            product_grid_position = product_results.get('position', 999)
-                                        
-                                        # Check for local pack results
-                                        local_pack = serp_data.get('local_pack', {})
-                                        if isinstance(local_pack, dict):
-                                            product_grid_position = local_pack.get('position', 999)
-                                except:
-                                    pass
-                                
-                                # Ensure all values are numbers
-                                try:
-                                    search_volume = float(search_volume) if search_volume is not None else 0
-                                    position = float(position) if position is not None else 999
-                                    difficulty = float(difficulty) if difficulty is not None else 0
-                                except (ValueError, TypeError):
-                                    search_volume = 0
-                                    position = 999
-                                    difficulty = 0
-                                
-                                # STRICT RELEVANCE CHECKING
-                                # 1. Must have actual search volume (> 0)
-                                # 2. Must be semantically relevant to the product
-                                if search_volume > 0:
-                                    # Check for semantic relevance
-                                    is_relevant = False
-                                    
-                                    # Check if keyword contains furniture-related terms
-                                    if keyword_words.intersection(furniture_terms):
-                                        is_relevant = True
-                                    
-                                    # Check if keyword is directly in product text
-                                    elif keyword.lower() in product_text.lower():
-                                        is_relevant = True
-                                    
-                                    # Check for word overlap with product (but be more strict)
-                                    elif len(keyword_words.intersection(product_words)) >= 2:  # At least 2 words must match
-                                        is_relevant = True
-                                    
-                                    if is_relevant:
-                                        relevant_keywords.append({
-                                            'keyword': keyword,
-                                            'position': position,
-                                            'search_volume': search_volume,
-                                            'difficulty': difficulty,
-                                            'product_grid_position': product_grid_position
-                                        })
+                        if not easy_wins.empty:
+                            st.write("**Easy Win Opportunities (low difficulty, good volume):**")
+                            st.dataframe(easy_wins[['keyword', 'search_volume', 'position', 'difficulty']])
+                    except KeyError:
+                        st.warning("⚠️ SEOMonitor data doesn't have 'search_volume' column. Available columns:")
+                        st.write(list(df_seo.columns))
+                        st.info("💡 The optimization logic will use AI fallback instead of search volume data.")
                         
-                        # 2. INTELLIGENT ANALYSIS BASED ON ACTUAL PERFORMANCE PATTERNS
-                        if relevant_keywords:
-                            # Sort by search volume to prioritize opportunities
-                            relevant_keywords.sort(key=lambda x: x['search_volume'], reverse=True)
-                            
-                            # ANALYZE WHAT MAKES PRODUCTS RANK WELL
-                            # Find keywords ranking in top 10 (successful patterns)
-                            top_performers = [kw for kw in relevant_keywords if kw['position'] <= 10 and kw['search_volume'] > 0]
-                            
-                            # Find keywords ranking poorly but with high volume (opportunities)
-                            poor_performers = [kw for kw in relevant_keywords if kw['position'] > 20 and kw['search_volume'] > 500]
-                            
-                            # Find high-volume keywords we're not ranking for (gaps)
-                            missing_opportunities = [kw for kw in relevant_keywords if kw['search_volume'] > 1000 and kw['position'] > 50]
-                            
-                            # Find low-difficulty, high-volume opportunities (easier wins)
-                            easy_wins = [kw for kw in relevant_keywords if kw['difficulty'] < 30 and kw['search_volume'] > 300 and kw['position'] > 30]
-                            
-                            # Find product grid opportunities (Shopping/Product results)
-                            product_grid_opportunities = [kw for kw in relevant_keywords if kw['product_grid_position'] > 10 and kw['search_volume'] > 200]
-                            
-                            # Find product grid winners (already ranking well in shopping)
-                            product_grid_winners = [kw for kw in relevant_keywords if kw['product_grid_position'] <= 5 and kw['search_volume'] > 100]
-                            
-                            # 3. LOGICAL OPTIMIZATION DECISIONS BASED ON SEO PATTERNS
-                            
-                            # TITLE OPTIMIZATION - Prioritize easy wins first
-                            if easy_wins:
-                                # Focus on low-difficulty, high-volume opportunities first
-                                best_easy_win = easy_wins[0]
-                                optimized_title = f"{best_easy_win['keyword'].title()} | {product_title}"
-                                title_reasoning = f"EASY WIN: Target '{best_easy_win['keyword']}' - SEOMonitor data shows {best_easy_win['search_volume']:,} monthly searches, difficulty {best_easy_win['difficulty']}/100, currently ranking #{best_easy_win['position']} (huge opportunity to move to top 10)"
-                                priority_score += 70
-                                
-                            elif product_grid_opportunities:
-                                # Focus on product grid opportunities (Shopping results)
-                                best_grid_opportunity = product_grid_opportunities[0]
-                                optimized_title = f"{best_grid_opportunity['keyword'].title()} | {product_title}"
-                                title_reasoning = f"PRODUCT GRID OPPORTUNITY: Target '{best_grid_opportunity['keyword']}' - SEOMonitor shows {best_grid_opportunity['search_volume']:,} monthly searches but only ranking #{best_grid_opportunity['product_grid_position']} in Google Shopping (organic #{best_grid_opportunity['position']}) - optimize for shopping visibility"
-                                priority_score += 65
-                                
-                            elif product_grid_winners:
-                                # Reinforce product grid winners
-                                best_grid_winner = product_grid_winners[0]
-                                if best_grid_winner['keyword'].lower() not in product_title.lower():
-                                    optimized_title = f"{best_grid_winner['keyword'].title()} | {product_title}"
-                                    title_reasoning = f"PRODUCT GRID WINNER: Reinforce '{best_grid_winner['keyword']}' - SEOMonitor data shows {best_grid_winner['search_volume']:,} monthly searches, ranking #1-#{best_grid_winner['product_grid_position']} in Google Shopping (maintain this strong position)"
-                                    priority_score += 60
-                                
-                            elif top_performers:
-                                # Analyze what makes top performers successful
-                                best_performer = top_performers[0]
-                                
-                                # Check if the successful keyword is prominently placed in title
-                                if best_performer['keyword'].lower() not in product_title.lower():
-                                    # Move successful keyword to front of title
-                                    optimized_title = f"{best_performer['keyword'].title()} {product_title}"
-                                    title_reasoning = f"TOP PERFORMER: Move '{best_performer['keyword']}' to front - SEOMonitor shows {best_performer['search_volume']:,} monthly searches, currently ranking #{best_performer['position']} (proven winner, move to front for better visibility)"
-                                    priority_score += 40
-                                else:
-                                    # Keyword is in title but not prominent - restructure
-                                    words = product_title.split()
-                                    keyword_words = best_performer['keyword'].lower().split()
-                                    
-                                    # Find where keyword appears and move to front
-                                    for i, word in enumerate(words):
-                                        if word.lower() in keyword_words:
-                                            # Move keyword to front
-                                            keyword_part = ' '.join([w for w in words if w.lower() in keyword_words])
-                                            remaining_words = [w for w in words if w.lower() not in keyword_words]
-                                            optimized_title = f"{keyword_part.title()} {' '.join(remaining_words)}"
-                                            title_reasoning = f"RESTRUCTURE WINNER: Move '{best_performer['keyword']}' to front - SEOMonitor data shows {best_performer['search_volume']:,} monthly searches, ranking #{best_performer['position']} (already successful, optimize placement)"
-                                            priority_score += 35
-                                            break
-                                    
-                            elif poor_performers:
-                                # Focus on improving poor performers with high volume
-                                best_opportunity = poor_performers[0]
-                                
-                                # Check if keyword is in title but not prominent
-                                if best_opportunity['keyword'].lower() in product_title.lower():
-                                    # Keyword is there but not working - move to front
-                                    words = product_title.split()
-                                    keyword_words = best_opportunity['keyword'].lower().split()
-                                    
-                                    # Move keyword to front
-                                    keyword_part = ' '.join([w for w in words if w.lower() in keyword_words])
-                                    remaining_words = [w for w in words if w.lower() not in keyword_words]
-                                    optimized_title = f"{keyword_part.title()} {' '.join(remaining_words)}"
-                                    title_reasoning = f"IMPROVE POOR PERFORMER: Move '{best_opportunity['keyword']}' to front - SEOMonitor shows {best_opportunity['search_volume']:,} monthly searches but only ranking #{best_opportunity['position']} (high volume, poor ranking = big opportunity)"
-                                    priority_score += 45
-                                else:
-                                    # Add missing high-volume keyword
-                                    optimized_title = f"{best_opportunity['keyword'].title()} {product_title}"
-                                    title_reasoning = f"HIGH-VOLUME OPPORTUNITY: Add '{best_opportunity['keyword']}' - SEOMonitor data shows {best_opportunity['search_volume']:,} monthly searches, currently ranking #{best_opportunity['position']} (add this high-volume keyword)"
-                                    priority_score += 50
-                                    
-                            elif missing_opportunities:
-                                # Target completely missing high-volume keywords
-                                best_missing = missing_opportunities[0]
-                                optimized_title = f"{best_missing['keyword'].title()} {product_title}"
-                                title_reasoning = f"MISSING OPPORTUNITY: Target '{best_missing['keyword']}' - SEOMonitor shows {best_missing['search_volume']:,} monthly searches, ranking #{best_missing['position']} (not ranking well for high-volume keyword)"
-                                priority_score += 60
-                            
-                            # DESCRIPTION OPTIMIZATION - Based on successful patterns
-                            if top_performers:
-                                # Use successful keywords in description for reinforcement
-                                best_performer = top_performers[0]
-                                if best_performer['keyword'].lower() not in product_desc.lower():
-                                    optimized_desc = f"{product_desc} {best_performer['keyword'].title()}"
-                                    description_reasoning = f"Reinforce successful keyword '{best_performer['keyword']}' in description (ranks #{best_performer['position']}) - helps maintain ranking"
-                                    priority_score += 25
-                            
-                            # 4. Calculate impact based on actual SEO value
-                            if priority_score >= 60:
-                                expected_impact = "HIGH"
-                            elif priority_score >= 35:
-                                expected_impact = "MEDIUM"
-                            else:
-                                expected_impact = "LOW"
-                        else:
-                            # No relevant keywords found - use AI intelligence for basic optimization
-                            # AI-POWERED FALLBACK OPTIMIZATION
-                            
-                            # Extract key product attributes for intelligent optimization
-                            product_words = product_text.lower().split()
-                            
-                            # Identify product type and key features
-                            product_type = None
-                            material = None
-                            color = None
-                            brand = None
-                            
-                            # Common furniture types
-                            furniture_types = {
-                                'sofa': ['sofa', 'settee', 'couch', 'recliner'],
-                                'chair': ['chair', 'dining chair', 'office chair', 'armchair'],
-                                'table': ['table', 'dining table', 'coffee table', 'side table', 'desk'],
-                                'bed': ['bed', 'bedroom', 'mattress', 'headboard'],
-                                'storage': ['wardrobe', 'cabinet', 'dresser', 'bookshelf', 'storage'],
-                                'dining': ['dining', 'dining room', 'dining set'],
-                                'living': ['living room', 'lounge', 'living'],
-                                'office': ['office', 'desk', 'office chair', 'office furniture']
-                            }
-                            
-                            # Identify product type
-                            for ftype, keywords in furniture_types.items():
-                                if any(kw in product_text.lower() for kw in keywords):
-                                    product_type = ftype
-                                    break
-                            
-                            # Extract material - be more specific and accurate
-                            materials = ['oak', 'wood', 'fabric', 'leather', 'metal', 'glass', 'marble', 'mink', 'velvet', 'cotton', 'linen', 'beige', 'plush', 'modular']
-                            for mat in materials:
-                                if mat in product_text.lower():
-                                    material = mat
-                                    break
-                            
-                            # Special case: if it's a fabric sofa, use "Fabric" not "Oak"
-                            if 'fabric' in product_text.lower() and 'sofa' in product_text.lower():
-                                material = 'fabric'
-                            elif 'leather' in product_text.lower() and 'sofa' in product_text.lower():
-                                material = 'leather'
-                            elif 'oak' in product_text.lower() and ('table' in product_text.lower() or 'chair' in product_text.lower()):
-                                material = 'oak'
-                            
-                            # Extract color
-                            colors = ['white', 'black', 'brown', 'grey', 'gray', 'beige', 'cream', 'navy', 'blue', 'red', 'green', 'mink', 'charcoal']
-                            for col in colors:
-                                if col in product_text.lower():
-                                    color = col
-                                    break
-                            
-                            # Extract brand
-                            if 'oak furnitureland' in product_text.lower():
-                                brand = 'Oak Furnitureland'
-                            
-                            # AI INTELLIGENT OPTIMIZATION BASED ON PRODUCT ANALYSIS
-                            if product_type and material:
-                                # Check if material is already prominent in title
-                                material_already_prominent = material.lower() in product_title.lower()[:50]  # Check first 50 chars
-                                
-                                # INTELLIGENT PRODUCT INTENT ANALYSIS
-                                # Analyze what customers are actually searching for based on product attributes
-                                
-                                # Extract additional product attributes for better targeting
-                                size_info = ""
-                                style_info = ""
-                                color_info = ""
-                                special_features = []
-                                
-                                # Look for size information
-                                if any(size in product_text.lower() for size in ['2 seat', '3 seat', '4 seat', 'corner', 'modular']):
-                                    if '2 seat' in product_text.lower():
-                                        size_info = "2 Seater"
-                                    elif '3 seat' in product_text.lower():
-                                        size_info = "3 Seater"
-                                    elif '4 seat' in product_text.lower():
-                                        size_info = "4 Seater"
-                                    elif 'corner' in product_text.lower():
-                                        size_info = "Corner"
-                                    elif 'modular' in product_text.lower():
-                                        size_info = "Modular"
-                                
-                                # Look for style information
-                                if any(style in product_text.lower() for style in ['modern', 'contemporary', 'traditional', 'classic', 'luxury', 'premium']):
-                                    for style in ['modern', 'contemporary', 'traditional', 'classic', 'luxury', 'premium']:
-                                        if style in product_text.lower():
-                                            style_info = style.title()
-                                            break
-                                
-                                # Look for color information
-                                if any(color in product_text.lower() for color in ['beige', 'brown', 'grey', 'gray', 'white', 'black', 'navy', 'blue']):
-                                    for color in ['beige', 'brown', 'grey', 'gray', 'white', 'black', 'navy', 'blue']:
-                                        if color in product_text.lower():
-                                            color_info = color.title()
-                                            break
-                                
-                                # Look for special features
-                                if 'recliner' in product_text.lower():
-                                    special_features.append('Recliner')
-                                if 'storage' in product_text.lower():
-                                    special_features.append('Storage')
-                                if 'power' in product_text.lower():
-                                    special_features.append('Power')
-                                
-                                # CREATE INTELLIGENT TITLE BASED ON SEARCH INTENT
-                                # Prioritize what customers actually search for
-                                search_intent_keywords = []
-                                
-                                # Add size if it's a key differentiator
-                                if size_info and size_info in ['2 Seater', '3 Seater', '4 Seater', 'Corner']:
-                                    search_intent_keywords.append(size_info)
-                                
-                                # Add material (but only if it's a key selling point)
-                                if material in ['leather', 'fabric', 'oak', 'wood']:
-                                    search_intent_keywords.append(f"{material.title()}")
-                                
-                                # Add product type
-                                search_intent_keywords.append(f"{product_type.title()}")
-                                
-                                # Add special features if they're important
-                                if special_features:
-                                    search_intent_keywords.extend(special_features[:1])  # Limit to 1 special feature
-                                
-                                # Create optimized title with search intent
-                                if search_intent_keywords:
-                                    intent_keywords = " ".join(search_intent_keywords)
-                                    optimized_title = f"{intent_keywords} | {product_title}"
-                                    title_reasoning = f"AI optimization: Prioritize '{intent_keywords}' - matches customer search intent for {product_type} with {material} material"
-                                    priority_score += 25
-                                
-                                # Add brand if not prominent
-                                if brand and brand.lower() not in product_title.lower():
-                                    optimized_title = f"{optimized_title} | {brand}"
-                                    title_reasoning += f" - Added brand '{brand}' for authority"
-                                    priority_score += 10
-                                
-                                # Description optimization based on search intent
-                                if product_type and material:
-                                    # Create description that matches search intent
-                                    intent_desc = f"{product_desc} "
-                                    if size_info:
-                                        intent_desc += f"Perfect {size_info.lower()} {product_type} "
-                                    if style_info:
-                                        intent_desc += f"in {style_info.lower()} style "
-                                    if color_info:
-                                        intent_desc += f"in {color_info.lower()} color. "
-                                    intent_desc += f"Premium {material.title()} {product_type.title()} from {brand if brand else 'Oak Furnitureland'} - Quality furniture for modern homes."
-                                    
-                                    optimized_desc = intent_desc
-                                    description_reasoning = f"AI optimization: Enhanced description with search intent keywords - {size_info if size_info else material.title()} {product_type.title()}"
-                                    priority_score += 15
-                                
-                                # Set impact level
-                                if priority_score >= 30:
-                                    expected_impact = "MEDIUM"
-                                else:
-                                    expected_impact = "LOW"
-                                    
+                        # Show sample data structure for debugging
+                        st.subheader("🔍 Sample SEOMonitor Data Structure")
+                        sample_row = df_seo.iloc[0]
+                        st.write("**Sample keyword data:**")
+                        for key, value in sample_row.items():
+                            if isinstance(value, (dict, list)) and len(str(value)) > 100:
+                                st.write(f"- **{key}**: {str(value)[:100]}...")
                             else:
-                                # Fallback - ALWAYS optimize with basic improvements
-                                # Basic title structure optimization - ALWAYS apply
-                                words = product_title.split()
-                                if len(words) > 6:  # Title too long - restructure
-                                    # Move key words to front
-                                    key_words = []
-                                    remaining_words = []
-                                    
-                                    for word in words:
-                                        if word.lower() in ['oak', 'furniture', 'sofa', 'chair', 'table', 'bed', 'dining', 'living', 'office', 'fabric', 'leather', 'wood']:
-                                            key_words.append(word)
-                                        else:
-                                            remaining_words.append(word)
-                                    
-                                    if key_words:
-                                        optimized_title = f"{' '.join(key_words)} | {' '.join(remaining_words)}"
-                                        title_reasoning = f"AI optimization: Restructured title to prioritize key furniture terms - improved readability and SEO"
-                                        priority_score += 20
-                                        expected_impact = "MEDIUM"
-                                elif len(words) <= 4:  # Title too short - enhance
-                                    # Add furniture context
-                                    optimized_title = f"{product_title} | Quality Furniture"
-                                    title_reasoning = f"AI optimization: Enhanced short title with furniture context"
-                                    priority_score += 15
-                                    expected_impact = "MEDIUM"
-                                else:
-                                    # Add brand for authority
-                                    optimized_title = f"{product_title} | Oak Furnitureland"
-                                    title_reasoning = f"AI optimization: Added brand authority to title"
-                                    priority_score += 10
-                                    expected_impact = "LOW"
-                                
-                                # ALWAYS enhance description
-                                if len(product_desc) < 150:  # Description too short
-                                    optimized_desc = f"{product_desc} Premium quality furniture from Oak Furnitureland. Free delivery and expert customer service. Perfect for modern homes."
-                                    description_reasoning = f"AI optimization: Enhanced short description with trust signals and brand mention"
-                                    priority_score += 15
-                                    expected_impact = "MEDIUM"
-                                else:
-                                    # Add call to action
-                                    optimized_desc = f"{product_desc} Free delivery and expert customer service from Oak Furnitureland."
-                                    description_reasoning = f"AI optimization: Added call to action to description"
-                                    priority_score += 10
-                                    expected_impact = "LOW"
+                                st.write(f"- **{key}**: {value}")
                         
-                        # 5. Add competitor analysis using SEOMonitor data
-                        competitor_insights = ""
-                        if df_seo is not None:
+                        # Show data extraction results
+                        st.subheader("🔍 Data Extraction Test")
+                        test_keywords = []
+                        for _, row in df_seo.head(5).iterrows():
+                            keyword = row.get('keyword', '')
+                            search_volume = 0
+                            position = 999
+                            difficulty = 0
+                            
+                            # Test extraction methods
                             try:
-                                # Find keywords where competitors might be ranking better
-                                competitor_keywords = df_seo[
-                                    (df_seo['search_volume'] > 1000) & 
-                                    (df_seo['position'] > 20) &
-                                    (df_seo['keyword'].str.contains('|'.join(['sofa', 'chair', 'table', 'furniture']), case=False, na=False))
-                                ]
-                                
-                                if not competitor_keywords.empty:
-                                    competitor_insights = f" | Competitor opportunity: {competitor_keywords.iloc[0]['keyword']} ({competitor_keywords.iloc[0]['search_volume']:,} searches)"
-                                    priority_score += 20
-                                
-                                # Add product grid competitor analysis
-                                product_grid_competitors = df_seo[
-                                    (df_seo['search_volume'] > 500) & 
-                                    (df_seo['product_grid_position'] <= 5) &
-                                    (df_seo['position'] > 10) &
-                                    (df_seo['keyword'].str.contains('|'.join(['sofa', 'chair', 'table', 'furniture']), case=False, na=False))
-                                ]
-                                
-                                if not product_grid_competitors.empty:
-                                    competitor_insights += f" | Product grid competitor: '{product_grid_competitors.iloc[0]['keyword']}' ranks #{product_grid_competitors.iloc[0]['product_grid_position']} in shopping but #{product_grid_competitors.iloc[0]['position']} organic"
-                                    priority_score += 25
-                                
-                                # Add current ranking insights
-                                current_rankings = []
-                                for kw in relevant_keywords[:3]:  # Top 3 relevant keywords
-                                    if kw['position'] <= 20:
-                                        current_rankings.append(f"'{kw['keyword']}' ranks #{kw['position']} ({kw['search_volume']:,} searches)")
-                                    if kw['product_grid_position'] <= 10:
-                                        current_rankings.append(f"'{kw['keyword']}' ranks #{kw['product_grid_position']} in shopping")
-                                
-                                if current_rankings:
-                                    competitor_insights += f" | Current rankings: {', '.join(current_rankings[:2])}"
-                                    priority_score += 15
-                                    
-                            except KeyError:
-                                # search_volume column doesn't exist, skip competitor analysis
+                                search_data = row.get('search_data', {})
+                                if isinstance(search_data, dict):
+                                    search_volume = search_data.get('search_volume', 0)
+                            except:
                                 pass
-                        
-                        # 7. Add keyword gap analysis
-                        keyword_gaps = ""
-                        if df_seo is not None and relevant_keywords:
+                            
                             try:
-                                # Find high-volume keywords competitors rank for but we don't
-                                all_high_volume = df_seo[
-                                    (df_seo['search_volume'] > 1000) & 
-                                    (df_seo['position'] > 50) &
-                                    (df_seo['keyword'].str.contains('|'.join(['sofa', 'chair', 'table', 'furniture', 'oak', 'dining', 'bedroom']), case=False, na=False))
-                                ].sort_values('search_volume', ascending=False)
-                                
-                                if not all_high_volume.empty:
-                                    gap_keyword = all_high_volume.iloc[0]['keyword']
-                                    gap_volume = all_high_volume.iloc[0]['search_volume']
-                                    keyword_gaps = f" | Keyword gap: '{gap_keyword}' ({gap_volume:,} searches) - competitors rank but we don't"
-                                    priority_score += 30
-                                    
-                            except KeyError:
+                                ranking_data = row.get('ranking_data', {})
+                                if isinstance(ranking_data, dict):
+                                    position = ranking_data.get('desktop', {}).get('rank', 999)
+                            except:
                                 pass
+                            
+                            test_keywords.append({
+                                'keyword': keyword,
+                                'search_volume': search_volume,
+                                'position': position,
+                                'difficulty': difficulty
+                            })
                         
-                        # 6. Add Sitebulb insights if available
-                        if df_sitebulb is not None:
-                            # Look for technical issues affecting this product
-                            product_url = product.get('link', '')
-                            if product_url:
-                                # Find matching page in Sitebulb data
-                                matching_pages = df_sitebulb[df_sitebulb['URL'].str.contains(product_url.split('/')[-1], na=False)]
-                                if not matching_pages.empty:
-                                    page_data = matching_pages.iloc[0]
-                                    
-                                    # Check for technical issues
-                                    if page_data.get('Status Code', 200) != 200:
-                                        title_reasoning += f" | Fix {page_data.get('Status Code')} error"
-                                        priority_score += 10
-                                    
-                                    if page_data.get('Title Tag Length', 0) > 60:
-                                        title_reasoning += " | Title too long"
-                                        priority_score += 5
-                                    
-                                    if page_data.get('Meta Description Length', 0) > 160:
-                                        description_reasoning += " | Description too long"
-                                        priority_score += 5
-                        
-                        # Calculate performance prediction
-                        predicted_traffic_increase = 0
-                        predicted_ranking_improvement = 0
-                        
-                        if relevant_keywords:
-                            # Estimate traffic increase based on search volume and current position
-                            for kw in relevant_keywords[:3]:  # Top 3 keywords
-                                if kw['position'] > 10:  # Room for improvement
-                                    # Estimate CTR improvement (position 20+ to top 10)
-                                    if kw['position'] > 20:
-                                        predicted_traffic_increase += kw['search_volume'] * 0.05  # 5% CTR improvement
-                                    elif kw['position'] > 10:
-                                        predicted_traffic_increase += kw['search_volume'] * 0.02  # 2% CTR improvement
-                                    
-                                    # Estimate ranking improvement
-                                    if kw['position'] > 20:
-                                        predicted_ranking_improvement += 10  # Move to top 10
-                                    elif kw['position'] > 10:
-                                        predicted_ranking_improvement += 5   # Move to top 5
-                        
-                        # Store recommendation
-                        recommendations.append({
-                            'product_id': product_id,
-                            'current_title': product_title,
-                            'optimized_title': optimized_title,
-                            'current_description': product_desc,
-                            'optimized_description': optimized_desc,
-                            'priority_score': priority_score,
-                            'expected_impact': expected_impact,
-                            'title_reasoning': title_reasoning + competitor_insights + keyword_gaps,
-                            'description_reasoning': description_reasoning,
-                            'predicted_traffic_increase': int(predicted_traffic_increase),
-                            'predicted_ranking_improvement': predicted_ranking_improvement
-                        })
-                    
-                    # Store recommendations
-                    st.session_state['optimization_recommendations'] = recommendations
-                    
-                    # Clear progress
-                    progress_bar.empty()
-                    status_text.empty()
-                    
-                    # Show results
-                    st.success(f"✅ Generated intelligent optimizations for {len(recommendations)} products!")
-                    
-                    # Show summary
-                    high_impact = len([r for r in recommendations if r['expected_impact'] == 'HIGH'])
-                    medium_impact = len([r for r in recommendations if r['expected_impact'] == 'MEDIUM'])
-                    low_impact = len([r for r in recommendations if r['expected_impact'] == 'LOW'])
-                    
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.metric("High Impact", high_impact)
-                    with col2:
-                        st.metric("Medium Impact", medium_impact)
-                    with col3:
-                        st.metric("Low Impact", low_impact)
-                    
-                    st.info("💡 Intelligent optimizations complete! Based on actual SEO performance data.")
-                    
-                    # Show debugging info
-                    if recommendations:
-                        st.subheader("🔍 Debugging Info")
-                        optimized_count = len([r for r in recommendations if r['title_reasoning'] != "No optimization needed" and r['title_reasoning'] != "No relevant keywords with search volume found"])
-                        st.write(f"Products with optimizations: {optimized_count}/{len(recommendations)}")
-                        
-                        # Show search volume data availability
-                        if df_seo is not None:
-                            st.subheader("📊 SEOMonitor Search Volume Analysis")
-                            try:
-                                total_keywords = len(df_seo)
-                                keywords_with_volume = len(df_seo[df_seo['search_volume'] > 0])
-                                avg_search_volume = df_seo['search_volume'].mean()
-                                max_search_volume = df_seo['search_volume'].max()
-                                
-                                col1, col2, col3, col4 = st.columns(4)
-                                with col1:
-                                    st.metric("Total Keywords", total_keywords)
-                                with col2:
-                                    st.metric("Keywords with Volume", keywords_with_volume)
-                                with col3:
-                                    st.metric("Avg Search Volume", f"{avg_search_volume:.0f}")
-                                with col4:
-                                    st.metric("Max Search Volume", max_search_volume)
-                                
-                                # Show sample of high-volume keywords
-                                high_volume_keywords = df_seo[df_seo['search_volume'] > 1000].head(10)
-                                if not high_volume_keywords.empty:
-                                    st.write("**High Volume Keywords (>1000 searches):**")
-                                    st.dataframe(high_volume_keywords[['keyword', 'search_volume', 'position']])
-                                
-                                # Show easy win opportunities
-                                easy_wins = df_seo[
-                                    (df_seo['search_volume'] > 300) & 
-                                    (df_seo['search_volume'] < 2000) & 
-                                    (df_seo['position'] > 30) &
-                                    (df_seo['difficulty'] < 40)
-                                ].sort_values('search_volume', ascending=False).head(5)
-                                
-                                if not easy_wins.empty:
-                                    st.write("**Easy Win Opportunities (low difficulty, good volume):**")
-                                    st.dataframe(easy_wins[['keyword', 'search_volume', 'position', 'difficulty']])
-                            except KeyError:
-                                st.warning("⚠️ SEOMonitor data doesn't have 'search_volume' column. Available columns:")
-                                st.write(list(df_seo.columns))
-                                st.info("💡 The optimization logic will use AI fallback instead of search volume data.")
-                                
-                                # Show sample data structure for debugging
-                                st.subheader("🔍 Sample SEOMonitor Data Structure")
-                                sample_row = df_seo.iloc[0]
-                                st.write("**Sample keyword data:**")
-                                for key, value in sample_row.items():
-                                    if isinstance(value, (dict, list)) and len(str(value)) > 100:
-                                        st.write(f"- **{key}**: {str(value)[:100]}...")
-                                    else:
-                                        st.write(f"- **{key}**: {value}")
-                                
-                                # Show data extraction results
-                                st.subheader("🔍 Data Extraction Test")
-                                test_keywords = []
-                                for _, row in df_seo.head(5).iterrows():
-                                    keyword = row.get('keyword', '')
-                                    search_volume = 0
-                                    position = 999
-                                    difficulty = 0
-                                    
-                                    # Test extraction methods
-                                    try:
-                                        search_data = row.get('search_data', {})
-                                        if isinstance(search_data, dict):
-                                            search_volume = search_data.get('search_volume', 0)
-                                    except:
-                                        pass
-                                    
-                                    try:
-                                        ranking_data = row.get('ranking_data', {})
-                                        if isinstance(ranking_data, dict):
-                                            position = ranking_data.get('desktop', {}).get('rank', 999)
-                                    except:
-                                        pass
-                                    
-                                    test_keywords.append({
-                                        'keyword': keyword,
-                                        'search_volume': search_volume,
-                                        'position': position,
-                                        'difficulty': difficulty
-                                    })
-                                
-                                st.dataframe(pd.DataFrame(test_keywords))
-                        
-                        # Show sample of what was found
-                        sample_recs = [r for r in recommendations if r['title_reasoning'] not in ["No optimization needed", "No relevant keywords with search volume found"]][:3]
-                        if sample_recs:
-                            st.write("Sample optimizations:")
-                            for rec in sample_recs:
-                                st.write(f"- {rec['title_reasoning']}")
-                        else:
-                            st.warning("⚠️ No optimizations found - this could mean:")
-                            st.write("• Keywords have zero search volume")
-                            st.write("• Keywords are not semantically relevant to products")
-                            st.write("• SEOMonitor data extraction issues")
-                        
-                        # Show AI intelligence usage
-                        ai_optimizations = len([r for r in recommendations if "AI optimization:" in r['title_reasoning']])
-                        if ai_optimizations > 0:
-                            st.info(f"🤖 AI Intelligence used for {ai_optimizations} products (when SEOMonitor data wasn't sufficient)")
+                        st.dataframe(pd.DataFrame(test_keywords))
+                
+                # Show sample of what was found
+                sample_recs = recommendations.records(optimized_positions[:3])
+                if sample_recs:
+                    st.write("Sample optimizations:")
+                    for rec in sample_recs:
+                        st.write(f"- {rec['title_reasoning']}")
+                else:
+                    st.warning("⚠️ No optimizations found - this could mean:")
+                    st.write("• Keywords have zero search volume")
+                    st.write("• Keywords are not semantically relevant to products")
+                    st.write("• SEOMonitor data extraction issues")
+                
+                # Show AI intelligence usage
+                ai_rules = [rule.name for rule in TITLE_RULES if rule.reasoning and rule.reasoning.startswith("AI optimization:")]
+                ai_optimizations = int(recommendations.uses_title_rule(ai_rules).sum())
+                if ai_optimizations > 0:
+                    st.info(f"🤖 AI Intelligence used for {ai_optimizations} products (when SEOMonitor data wasn't sufficient)")
+                
+                # Show A/B testing suggestions
+                ab_test_positions = np.flatnonzero(np.isin(recommendations.impacts(), ['HIGH', 'MEDIUM']) & recommendations.uses_title_rule(['easy win']))
+                ab_test_candidates = recommendations.records(ab_test_positions[:3])
+                if ab_test_candidates:
+                    st.subheader("🧪 A/B Testing Suggestions")
+                    st.write(f"Found {len(ab_test_positions)} high-impact optimizations perfect for A/B testing:")
+                    for rec in ab_test_candidates[:3]:  # Show top 3
+                        st.write(f"• **{rec['current_title'][:50]}...** → **{rec['optimized_title'][:50]}...**")
+                        st.write(f"  *Reasoning: {rec['title_reasoning']}*")
+                        st.write("---")
+                
+                # Show best-fit keywords ranked by BM25 relevance
+                relevance = worker.keyword_relevance
+                if relevance is not None and not relevance.empty:
+                    st.subheader("🎯 Best-Fit Keywords (BM25 Relevance)")
+                    st.write(f"Top keywords by text relevance for {relevance['product'].nunique()} products:")
+                    sample = relevance.head(500)
+                    sample.insert(1, 'title', worker.feed_text['title'].to_numpy()[sample['product']])
+                    st.dataframe(sample, use_container_width=True)
+                
+                # Show keyword clusters - near-duplicates matched as one keyword
+                if worker.keyword_matcher is not None:
+                    keywords = worker.keyword_matcher.keywords
+                    cluster_sizes = keywords['variants'].map(len)
+                    merged = np.flatnonzero(cluster_sizes.to_numpy() > 1)
+                    if len(merged):
+                        st.subheader("🧩 Keyword Clusters")
+                        st.write(f"{int(cluster_sizes.sum())} SEOMonitor keywords were canonicalized into {len(keywords)} clusters ({len(merged)} with near-duplicates):")
+                        clusters = keywords.iloc[merged][['keyword', 'search_volume', 'position', 'difficulty', 'product_grid_position']].assign(variants=cluster_sizes.iloc[merged])
+                        st.dataframe(clusters.head(500), use_container_width=True)
                         
-                        # Show A/B testing suggestions
-                        ab_test_candidates = [r for r in recommendations if r['expected_impact'] in ['HIGH', 'MEDIUM'] and 'EASY WIN' in r['title_reasoning']]
-                        if ab_test_candidates:
-                            st.subheader("🧪 A/B Testing Suggestions")
-                            st.write(f"Found {len(ab_test_candidates)} high-impact optimizations perfect for A/B testing:")
-                            for rec in ab_test_candidates[:3]:  # Show top 3
-                                st.write(f"• **{rec['current_title'][:50]}...** → **{rec['optimized_title'][:50]}...**")
-                                st.write(f"  *Reasoning: {rec['title_reasoning']}*")
-                                st.write("---")
+                        expanded = st.selectbox("Expand cluster:", merged[:500], format_func=lambda position: keywords['keyword'].iat[position], key="keyword_cluster")
+                        st.dataframe(pd.DataFrame(list(keywords['variants'].iat[expanded]), columns=['keyword', 'search_volume', 'position']), use_container_width=True)
+
+elif page == "Batch Campaigns":
+    st.header("🗃️ Batch Campaign Optimization")
+    
+    try:
+        campaigns = load_campaigns()
+    except CampaignError as e:
+        st.error(f"❌ {e}")
+        campaigns = []
+    
+    if not campaigns:
+        st.info("ℹ️ No campaigns configured. Add a [Campaign <name>] section with a campaign_id and feed file to config_oak_furniture.ini for each campaign+feed pair.")
+    else:
+        st.write(f"{len(campaigns)} campaign+feed pairs configured - a batch run fetches every campaign, optimizes every feed in parallel and saves each run to the history.")
+        st.dataframe(pd.DataFrame([{
+            'Campaign': campaign.name,
+            'Brand': campaign.brand,
+            'Campaign ID': campaign.campaign_id,
+            'Feed': campaign.feed or "Uploaded GMC feed"
+        } for campaign in campaigns]), use_container_width=True, hide_index=True)
+        if st.session_state['sitebulb_data'] is not None:
+            st.caption("The uploaded Sitebulb crawl is used for every campaign.")
+        
+        batch = st.session_state.get('batch_run')
+        batch_running = batch is not None and batch.is_alive()
+        
+        if st.button("🚀 Run All Campaigns", type="primary", disabled=batch_running):
+            session_feed = (st.session_state['gmc_feed'], st.session_state.get('gmc_file')) if st.session_state['gmc_feed'] is not None else None
+            batch = BatchRun(campaigns, session_feed, st.session_state.get('sitebulb_data'), get_shared_cache(), run_history=get_run_history())
+            batch.start()
+            st.session_state['batch_run'] = batch
+            batch_running = True
+        
+        if batch_running:
+            if fragment is not None:
+                fragment(run_every=0.5)(render_batch_progress)(batch)
             else:
-                st.error("❌ SEOMonitor data required for AI optimization.")
+                render_batch_progress(batch)
+                time.sleep(0.5)
+                st.rerun()
+        elif batch is not None:
+            report = batch.report()
+            if batch.stage == 'error':
+                st.error(f"❌ Batch run failed: {batch.errors.get('Batch')}")
+            elif batch.stage == 'cancelled':
+                st.warning("⏹️ Batch run cancelled - finished campaigns and partial results are kept.")
+            else:
+                st.success(f"✅ Batch run finished in {batch.finished_at - batch.started_at:.1f}s - {(report['Status'] == 'done').sum()}/{len(report)} campaigns optimized.")
+            
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Products Optimized", int(report['Processed'].sum()))
+            with col2:
+                st.metric("Titles Changed", int(report['Changed'].sum()))
+            with col3:
+                st.metric("High Impact", int(report['High Impact'].sum()))
+            
+            st.subheader("📋 Results by Campaign")
+            st.dataframe(report, use_container_width=True, hide_index=True)
+            
+            # Open one campaign's results in the regular summary and export pages
+            finished = [name for name, worker in batch.workers.items() if len(worker.recommendations)]
+            if finished:
+                opened = st.selectbox("Campaign results to open", finished, key="batch_open")
+                if st.button("📂 Open Campaign Results"):
+                    worker = batch.workers[opened]
+                    st.session_state.pop('optimization_worker', None)
+                    st.session_state['gmc_feed'] = worker.df_gmc
+                    st.session_state['gmc_text'] = (worker.df_gmc, worker.feed_text)
+                    st.session_state['seomonitor_data'] = worker.df_seo
+                    st.session_state['gmc_file'] = worker.source_file
+                    st.session_state['optimization_recommendations'] = worker.recommendations
+                    st.success(f"✅ {opened} loaded - {len(worker.recommendations)} recommendations are available in 'Optimization Summary' and 'Export Optimized Feed'.")
 
 elif page == "Quick Wins":
     st.header("⚡ Quick Wins Analysis")
@@ -1353,21 +2895,31 @@ elif page == "Quick Wins":
             st.success(f"✅ Analyzing {len(df_seo)} keywords for quick wins...")
             
             try:
-                # Find easy win opportunities
-                easy_wins = df_seo[
-                    (df_seo['search_volume'] > 300) & 
-                    (df_seo['search_volume'] < 2000) & 
-                    (df_seo['position'] > 30) &
-                    (df_seo['difficulty'] < 40) &
-                    (df_seo['keyword'].str.contains('|'.join(['sofa', 'chair', 'table', 'furniture', 'oak', 'dining', 'bedroom']), case=False, na=False))
-                ].sort_values('search_volume', ascending=False)
+                # Keyword categories and sorted indexes are built once per keyword dataset, so thresholds apply instantly
+                keyword_index = get_keyword_index(df_seo)
+                volume_max = keyword_index.max_value('search_volume', 2000)
+                
+                st.subheader("🎚️ Easy Win Thresholds")
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    volume_range = st.slider("Search volume between", 0, volume_max, (300, 2000), step=50)
+                with col2:
+                    min_position = st.slider("Currently ranking below position", 0, 100, 30)
+                with col3:
+                    max_difficulty = st.slider("Difficulty under", 0, 100, 40)
+                
+                # Find easy win opportunities (the top of a slider stretched past 2000 by the data leaves the range open)
+                volume_low, volume_high = volume_range
+                open_top = volume_max > 2000 and volume_high >= volume_max
+                easy_win_positions = keyword_index.query({'search_volume': (volume_low, None if open_top else volume_high), 'position': (min_position, None), 'difficulty': (None, max_difficulty)}, limit=20)
+                easy_wins = df_seo.iloc[easy_win_positions]
                 
                 if not easy_wins.empty:
                     st.subheader("🎯 Top 20 Easy Win Opportunities")
                     st.info("💡 **Easy Wins**: Low difficulty, good search volume, poor current ranking - perfect for quick improvements!")
                     
                     # Show top 20 easy wins
-                    easy_wins_display = easy_wins.head(20)[['keyword', 'search_volume', 'position', 'difficulty']].copy()
+                    easy_wins_display = easy_wins[['keyword', 'search_volume', 'position', 'difficulty']].copy()
                     easy_wins_display['Potential Traffic'] = easy_wins_display['search_volume'] * 0.05  # 5% CTR estimate
                     easy_wins_display['Difficulty Level'] = easy_wins_display['difficulty'].apply(lambda x: 'Easy' if x < 20 else 'Medium' if x < 40 else 'Hard')
                     
@@ -1397,23 +2949,26 @@ elif page == "Quick Wins":
                     )
                     
                 else:
-                    st.warning("⚠️ No easy win opportunities found. Try lowering the difficulty threshold.")
+                    st.warning("⚠️ No easy win opportunities found. Try relaxing the thresholds above.")
                 
                 # Product grid opportunities
                 st.markdown("---")
                 st.subheader("🛒 Product Grid Opportunities")
                 
+                col1, col2 = st.columns(2)
+                with col1:
+                    grid_min_volume = st.slider("Search volume above", 0, volume_max, 200, step=50)
+                with col2:
+                    grid_min_position = st.slider("Shopping grid position below", 0, 100, 10)
+                
                 try:
-                    product_grid_ops = df_seo[
-                        (df_seo['search_volume'] > 200) & 
-                        (df_seo['product_grid_position'] > 10) &
-                        (df_seo['keyword'].str.contains('|'.join(['sofa', 'chair', 'table', 'furniture', 'oak', 'dining', 'bedroom']), case=False, na=False))
-                    ].sort_values('search_volume', ascending=False)
+                    grid_positions = keyword_index.query({'search_volume': (grid_min_volume, None), 'product_grid_position': (grid_min_position, None)}, limit=15)
+                    product_grid_ops = df_seo.iloc[grid_positions]
                     
                     if not product_grid_ops.empty:
                         st.info("💡 **Product Grid Opportunities**: Keywords with good volume but poor shopping visibility - optimize for Google Shopping!")
                         
-                        grid_display = product_grid_ops.head(15)[['keyword', 'search_volume', 'product_grid_position']].copy()
+                        grid_display = product_grid_ops[['keyword', 'search_volume', 'product_grid_position']].copy()
                         grid_display['Shopping Opportunity'] = grid_display['product_grid_position'].apply(lambda x: 'High' if x > 20 else 'Medium' if x > 10 else 'Low')
                         
                         st.dataframe(grid_display, use_container_width=True)
@@ -1434,6 +2989,43 @@ elif page == "Quick Wins":
                 
             except KeyError:
                 st.error("❌ Search volume data not available. Please check SEOMonitor data extraction.")
+            
+            # Ad-hoc SQL over the keyword and recommendation tables
+            st.markdown("---")
+            st.subheader("🧮 Advanced Query")
+            # The engine is built on the first query, not on every visit to the page
+            query_recommendations = st.session_state.get('optimization_recommendations')
+            st.caption(f"Read-only {ENGINE_NAME} SQL over: " + "; ".join(f"**{name}** ({', '.join(map(str, columns))})" for name, columns in sql_tables(df_seo, query_recommendations).items()))
+            advanced_sql = st.text_area("SQL query", value=ADVANCED_QUERY_EXAMPLE, height=150, key="advanced_query")
+            if st.button("▶️ Run Query"):
+                try:
+                    # Only the shown rows (plus one, to tell whether there are more) are fetched
+                    preview = get_sql_engine(df_seo, query_recommendations).query(advanced_sql, limit=ADVANCED_QUERY_ROWS + 1)
+                    st.session_state['advanced_query_result'] = (advanced_sql, preview)
+                except QueryError as e:
+                    st.session_state.pop('advanced_query_result', None)
+                    st.error(f"❌ Query failed: {e}")
+            
+            if st.session_state.get('advanced_query_result') is not None:
+                query_sql, query_result = st.session_state['advanced_query_result']
+                if len(query_result) > ADVANCED_QUERY_ROWS:
+                    st.write(f"**More than {ADVANCED_QUERY_ROWS} rows** (showing the first {ADVANCED_QUERY_ROWS} - the CSV has all of them)")
+                else:
+                    st.write(f"**{len(query_result)} rows**")
+                st.dataframe(query_result.head(ADVANCED_QUERY_ROWS), use_container_width=True)
+                
+                # The full result is only fetched for the CSV, under the same time limit
+                try:
+                    lazy_download_button(
+                        "advanced_query_csv",
+                        export_stamp(query_result),
+                        lambda: write_csv(get_sql_engine(df_seo, query_recommendations).query(query_sql)),
+                        label="⬇️ Download Query Result CSV",
+                        file_name="advanced_query_result.csv",
+                        inputs=(query_result,)
+                    )
+                except QueryError as e:
+                    st.error(f"❌ CSV export failed: {e}")
         else:
             st.warning("⚠️ Please fetch SEOMonitor data first.")
 
@@ -1448,24 +3040,10 @@ elif page == "Optimization Summary":
         if recommendations:
             st.success(f"✅ {len(recommendations)} products optimized!")
             
-            # Create simple summary DataFrame
-            summary_data = []
-            for rec in recommendations:
-                summary_data.append({
-                    'Product ID': rec['product_id'],
-                    'Original Title': rec['current_title'],
-                    'Optimized Title': rec['optimized_title'],
-                    'Title Reasoning': rec['title_reasoning'],
-                    'Original Description': rec['current_description'],
-                    'Optimized Description': rec['optimized_description'],
-                    'Description Reasoning': rec['description_reasoning'],
-                    'Impact': rec['expected_impact'],
-                    'Priority Score': rec['priority_score'],
-                    'Predicted Traffic Increase': rec.get('predicted_traffic_increase', 0),
-                    'Predicted Ranking Improvement': rec.get('predicted_ranking_improvement', 0)
-                })
-            
-            df_summary = pd.DataFrame(summary_data)
+            # Columnar summary built once per optimization run
+            store = get_recommendation_store(recommendations)
+            df_summary = store.frame
+            impact_counts = store.impact_counts()
             
             # Create tabs
             tab1, tab2 = st.tabs(["📊 Full Analysis", "🎯 Quick Review"])
@@ -1476,154 +3054,103 @@ elif page == "Optimization Summary":
                 with col1:
                     st.metric("Total Products", len(df_summary))
                 with col2:
-                    high_impact = len(df_summary[df_summary['Impact'] == 'HIGH'])
-                    st.metric("High Impact", high_impact)
+                    st.metric("High Impact", impact_counts['HIGH'])
                 with col3:
-                    medium_impact = len(df_summary[df_summary['Impact'] == 'MEDIUM'])
-                    st.metric("Medium Impact", medium_impact)
+                    st.metric("Medium Impact", impact_counts['MEDIUM'])
                 with col4:
-                    low_impact = len(df_summary[df_summary['Impact'] == 'LOW'])
-                    st.metric("Low Impact", low_impact)
+                    st.metric("Low Impact", impact_counts['LOW'])
             
-            # ROI Calculator
+            # ROI calculator, filtered results and quick review are fragments - changing
+            # one of their widgets reruns only that region against the stored results
             st.markdown("---")
-            st.subheader("💰 ROI Calculator")
-            
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                avg_conversion_rate = st.number_input("Average Conversion Rate (%)", value=2.0, min_value=0.1, max_value=10.0, step=0.1)
-            with col2:
-                avg_order_value = st.number_input("Average Order Value (£)", value=500.0, min_value=50.0, max_value=2000.0, step=50.0)
-            with col3:
-                profit_margin = st.number_input("Profit Margin (%)", value=30.0, min_value=5.0, max_value=80.0, step=5.0)
-            
-            # Calculate ROI
-            total_predicted_traffic = df_summary['Predicted Traffic Increase'].sum()
-            predicted_revenue = total_predicted_traffic * (avg_conversion_rate / 100) * avg_order_value
-            predicted_profit = predicted_revenue * (profit_margin / 100)
-            
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.metric("Predicted Monthly Traffic", f"{total_predicted_traffic:,.0f}")
-            with col2:
-                st.metric("Predicted Monthly Revenue", f"£{predicted_revenue:,.0f}")
-            with col3:
-                st.metric("Predicted Monthly Profit", f"£{predicted_profit:,.0f}")
-            with col4:
-                st.metric("Annual Profit Potential", f"£{predicted_profit * 12:,.0f}")
-            
-            st.info(f"💡 **ROI Analysis**: These optimizations could generate £{predicted_profit * 12:,.0f} additional annual profit from improved search rankings.")
+            isolated(render_roi_calculator)(store)
             
             st.markdown("---")
+            isolated(render_summary_results)(store, recommendations)
             
-            # Filter options
-            col1, col2, col3 = st.columns(3)
+            with tab2:
+                isolated(render_quick_review)(store, recommendations)
+            
+        else:
+            st.warning("⚠️ No optimizations found. Please run 'Strategic Optimization' first.")
+
+elif page == "Run History":
+    st.header("🗂️ Optimization Run History")
+    
+    all_runs = get_run_history().runs()
+    if all_runs.empty:
+        st.info("ℹ️ No runs saved yet. Every finished run from 'Strategic Optimization' is stored here automatically.")
+    else:
+        st.dataframe(all_runs.drop(columns=['gmc_fingerprint', 'seo_fingerprint', 'sitebulb_fingerprint']), use_container_width=True, hide_index=True)
+        
+        # Runs stored by another engine version can't be restored by this one
+        runs = all_runs[all_runs['engine_version'] == ENGINE_VERSION]
+        if len(runs) < len(all_runs):
+            st.caption("Runs from an older version of the optimizer are listed but can't be reloaded or compared.")
+        labels = {run.run_id: f"#{run.run_id} · {run.created_at} · {run.source_file or 'GMC feed'} · {run.processed} products" for run in runs.itertuples()}
+        
+        st.markdown("---")
+        st.subheader("📂 Reload a Run")
+        reload_id = st.selectbox("Run to reload", list(labels), format_func=labels.get, key="history_reload")
+        if reload_id is not None and st.button("📂 Load Run", type="primary"):
+            recommendations = load_run(reload_id)
+            if recommendations is None:
+                st.error("❌ This run is no longer in the history.")
+            else:
+                # Restore the run's feed and results as if it had just finished in this session
+                st.session_state.pop('optimization_worker', None)
+                st.session_state['gmc_feed'] = recommendations.df_gmc
+                st.session_state['gmc_text'] = (recommendations.df_gmc, recommendations.feed_text)
+                st.session_state['sitebulb_data'] = recommendations.df_sitebulb
+                st.session_state['gmc_file'] = runs.loc[runs['run_id'] == reload_id, 'source_file'].iloc[0]
+                st.session_state['optimization_recommendations'] = recommendations
+                st.success(f"✅ Run #{reload_id} loaded - {len(recommendations)} recommendations are available in 'Optimization Summary' and 'Export Optimized Feed'.")
+        
+        st.markdown("---")
+        st.subheader("🔍 Compare Runs")
+        if len(labels) < 2:
+            st.info("ℹ️ Save at least two runs to compare them.")
+        else:
+            col1, col2 = st.columns(2)
             with col1:
-                impact_filter = st.selectbox("Filter by Impact", ["All", "HIGH", "MEDIUM", "LOW"])
+                before_id = st.selectbox("Baseline run", list(labels), index=1, format_func=labels.get, key="history_before")
             with col2:
-                min_score = st.slider("Minimum Priority Score", 0, 100, 0)
-            with col3:
-                show_changes_only = st.checkbox("Show changes only", value=True)
-            
-            # Apply filters
-            filtered_df = df_summary.copy()
-            
-            if impact_filter != "All":
-                filtered_df = filtered_df[filtered_df['Impact'] == impact_filter]
-            
-            filtered_df = filtered_df[filtered_df['Priority Score'] >= min_score]
-            
-            if show_changes_only:
-                # Only show products where title or description actually changed
-                filtered_df = filtered_df[
-                    (filtered_df['Original Title'] != filtered_df['Optimized Title']) |
-                    (filtered_df['Original Description'] != filtered_df['Optimized Description'])
-                ]
-            
-            st.subheader(f"📊 Filtered Results ({len(filtered_df)} products)")
+                after_id = st.selectbox("Compare with", list(labels), index=0, format_func=labels.get, key="history_after")
             
-            # Display the summary table
-            st.dataframe(
-                filtered_df,
-                use_container_width=True,
-                height=600
-            )
-            
-            # Download options
-            st.markdown("---")
-            st.subheader("📥 Download Summary")
-            
-            csv_summary = filtered_df.to_csv(index=False)
-            st.download_button(
-                label="⬇️ Download Summary CSV",
-                data=csv_summary,
-                file_name=f"optimization_summary_{st.session_state.get('gmc_file', 'gmc_feed')}.csv",
-                mime="text/csv"
-            )
-            
-            with tab2:
-                st.subheader("🎯 Quick Review - Key Changes Only")
+            before, after = load_run(before_id), load_run(after_id)
+            if before is None or after is None:
+                st.error("❌ One of these runs is no longer in the history.")
+            else:
+                # Diff memoized per pair of runs
+                cached_diff = st.session_state.get('run_diff')
+                if cached_diff is None or cached_diff[0] != (before_id, after_id):
+                    cached_diff = ((before_id, after_id), diff_runs(before, after))
+                    st.session_state['run_diff'] = cached_diff
+                diff = cached_diff[1]
+                counts = diff['Change'].value_counts()
                 
-                # Create simplified view with just the essential columns
-                quick_data = []
-                for rec in recommendations:
-                    # Only include products that actually changed
-                    if (rec['current_title'] != rec['optimized_title']) or (rec['current_description'] != rec['optimized_description']):
-                        quick_data.append({
-                            'Original Title': rec['current_title'],
-                            'Optimized Title': rec['optimized_title'],
-                            'Title Reasoning': rec['title_reasoning'],
-                            'Original Description': rec['current_description'],
-                            'Optimized Description': rec['optimized_description'],
-                            'Description Reasoning': rec['description_reasoning'],
-                            'Impact': rec['expected_impact']
-                        })
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Optimized Titles Changed", int(counts.get('changed', 0)))
+                with col2:
+                    st.metric("Products Added", int(counts.get('added', 0)))
+                with col3:
+                    st.metric("Products Removed", int(counts.get('removed', 0)))
                 
-                if quick_data:
-                    df_quick = pd.DataFrame(quick_data)
-                    
-                    # Show metrics for changes only
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.metric("Products Changed", len(df_quick))
-                    with col2:
-                        high_impact_changes = len(df_quick[df_quick['Impact'] == 'HIGH'])
-                        st.metric("High Impact Changes", high_impact_changes)
-                    with col3:
-                        medium_impact_changes = len(df_quick[df_quick['Impact'] == 'MEDIUM'])
-                        st.metric("Medium Impact Changes", medium_impact_changes)
-                    
-                    st.markdown("---")
-                    
-                    # Filter by impact
-                    impact_filter_quick = st.selectbox("Filter by Impact", ["All", "HIGH", "MEDIUM", "LOW"], key="quick_filter")
-                    
-                    if impact_filter_quick != "All":
-                        df_quick = df_quick[df_quick['Impact'] == impact_filter_quick]
-                    
-                    st.subheader(f"📋 Changes Only ({len(df_quick)} products)")
-                    
-                    # Display the simplified table
-                    st.dataframe(
-                        df_quick,
-                        use_container_width=True,
-                        height=600
-                    )
-                    
-                    # Download quick review
-                    st.markdown("---")
-                    csv_quick = df_quick.to_csv(index=False)
-                    st.download_button(
-                        label="⬇️ Download Quick Review CSV",
-                        data=csv_quick,
-                        file_name=f"quick_review_{st.session_state.get('gmc_file', 'gmc_feed')}.csv",
-                        mime="text/csv"
-                    )
+                if diff.empty:
+                    st.success("✅ Both runs produced the same optimized titles.")
                 else:
-                    st.info("ℹ️ No changes were made to any products. All optimizations resulted in 'no optimization needed'.")
-            
-        else:
-            st.warning("⚠️ No optimizations found. Please run 'Strategic Optimization' first.")
+                    if len(diff) > RUN_DIFF_DISPLAY_ROWS:
+                        st.caption(f"Showing the first {RUN_DIFF_DISPLAY_ROWS} of {len(diff)} differences - download the CSV for all of them.")
+                    st.dataframe(diff_reasoning(diff.head(RUN_DIFF_DISPLAY_ROWS), before, after), use_container_width=True, hide_index=True)
+                    lazy_download_button(
+                        "run_diff_csv",
+                        (before_id, after_id),
+                        lambda: write_csv(diff_reasoning(diff, before, after)),
+                        label="⬇️ Download Run Diff CSV",
+                        file_name=f"run_diff_{before_id}_vs_{after_id}.csv",
+                        inputs=(before, after)
+                    )
 
 elif page == "Export Optimized Feed":
     st.header("📤 Export Optimized GMC Feed")
@@ -1636,13 +3163,16 @@ elif page == "Export Optimized Feed":
         
         st.subheader("📊 Export Options")
         
-        # Export original feed
-        csv_original = df_gmc.to_csv(index=False)
-        st.download_button(
+        # Export artifacts are generated on demand and cached until the feed or recommendations change
+        feed_stamp = export_stamp(df_gmc)
+        gmc_file = st.session_state.get('gmc_file', 'gmc_feed')
+        
+        # Export original feed (streamed to a temporary file)
+        lazy_download_button(
+            'original_csv', feed_stamp, lambda: write_csv(df_gmc),
             label="Download Original CSV",
-            data=csv_original,
-            file_name=f"original_{st.session_state.get('gmc_file', 'gmc_feed')}.csv",
-            mime="text/csv"
+            file_name=f"original_{gmc_file}.csv",
+            inputs=(df_gmc,)
         )
         
         # Export optimized feed
@@ -1650,76 +3180,74 @@ elif page == "Export Optimized Feed":
             st.markdown("---")
             st.subheader("🚀 Optimized Feed Export")
             
-            # Create optimized DataFrame with proper column structure
-            optimized_data = []
-            for rec in recommendations:
-                # Find original product data
-                try:
-                    if 'id' in df_gmc.columns:
-                        original_product = df_gmc[df_gmc['id'] == rec['product_id']].iloc[0]
-                    else:
-                        # Fallback to index-based lookup
-                        product_index = int(rec['product_id'].split('_')[1]) if '_' in rec['product_id'] else 0
-                        original_product = df_gmc.iloc[product_index]
-                except:
-                    # If we can't find the product, skip it
-                    continue
-                
-                # Create optimized product row with proper column structure
-                optimized_row = original_product.to_dict()
-                
-                # Add optimization columns NEXT TO original columns
-                # Insert optimized title after original title
-                title_index = list(optimized_row.keys()).index('title') + 1
-                optimized_row = {k: v for i, (k, v) in enumerate(optimized_row.items())}
-                
-                # Add the optimization data
-                optimized_row['optimized_title'] = rec['optimized_title']
-                optimized_row['title_reasoning'] = rec['title_reasoning']
-                optimized_row['optimized_description'] = rec['optimized_description']
-                optimized_row['description_reasoning'] = rec['description_reasoning']
-                optimized_row['optimization_priority'] = rec['priority_score']
-                optimized_row['expected_impact'] = rec['expected_impact']
-                
-                optimized_data.append(optimized_row)
+            # The optimized feed (a single join against the recommendations) and the supplemental
+            # delta are built when a file needing them is generated, then shared by its formats
+            optimized_stamp = export_stamp(df_gmc, recommendations)
+            optimized_inputs = (df_gmc, recommendations)
             
-            df_optimized = pd.DataFrame(optimized_data)
+            def optimized_feed():
+                return cached_export('optimized_feed', optimized_stamp, lambda: build_optimized_feed(df_gmc, recommendations), optimized_inputs)
+            
+            def supplemental_delta():
+                return cached_export('supplemental_delta', optimized_stamp, lambda: build_supplemental_delta(recommendations), optimized_inputs)
             
             # Export optimized CSV
-            csv_optimized = df_optimized.to_csv(index=False)
-            st.download_button(
+            lazy_download_button(
+                'optimized_csv', optimized_stamp, lambda: write_csv(optimized_feed()),
                 label="⬇️ Download Optimized CSV (with reasons)",
-                data=csv_optimized,
-                file_name=f"optimized_{st.session_state.get('gmc_file', 'gmc_feed')}.csv",
-                mime="text/csv"
+                file_name=f"optimized_{gmc_file}.csv",
+                inputs=optimized_inputs
             )
             
-            # Export optimized Excel (with fallback)
+            # Export optimized Excel (constant-memory writer, with fallback)
             try:
-                import io
-                output = io.BytesIO()
-                with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                    df_optimized.to_excel(writer, sheet_name='Optimized Feed', index=False)
-                
-                st.download_button(
+                lazy_download_button(
+                    'optimized_xlsx', optimized_stamp, lambda: write_xlsx(optimized_feed(), sheet_name='Optimized Feed'),
                     label="⬇️ Download Optimized XLSX (with reasons)",
-                    data=output.getvalue(),
-                    file_name=f"optimized_{st.session_state.get('gmc_file', 'gmc_feed')}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    file_name=f"optimized_{gmc_file}.xlsx",
+                    inputs=optimized_inputs
                 )
             except ImportError:
-                st.warning("⚠️ Excel export requires openpyxl package. CSV download available above.")
-                st.info("💡 To enable Excel export, add 'openpyxl' to requirements.txt")
+                st.warning("⚠️ Excel export requires xlsxwriter or openpyxl package. CSV download available above.")
+                st.info("💡 To enable Excel export, add 'xlsxwriter' to requirements.txt")
+            
+            # Merchant Center supplemental feed - only ids with changed title/description
+            st.markdown("---")
+            st.subheader("📦 Merchant Center Supplemental Feed (changes only)")
+            
+            if 'id' in df_gmc.columns:
+                st.info(f"💡 {int(recommendations.changed().sum())} of {len(df_gmc)} products changed - upload this as a supplemental feed instead of the full optimized CSV.")
+                
+                supplemental_format = st.radio("Supplemental feed format", ["TSV", "XML"], horizontal=True)
+                if supplemental_format == "TSV":
+                    lazy_download_button(
+                        'supplemental_tsv', optimized_stamp, lambda: write_supplemental_tsv(supplemental_delta()),
+                        label="⬇️ Download Supplemental Feed (TSV)",
+                        file_name=f"supplemental_{gmc_file}.tsv",
+                        inputs=optimized_inputs
+                    )
+                else:
+                    lazy_download_button(
+                        'supplemental_xml', optimized_stamp, lambda: write_supplemental_xml(supplemental_delta()),
+                        label="⬇️ Download Supplemental Feed (XML)",
+                        file_name=f"supplemental_{gmc_file}.xml",
+                        inputs=optimized_inputs
+                    )
+            else:
+                st.warning("⚠️ Supplemental feeds match products by 'id' - your GMC feed has no 'id' column.")
+            
+            st.markdown("---")
             
             # Show summary
-            st.success(f"✅ Ready to export {len(optimized_data)} optimized products!")
+            st.success(f"✅ Ready to export {optimized_feed_size(df_gmc, recommendations)} optimized products!")
             
-            # Show sample of optimizations with proper columns
+            # Show sample of optimizations with proper columns, built for the first products only
             st.subheader("📋 Sample Optimizations")
+            df_sample = build_optimized_feed(df_gmc, recommendations, np.arange(min(5, len(recommendations))))
             # Show key columns: original title, optimized title, original description, optimized description, reasoning
             sample_columns = ['title', 'optimized_title', 'title_reasoning', 'description', 'optimized_description', 'description_reasoning', 'expected_impact']
-            available_columns = [col for col in sample_columns if col in df_optimized.columns]
-            sample_df = df_optimized[available_columns].head(5)
+            available_columns = [col for col in sample_columns if col in df_sample.columns]
+            sample_df = df_sample[available_columns].head(5)
             st.dataframe(sample_df)
             
         else: